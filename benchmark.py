@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the card renderers, with JSON results and a regression check.
+
+For every style (vintage, handwritten, sketchy), output mode (a single
+canvas, or --stream shards) and batch size (1, 100 and 10000 cards by
+default) a fresh process renders a fixed, seeded list of cards and reports
+
+  ms_per_page     render time / pages (fonts, layout and file writing included)
+  pages_per_s     the inverse, for the headline number
+  bytes_per_page  size of the PDF / pages
+  ops_per_page    PDF operators a viewer executes per page, forms included
+  peak_rss_mb     peak resident memory of the process
+
+plus, per style, the cold start: a fresh interpreter until the first card is
+drawn (see benchmark_startup.py). Render timings are the best of --repeat
+runs, cold start and memory the median.
+
+  python benchmark.py -o results.json                  # run, save
+  python benchmark.py --compare baseline.json          # run, flag regressions
+  python benchmark.py --quick                          # 1/100/1000 cards, 1 run
+
+With --compare the exit status is 1 if any metric got worse than the
+baseline by more than --tolerance percent (memory and size by more than
+--size-tolerance), so a renderer change can be accepted or rejected on
+numbers.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+import reportlab
+
+import pdf_merge
+import render_trace
+from benchmark_memory import measure_process
+from benchmark_startup import STYLE_CALLS, run_probe
+
+SIZES = (1, 100, 10000)
+QUICK_SIZES = (1, 100, 1000)
+MODES = ("canvas", "stream")
+
+# Metrics where a higher value is better; all others are lower-is-better
+HIGHER_IS_BETTER = {"pages_per_s"}
+# Deterministic metrics that only change when the output changes
+SIZE_METRICS = {"bytes_per_page", "ops_per_page", "peak_rss_mb"}
+
+# Runs in the child process: render the cards, write the timing to a file
+PROBE = """
+import json, sys, time
+import generate_wine_tasting_batch as batch
+spec = json.loads(sys.argv[1])
+cards = ({"name": f"Benchmark Wine {i}", "producer": "Test Estate", "vintage": str(2000 + i % 25)}
+         for i in range(spec["cards"]))
+start = time.perf_counter()
+pages = batch.render_batch(cards, spec["output"], style=spec["style"], seed=1, stream=spec["mode"] == "stream")
+with open(spec["result"], "w") as f:
+    json.dump({"seconds": time.perf_counter() - start, "pages": pages}, f)
+"""
+
+_XOBJECTS = re.compile(rb"/XObject\s*<<(.*?)>>", re.S)
+_NAMED_REF = re.compile(rb"/(\S+)\s+(\d+) 0 R")
+_IMAGE = re.compile(rb"/Subtype\s*/Image\b")
+
+
+def _stream_data(body):
+    """Decoded stream of a PDF object body (reportlab uses ASCII85 and Flate)."""
+    head, stream = pdf_merge._split_stream(body)
+    data = stream.split(b"stream", 1)[1].rsplit(b"endstream", 1)[0].strip()
+    if b"/ASCII85Decode" in head:
+        data = base64.a85decode(data[:-2] if data.endswith(b"~>") else data)
+    if b"/FlateDecode" in head:
+        data = zlib.decompress(data)
+    return data
+
+
+def operators_per_page(data):
+    """Operators each page of a reportlab PDF executes, counting the forms it draws."""
+    objects, _ = pdf_merge.read_objects(data)
+    cache = {}
+
+    def drawn_forms(head, content):
+        """Object numbers of the forms a content stream draws with Do."""
+        resources = head
+        ref = pdf_merge._ref(head, b"Resources")
+        if ref is not None:
+            resources = objects[ref]
+        forms = {}
+        for block in _XOBJECTS.findall(resources):
+            forms.update((name, int(number)) for name, number in _NAMED_REF.findall(block))
+        return [forms[name] for name in re.findall(rb"/(\S+)\s+Do\b", content) if name in forms]
+
+    def count_operators(content):
+        # Latin-1 maps every byte to one character, as the canvas wrote them
+        return render_trace.count_operators(content.decode("latin-1"))
+
+    def ops(number):
+        if number not in cache:
+            body = objects[number]
+            head = pdf_merge._split_stream(body)[0]
+            if _IMAGE.search(head):
+                cache[number] = 0  # an image XObject is data, not operators
+            else:
+                content = _stream_data(body)
+                cache[number] = count_operators(content) + sum(ops(ref) for ref in drawn_forms(head, content))
+        return cache[number]
+
+    counts = []
+    for number in sorted(objects):
+        body = objects[number]
+        if re.search(rb"/Type\s*/Page\b", body):
+            contents = pdf_merge._ref(body, b"Contents")
+            content = _stream_data(objects[contents])
+            counts.append(count_operators(content) + sum(ops(ref) for ref in drawn_forms(body, content)))
+    return counts
+
+
+def run_case(style, mode, cards, repeat, workdir):
+    """Render `cards` cards `repeat` times in fresh processes; returns the metrics dict."""
+    output = os.path.join(workdir, "cards.pdf")
+    result = os.path.join(workdir, "result.json")
+    spec = json.dumps({"style": style, "mode": mode, "cards": cards, "output": output, "result": result})
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get("PYTHONPATH")]))
+    seconds, rss = [], []
+    for _ in range(repeat):
+        peak, _ = measure_process([sys.executable, "-c", PROBE, spec], env)
+        with open(result) as f:
+            timing = json.load(f)
+        seconds.append(timing["seconds"])
+        rss.append(peak)
+    pages = timing["pages"]
+    with open(output, "rb") as f:
+        data = f.read()
+    ops = operators_per_page(data)
+    seconds = min(seconds)  # the least disturbed run, as timeit does
+    return {
+        "ms_per_page": seconds * 1000 / pages,
+        "pages_per_s": pages / seconds,
+        "bytes_per_page": len(data) / pages,
+        "ops_per_page": sum(ops) / len(ops),
+        "peak_rss_mb": statistics.median(rss),
+    }
+
+
+def cold_start(style, repeat):
+    """Median ms from a fresh interpreter to the first card, with a warm font cache."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run_probe(style, True, cache_dir)  # fill the font cache
+        walls = [run_probe(style, True, cache_dir)[2] for _ in range(repeat)]
+    return statistics.median(walls) * 1000
+
+
+def run_suite(styles, modes, sizes, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for style in styles:
+            results[f"{style}/cold_start"] = {"cold_start_ms": cold_start(style, max(repeat, 3))}
+            for mode in modes:
+                for cards in sizes:
+                    name = f"{style}/{mode}/{cards}"
+                    print(f"  {name} ...", file=sys.stderr)
+                    results[name] = run_case(style, mode, cards, repeat, workdir)
+    return results
+
+
+def compare(results, baseline, tolerance, size_tolerance):
+    """Returns a list of (case, metric, baseline, current, change %) that got worse than allowed."""
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(case, {}).get(metric)
+            if not base:
+                continue
+            change = (value - base) / base * 100
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            allowed = size_tolerance if metric in SIZE_METRICS else tolerance
+            if change > allowed:
+                regressions.append((case, metric, base, value, change))
+    return regressions
+
+
+def print_table(results):
+    columns = ["ms_per_page", "pages_per_s", "bytes_per_page", "ops_per_page", "peak_rss_mb"]
+    print(f"{'case':<26}" + "".join(f"{column:>15}" for column in columns))
+    for case, metrics in results.items():
+        if "cold_start_ms" in metrics:
+            print(f"{case:<26}{metrics['cold_start_ms']:>15.1f}  (ms to first card)")
+        else:
+            print(f"{case:<26}" + "".join(f"{metrics[column]:>15.2f}" for column in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every card style and output mode.")
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against an earlier JSON result")
+    parser.add_argument("--tolerance", type=float, default=15, metavar="PCT",
+                        help="allowed slowdown in percent (default: 15)")
+    parser.add_argument("--size-tolerance", type=float, default=5, metavar="PCT",
+                        help="allowed growth of bytes, operators and memory in percent (default: 5)")
+    parser.add_argument("--style", action="append", choices=sorted(STYLE_CALLS), help="limit to a style")
+    parser.add_argument("--mode", action="append", choices=MODES, help="limit to an output mode")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"batch sizes (default: {' '.join(map(str, SIZES))})")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case (default: 3)")
+    parser.add_argument("--quick", action="store_true", help=f"sizes {' '.join(map(str, QUICK_SIZES))}, one run")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    repeat = 1 if args.quick else args.repeat
+    results = run_suite(args.style or list(STYLE_CALLS), args.mode or list(MODES), sizes, repeat)
+    print_table(results)
+
+    if args.output:
+        report = {
+            "meta": {
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "reportlab": reportlab.Version,
+                "platform": platform.platform(),
+                "repeat": repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.size_tolerance)
+        for case, metric, base, value, change in regressions:
+            print(f"REGRESSION {case} {metric}: {base:.2f} -> {value:.2f} ({change:+.1f}% worse)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
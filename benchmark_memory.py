@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Peak memory (RSS) of a batch render versus the number of pages.
+
+Each run is a fresh `generate_wine_tasting_batch.py` process writing to
+/dev/null, once with the default single canvas (every page is kept until the
+end) and once with --stream (pages are written out shard by shard). The
+vintage style with --paper-textures 0, i.e. a unique Bezier paper texture on
+every page, is the worst case and the default here.
+
+Usage: python benchmark_memory.py [--pages 500 1000 2000 4000] [--style vintage]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate_wine_tasting_batch.py")
+
+
+def measure_process(command, env=None):
+    """Run `command`; returns (peak RSS in MB, seconds). Raises RuntimeError if it fails."""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, env=env)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status:
+        raise RuntimeError(f"failed: {' '.join(command)}")
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return usage.ru_maxrss / scale, elapsed
+
+
+def peak_rss(args):
+    """Run the batch script with `args`; returns (peak RSS in MB, seconds)."""
+    return measure_process([sys.executable, SCRIPT, *args])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure peak RSS of batch renders against page count.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--style", default="vintage")
+    parser.add_argument("--paper-textures", type=int, default=0, metavar="K",
+                        help="vintage texture pool size (default: 0, a unique texture per page)")
+    args = parser.parse_args(argv)
+
+    print(f"{'pages':>7} {'canvas MB':>10} {'stream MB':>10} {'canvas s':>9} {'stream s':>9}")
+    for pages in args.pages:
+        common = ["--blank", str(pages), "-s", args.style, "--seed", "1", "-o", os.devnull]
+        if args.style == "vintage":
+            common += ["--paper-textures", str(args.paper_textures)]
+        canvas_mb, canvas_s = peak_rss(common)
+        stream_mb, stream_s = peak_rss(common + ["--stream"])
+        print(f"{pages:>7} {canvas_mb:>10.0f} {stream_mb:>10.0f} {canvas_s:>9.1f} {stream_s:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
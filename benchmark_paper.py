@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Vector versus raster paper textures of the vintage style.
+
+Renders --pages seeded vintage cards with a unique texture on every page
+(--paper-textures 0, the case where texture generation matters most), once
+with the vector background and once with the raster one at every --dpi, and
+reports per page
+
+  render ms   drawing the PDF (in this process, fonts and layout warmed up)
+  KB          size of the PDF
+  ops         PDF operators a viewer executes (see benchmark.py)
+  view ms     rasterizing the page at --view-dpi, as a viewer does; only
+              if PyMuPDF is installed (pip install pymupdf)
+
+Usage: python benchmark_paper.py [--pages 20] [--dpi 72 150 300] [--view-dpi 96]
+"""
+import argparse
+import io
+import time
+
+from benchmark import operators_per_page
+from generate_wine_tasting_sheet_vintage import create_vintage_tasting_card
+
+
+def view_seconds(data, dpi):
+    """Seconds PyMuPDF takes to rasterize every page of `data`, or None without PyMuPDF."""
+    try:
+        import pymupdf
+    except ImportError:
+        return None
+    document = pymupdf.open(stream=data, filetype="pdf")
+    start = time.perf_counter()
+    for page in document:
+        page.get_pixmap(dpi=dpi)
+    return time.perf_counter() - start
+
+
+def run(pages, view_dpi, **options):
+    """Render `pages` cards with `options`; returns (render s, bytes, ops, view s) per page."""
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    create_vintage_tasting_card(buffer, [{}] * pages, seed=1, paper_textures=0, **options)
+    seconds = time.perf_counter() - start
+    data = buffer.getvalue()
+    ops = operators_per_page(data)
+    view = view_seconds(data, view_dpi)
+    return seconds / pages, len(data) / pages, sum(ops) / len(ops), None if view is None else view / pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the vector and raster paper textures of the vintage style.")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[72, 150, 300], help="raster texture resolutions")
+    parser.add_argument("--view-dpi", type=int, default=96, help="resolution pages are viewed at (default: 96)")
+    args = parser.parse_args(argv)
+
+    run(1, args.view_dpi)  # fonts, layout and the skeleton, so they are not timed below
+    cases = [("vector", {})] + [(f"raster {dpi} dpi", {"paper": "raster", "paper_dpi": dpi}) for dpi in args.dpi]
+    print(f"{'paper':<16} {'render ms':>10} {'KB':>8} {'ops':>7} {'view ms':>8}")
+    for name, options in cases:
+        seconds, size, ops, view = run(args.pages, args.view_dpi, **options)
+        view = "-" if view is None else f"{view * 1000:.1f}"
+        print(f"{name:<16} {seconds * 1000:>10.1f} {size / 1024:>8.1f} {ops:>7.0f} {view:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: how long until the first card of a style is drawn.
+
+Every measurement runs in a fresh Python process and reports
+  import      importing the style module (no font is loaded any more)
+  first card  import + drawing one card into memory, with an empty font
+              cache (the TTF is parsed and cached) and with a warm one
+  process     wall time of the whole warm first-card process, including
+              interpreter start-up
+as the median of --repeat runs. Run it from the folder with the .ttf files,
+like the generator scripts.
+
+Usage: python benchmark_startup.py [--repeat 7] [--style vintage ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STYLE_CALLS = {
+    "vintage": ("generate_wine_tasting_sheet_vintage", "create_vintage_tasting_card"),
+    "handwritten": ("generate_wine_tasting_sheet_handwritten", "create_generic_sketchy_card"),
+    "sketchy": ("generate_wine_tasting_sheet_sketchy", "create_generic_tasting_card"),
+}
+
+# Runs inside the child process and prints its timings as JSON
+PROBE = """
+import io, json, time, importlib
+start = time.perf_counter()
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+if {render!r}:
+    getattr(module, {function!r})(io.BytesIO(), [{{"name": "Benchmark"}}], seed=1)
+done = time.perf_counter()
+print(json.dumps({{"import": imported - start, "total": done - start}}))
+"""
+
+
+def run_probe(style, render, cache_dir):
+    """Run one fresh process; returns (import s, import+render s, process wall s)."""
+    module, function = STYLE_CALLS[style]
+    env = dict(os.environ, WINE_CARDS_FONT_CACHE=cache_dir)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", PROBE.format(module=module, function=function, render=render)],
+                            env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings["import"], timings["total"], wall
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import and first-card latency of each card style.")
+    parser.add_argument("--repeat", type=int, default=7, help="fresh processes per measurement (default: 7)")
+    parser.add_argument("--style", action="append", choices=sorted(STYLE_CALLS), help="limit to a style")
+    args = parser.parse_args(argv)
+
+    print(f"{'style':<12} {'import':>9} {'cold card':>10} {'warm card':>10} {'process':>9}   (median ms)")
+    for style in args.style or list(STYLE_CALLS):
+        imports, cold, warm, walls = [], [], [], []
+        for _ in range(args.repeat):
+            imports.append(run_probe(style, False, "")[0])
+            with tempfile.TemporaryDirectory() as cache_dir:
+                cold.append(run_probe(style, True, cache_dir)[1])
+                _, total, wall = run_probe(style, True, cache_dir)
+                warm.append(total)
+                walls.append(wall)
+        row = [statistics.median(values) * 1000 for values in (imports, cold, warm, walls)]
+        print(f"{style:<12} {row[0]:>9.1f} {row[1]:>10.1f} {row[2]:>10.1f} {row[3]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Content-addressed on-disk cache of rendered card PDFs.
+
+A rendered batch is stored under a hash of everything that can change its
+bytes: the style, the source of the drawing code (which holds the layout
+constants), the card data, the seed and other options, the reportlab version
+and the bytes of the font files. A repeated request with the same inputs is
+served by copying the stored PDF instead of drawing it again.
+
+The cache directory is capped in size; the least recently used entries are
+evicted first (a hit refreshes an entry's modification time). Several
+processes may share the directory: entries that vanish under one of them
+are skipped, and temporary files of a store() that crashed are removed
+once they are STALE_TMP_SECONDS old.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import reportlab
+from reportlab.pdfbase.ttfonts import TTFError
+
+from font_cache import resolve_font
+
+# Font files each style may load, looked up like the styles do (missing files simply hash as empty)
+STYLE_FONTS = {
+    "vintage": ["GreatVibes-Regular.ttf"],
+    "handwritten": ["PatrickHand.ttf"],
+    "sketchy": ["PatrickHand.ttf"],
+}
+
+# A store() whose temporary file is older than this has crashed; evict() removes it
+STALE_TMP_SECONDS = 3600
+
+_file_digests = {}
+
+
+def file_digest(path):
+    """SHA-256 of a file's bytes (b'' if it does not exist), memoized per process."""
+    path = os.path.abspath(path)
+    if path not in _file_digests:
+        try:
+            with open(path, "rb") as f:
+                _file_digests[path] = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            _file_digests[path] = hashlib.sha256(b"").hexdigest()
+    return _file_digests[path]
+
+
+def font_digest(path):
+    """file_digest() of a font file, found where reportlab finds it (TTFSearchPath)."""
+    try:
+        path = resolve_font(path)
+    except TTFError:
+        pass  # missing: hashes as empty
+    return file_digest(path)
+
+
+class CardCache:
+    """
+    LRU-evicted directory of finished PDFs keyed by a hash of their inputs.
+
+    Usage:
+        cache = CardCache("~/.cache/wine-cards", max_bytes=500 * 2**20)
+        key = cache.key(style="vintage", cards=cards, seed=42, source_files=[...], styles=["vintage"])
+        if not cache.fetch(key, "out.pdf"):
+            render(..., "out.pdf")
+            cache.store(key, "out.pdf")
+        print(cache.stats())
+    """
+
+    def __init__(self, directory, max_bytes=500 * 2 ** 20):
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, style, cards, seed, source_files=(), styles=(), **options):
+        """Hash the inputs of a render into a cache key; `styles` are those the cards' style entries name."""
+        h = hashlib.sha256()
+        inputs = {
+            "style": style,
+            "seed": str(seed),
+            "options": options,
+            "reportlab": reportlab.Version,
+            "sources": [file_digest(path) for path in source_files],
+            "fonts": [font_digest(path) for name in sorted({style, *styles}) for path in STYLE_FONTS.get(name, [])],
+        }
+        h.update(json.dumps(inputs, sort_keys=True, default=str).encode())
+        for card in cards:
+            h.update(json.dumps(card, sort_keys=True).encode())
+            h.update(b"\n")
+        return h.hexdigest()
+
+    def _path(self, key):
+        return self.directory / f"{key}.pdf"
+
+    def fetch(self, key, filename):
+        """Copy the cached PDF for `key` to `filename`. Returns False on a miss."""
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, filename)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass  # evicted by another process after the copy; the copy is whole all the same
+        self.hits += 1
+        return True
+
+    def store(self, key, filename):
+        """Add a freshly rendered PDF to the cache, then evict down to the size cap."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(filename, tmp)
+        os.replace(tmp, self._path(key))  # atomic, so readers never see half a file
+        self.evict()
+
+    def _entries(self, pattern="*.pdf"):
+        """(path, stat) of the entries; ones another process removes meanwhile are skipped."""
+        for path in self.directory.glob(pattern):
+            try:
+                yield path, path.stat()
+            except FileNotFoundError:
+                continue
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes, and crashed stores' leftovers."""
+        stale = time.time() - STALE_TMP_SECONDS
+        for path, stat in self._entries("*.tmp"):
+            if stat.st_mtime < stale:
+                path.unlink(missing_ok=True)
+        entries = []
+        total = 0
+        for path, stat in self._entries():
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        """Hit/miss/eviction counters of this process plus the current cache size."""
+        sizes = [stat.st_size for _, stat in self._entries()]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(sizes),
+            "bytes": sum(sizes),
+        }
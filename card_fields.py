@@ -0,0 +1,197 @@
+"""
+Fillable cards: the bubbles and writing lines of a card as AcroForm fields.
+
+For filling cards in on a tablet instead of on paper, every row of bubbles
+(Clarity, Depth, Sweetness, ...) becomes a radio group, every writing line
+a text field and the notes box a multi-line text field. The printed card
+stays as it is; the fields lie on top of it, named after the card, so a
+batch can be filled in and read back (card12.Clarity, card12.Aromas Grapes).
+
+    fields = CardFields(c, layout, ink=ink_color)
+    for index, card in enumerate(cards):
+        ...  # draw the card
+        fields.add(f"card{index}", card)
+        c.showPage()
+
+Every widget needs an appearance stream, and reportlab's AcroForm helpers
+write a full set (normal, down, rollover) into each one. Here the widgets
+only carry what differs from the printed card, so the streams are shared
+by every widget of the document: one empty stream (text fields and
+unselected bubbles, whose outline is already printed) and one filled mark
+per bubble size. The per-widget cost is then just its dictionary, which
+keeps a form of several hundred pages small.
+
+Widget dictionaries are written from byte templates prepared once per
+layout, with only their position and references filled in per card:
+formatting tens of thousands of small PDFDictionary objects generically
+would take longer than drawing the cards.
+
+Header values that come with the card (wine name, producer, ...) are
+printed as before and their fields are read-only, holding the value as
+form data.
+"""
+from reportlab.lib.colors import black
+from reportlab.pdfbase.pdfdoc import (PDFArray, PDFDictionary, PDFName, PDFObject, PDFStream, PDFStreamFilterZCompress,
+                                     PDFString, pdfdocEnc)
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+from card_layout import Box, Bubble, Line
+
+# Field flags (PDF 32000-1, 12.7.3.1 and 12.7.4)
+READ_ONLY = 1 << 0
+MULTILINE = 1 << 12
+NO_TOGGLE_TO_OFF = 1 << 14
+RADIO = 1 << 15
+PRINT = 4  # annotation flag: print the widget with the page
+
+BUBBLE_INSET = 1.5  # between a bubble's outline and its filled mark
+FIELD_HEIGHT = 13  # of a text field, from just below its line
+FIELD_PADDING = 3  # inside the notes box
+
+
+def _literal(obj, doc):
+    """A formatted PDF string or name, safe to put into a _Prepared template."""
+    return pdfdocEnc(obj.format(doc)).replace(b"%", b"%%")
+
+
+class _Prepared(PDFObject):
+    """A PDF object written from a byte template; only the references in it are formatted when the PDF is saved."""
+    def __init__(self, template, refs):
+        self.template = template  # one %s per reference
+        self.refs = refs
+
+    def format(self, document):
+        return self.template % tuple(ref.format(document) for ref in self.refs)
+
+
+class CardFields:
+    """Adds the AcroForm fields of `layout` to the pages of canvas `c`, sharing their appearance streams."""
+
+    def __init__(self, c, layout, ink=black, font="Helvetica"):
+        self.c = c
+        self.layout = layout
+        doc = c._doc
+        font_name = c.acroForm.makeFont(font)[1]  # its resource name, e.g. Helv
+        red, green, blue = ink.rgb()
+        self._ink = "%s %s %s rg" % (round(red, 3), round(green, 3), round(blue, 3))
+        self._empty = self._stream(1, 1, "")
+        self._marks = {}  # (w, h) -> reference of the filled bubble stream
+        self._rects = {}  # current transformation -> the Rect of every widget, in page coordinates
+
+        # Everything of a widget but its Rect, references and per-card entries:
+        # (box, template up to the Rect, from the Rect on, references to the shared appearance streams)
+        self._widgets = []
+        # Bubble rows: (formatted row name, index of the first and one past the last of its widgets)
+        self._groups = []
+        # Text fields: (field name, index of its widget, field flags)
+        self._texts = []
+        rows = {}
+        for element in layout.elements:
+            if isinstance(element, Bubble):
+                rows.setdefault(element.row, []).append(element)
+        for row, bubbles in rows.items():
+            first = len(self._widgets)
+            self._groups.append((_literal(PDFString(row), doc), first, first + len(bubbles)))
+            for bubble in bubbles:
+                option = _literal(PDFName(bubble.option), doc)
+                self._widgets.append((
+                    (bubble.x, bubble.y, bubble.x + bubble.w, bubble.y + bubble.h),
+                    b"<< /Type /Annot /Subtype /Widget /F %d /Rect [ " % PRINT,
+                    b" ] /AS /Off /H /N /AP << /N << %s %%s /Off %%s >> >> /P %%s /Parent %%s" % option,
+                    (self._mark(bubble.w, bubble.h), self._empty),
+                ))
+
+        appearance = _literal(PDFString("/%s 0 Tf %s" % (font_name, self._ink)), doc)
+        for element in layout.elements:
+            if isinstance(element, Line) and element.name:
+                name, flags = element.name, 0
+                box = (element.x1, element.y1 - 2, element.x2, element.y1 - 2 + FIELD_HEIGHT)
+            elif isinstance(element, Box) and element.kind == "notes":
+                name, flags = "notes", MULTILINE
+                box = (element.x + FIELD_PADDING, element.y + FIELD_PADDING,
+                       element.x + element.w - FIELD_PADDING, element.y + element.h - FIELD_PADDING)
+            else:
+                continue
+            self._texts.append((name, len(self._widgets), flags))
+            self._widgets.append((
+                box,
+                b"<< /Type /Annot /Subtype /Widget /F %d /FT /Tx /T %s /DA %s /Rect [ "
+                % (PRINT, _literal(PDFString(name), doc), appearance),
+                b" ] /AP << /N %s >> /P %s /Parent %s",
+                (self._empty,),
+            ))
+
+    def _stream(self, width, height, content):
+        """Register a Form XObject appearance stream and return its reference."""
+        stream = PDFStream(
+            PDFDictionary({
+                "Type": PDFName("XObject"),
+                "Subtype": PDFName("Form"),
+                "BBox": PDFArray([0, 0, width, height]),
+                "Resources": PDFDictionary({"ProcSet": PDFArray([PDFName("PDF")])}),
+            }),
+            content,
+            filters=[PDFStreamFilterZCompress()] if self.c._doc.compression else None,
+        )
+        return self.c._doc.Reference(stream)
+
+    def _mark(self, w, h):
+        """The shared 'selected' appearance of a w x h bubble: an ink mark inside its outline."""
+        if (w, h) not in self._marks:
+            path = PDFPathObject()
+            path.roundRect(BUBBLE_INSET, BUBBLE_INSET, w - 2 * BUBBLE_INSET, h - 2 * BUBBLE_INSET,
+                           min(4, (h - 2 * BUBBLE_INSET) / 2))
+            self._marks[w, h] = self._stream(w, h, "%s %s f" % (self._ink, path.getCode()[2:]))
+        return self._marks[w, h]
+
+    def _page_rects(self):
+        """The Rect of every widget in page coordinates, so the fields follow the card onto an N-up sheet."""
+        matrix = self.c._currentMatrix
+        if matrix not in self._rects:
+            rects = []
+            for (x1, y1, x2, y2), *_ in self._widgets:
+                x1, y1 = self.c.absolutePosition(x1, y1)
+                x2, y2 = self.c.absolutePosition(x2, y2)
+                rects.append(b"%.2f %.2f %.2f %.2f" % (x1, y1, x2, y2))
+            self._rects[matrix] = rects
+        return self._rects[matrix]
+
+    def add(self, name, card=None):
+        """Add the fields of one card, drawn in the current coordinates, as children of a field `name`."""
+        c = self.c
+        doc = c._doc
+        card = card or {}
+        page = doc.thisPageRef()
+        parent = _Prepared(b"", ())
+        parent_ref = doc.Reference(parent)
+
+        widgets = []
+        for (_, before, after, shared), rect in zip(self._widgets, self._page_rects()):
+            widget = _Prepared(before + rect + after, shared + (page,))
+            c._addAnnotation(widget)
+            widgets.append(widget)
+
+        kids = []
+        for row, first, last in self._groups:
+            group = _Prepared(b"", ())
+            group_ref = doc.Reference(group)
+            for widget in widgets[first:last]:
+                widget.template += b" >>"
+                widget.refs += (group_ref,)
+            group.template = (b"<< /FT /Btn /Ff %d /T %s /Parent %%s /Kids [ %s ] >>"
+                              % (RADIO | NO_TOGGLE_TO_OFF, row, b" ".join([b"%s"] * (last - first))))
+            group.refs = (parent_ref,) + tuple(doc.Reference(widget) for widget in widgets[first:last])
+            kids.append(group_ref)
+
+        for field, index, flags in self._texts:
+            value = card.get(field) or ""
+            if value:
+                flags |= READ_ONLY
+            widget = widgets[index]
+            widget.template += (b" /Ff %d" % flags if flags else b"") + b" /V %s >>" % _literal(PDFString(value), doc)
+            widget.refs += (parent_ref,)
+            kids.append(doc.Reference(widget))
+
+        parent.template = b"<< /T %s /Kids [ %s ] >>" % (_literal(PDFString(name), doc), b" ".join([b"%s"] * len(kids)))
+        parent.refs = tuple(kids)
+        c.acroForm.fields.append(parent_ref)
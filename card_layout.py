@@ -0,0 +1,364 @@
+"""
+Layout pass for the tasting cards.
+
+build_card_layout() walks the card top to bottom exactly like the drawing code
+used to (header, aroma box, then the sections of the card schema, e.g.
+Visual, Smell, Taste and Verdict, with the notes box beside them) but only
+records what goes where: every text run, writing line, bubble and box with its
+coordinates, grouped into those sections. The style modules then just replay that plan with their
+own pens and palette, so one layout serves every page of a batch.
+
+Plans are memoized per style description and card schema (see card_schema.py)
+and can be exported as JSON.
+"""
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+
+from reportlab.lib.pagesizes import A4
+
+from card_schema import Criteria, Input, Inputs, Scale, TextRow, compile_schema, default_schema
+from font_metrics import string_width
+from render_trace import section as trace_section
+
+# --- Layout Constants (STRICTLY PRESERVED) ---
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+MARGIN_LEFT = 15
+MARGIN_BOTTOM = 15
+VERTICAL_HEADER_WIDTH = 25
+CONTENT_X = MARGIN_LEFT + VERTICAL_HEADER_WIDTH + 10
+
+RIGHT_COL_X = PAGE_WIDTH * 0.58
+RIGHT_COL_WIDTH = PAGE_WIDTH - RIGHT_COL_X - 15
+
+AROMA_BOX_X = RIGHT_COL_X
+AROMA_BOX_WIDTH = RIGHT_COL_WIDTH
+
+NOTES_BOX_WIDTH = RIGHT_COL_WIDTH * 0.75
+NOTES_BOX_X = PAGE_WIDTH - NOTES_BOX_WIDTH - 15
+
+CRITERIA_RIGHT_BOUNDARY = NOTES_BOX_X - 15
+
+SECTION_SPACING = 15
+
+# --- Plan elements ---
+# color is a palette role ("text" or "title"), kind a pen role of the style
+Text = namedtuple("Text", "x y text font size color align angle")
+# name: the fillable field the line becomes, for the lines that are written on
+Line = namedtuple("Line", "x1 y1 x2 y2 kind name")
+Bubble = namedtuple("Bubble", "x y w h row option")
+Box = namedtuple("Box", "x y w h kind")
+# A header line that gets the per-card value (wine name, producer, ...)
+Field = namedtuple("Field", "name x1 x2 y font size")
+
+# A named part of the card (header, visual, ...): elements[start:end]
+Section = namedtuple("Section", "name start end")
+
+CardLayout = namedtuple("CardLayout", "style width height elements fields sections")
+
+ELEMENT_TYPES = {cls.__name__.lower(): cls for cls in (Text, Line, Bubble, Box)}
+
+
+class _LayoutBuilder:
+    """Records the card's elements; one method per block of the old drawing code."""
+
+    def __init__(self, style, schema):
+        self.style = style
+        self.schema = schema
+        self.sizes = style["sizes"]
+        self.header_font = style["header_font"]
+        self.body_font = style["body_font"]
+        self.elements = []
+        self.fields = []
+        self.sections = []
+
+    @contextmanager
+    def section(self, name):
+        """Everything added inside the block belongs to the card section `name`."""
+        start = len(self.elements)
+        with trace_section(name):
+            yield
+        self.sections.append(Section(name, start, len(self.elements)))
+
+    def text(self, x, y, text, font, size, color="text", align="left", angle=0):
+        self.elements.append(Text(x, y, text, font, size, color, align, angle))
+
+    def vertical_header(self, text, y_center):
+        # Rotated 90 degrees; the +3 is the old drawCentredString(0, -3) offset
+        self.text(MARGIN_LEFT + 13, y_center, text.upper(), self.header_font,
+                  self.sizes["section_title"], color="title", align="centre", angle=90)
+
+    def criteria_row(self, label, option_list, y, spacing=80, has_bubbles=False):
+        label_size = self.sizes["label"]
+        body_size = self.sizes["option"]
+        self.text(CONTENT_X, y, label, self.header_font, label_size)
+
+        current_opt_x = CONTENT_X + spacing
+
+        for i, opt in enumerate(option_list):
+            self.text(current_opt_x, y, opt, self.body_font, body_size)
+            text_width = string_width(opt, self.body_font, body_size)
+
+            if has_bubbles:
+                bubble_width = 30
+                bubble_x = current_opt_x + (text_width / 2) - (bubble_width / 2)
+                self.elements.append(Bubble(bubble_x, y - 12, bubble_width, self.style["bubble_height"], label, opt))
+
+            gap = 25 if has_bubbles else 12
+            current_opt_x += text_width + gap
+
+            if i < len(option_list) - 1:
+                sep_x = current_opt_x - (gap / 2) - 2
+                self.text(sep_x, y, self.style["separator"], self.body_font, body_size)
+
+        return y - (28 if has_bubbles else 22)
+
+    def input_row(self, label, y):
+        self.text(CONTENT_X, y, label, self.header_font, self.sizes["label"])
+        self.elements.append(Line(CONTENT_X + 110, y, CRITERIA_RIGHT_BOUNDARY, y, "write", label))
+        return y - 24
+
+    def three_level_inputs(self, main_label, y, sub_labels=None):
+        self.text(CONTENT_X, y, main_label, self.header_font, self.sizes["label"])
+
+        current_row_y = y
+        for sub in sub_labels or self.style["sub_labels"]:
+            self.text(CONTENT_X + 80, current_row_y, sub + ":", self.body_font, self.sizes["option"])
+            line_start = CONTENT_X + 140
+            self.elements.append(Line(line_start, current_row_y, CRITERIA_RIGHT_BOUNDARY, current_row_y, "write",
+                                      f"{main_label} {sub}"))
+            current_row_y -= 18
+
+        return current_row_y - 5
+
+    def dotted_header_row(self, label, x, y, width, field):
+        label_size = self.sizes["label"]
+        self.text(x, y, label, self.header_font, label_size)
+
+        label_w = string_width(label, self.header_font, label_size)
+        line_start = x + label_w + 5
+        line_end = x + width
+        self.elements.append(Line(line_start, y, line_end, y, "write", field))
+        self.fields.append(Field(field, line_start, line_end, y, self.body_font, self.sizes["field_value"]))
+
+    def scale_row(self, label, options, y):
+        """The Rating/Status rows: wider bubbles spaced by each option's width."""
+        self.text(CONTENT_X, y, label, self.header_font, self.sizes["verdict_label"])
+        body_size = self.sizes["verdict_option"]
+        opt_x = CONTENT_X + 80
+        for opt in options:
+            self.text(opt_x, y, opt, self.body_font, body_size)
+            text_width = string_width(opt, self.body_font, body_size)
+            bubble_width = 30
+            bubble_x = opt_x + (text_width / 2) - (bubble_width / 2)
+            self.elements.append(Bubble(bubble_x, y - 12, bubble_width, self.style["verdict_bubble_height"],
+                                        label, opt))
+            opt_x += text_width + 30
+
+    def text_row(self, label, lines, y):
+        """A label with lines of plain text beside it, e.g. the hues."""
+        self.text(CONTENT_X, y, label, self.header_font, self.sizes["hue_label"])
+        hue_size = self.sizes["hue"]
+        for i, line in enumerate(lines):
+            if i:
+                y -= 16
+            self.text(CONTENT_X + 80, y, line, self.body_font, hue_size)
+        return y - 20
+
+    def row(self, row, y):
+        """
+        Lay out one schema row at `y`. Returns where the next row goes and how
+        far this one reaches below that, for the end of its section.
+        """
+        if isinstance(row, Criteria):
+            return self.criteria_row(row.label, row.options, y, spacing=row.spacing, has_bubbles=row.bubbles), 20
+        if isinstance(row, Scale):
+            self.scale_row(row.label, row.options, y)
+            return y - 30, 15
+        if isinstance(row, Inputs):
+            return self.three_level_inputs(row.label, y, row.sub_labels), 20
+        if isinstance(row, Input):
+            return self.input_row(row.label, y), 20
+        if isinstance(row, TextRow):
+            return self.text_row(row.label, row.lines, y), 18
+        raise TypeError(f"Unknown schema row {row!r}")
+
+    def aroma_box(self, start_y):
+        LIFT_AMOUNT = 15
+        start_y += LIFT_AMOUNT
+        title_y = start_y - 12
+
+        self.text(AROMA_BOX_X + AROMA_BOX_WIDTH / 2, title_y, self.schema.aroma_title, self.header_font,
+                  self.sizes["aroma_title"], color="title", align="centre")
+
+        box_y = title_y - 12
+        line_height = 9
+
+        for section, items in self.schema.aroma_groups or self.style["aroma_data"]:
+            self.text(AROMA_BOX_X + 5, box_y, section, self.header_font, self.sizes["aroma_section"])
+            box_y -= line_height + 1
+            for item in items:
+                self.text(AROMA_BOX_X + 5, box_y, item, self.body_font, self.sizes["aroma_item"])
+                box_y -= line_height
+            box_y -= 3
+
+        box_height = start_y - box_y + 5
+        self.elements.append(Box(AROMA_BOX_X, box_y, AROMA_BOX_WIDTH, box_height, "aroma"))
+
+    def notes_box(self, title, start_y, end_y):
+        end_y -= 5
+        box_height = start_y - end_y
+
+        self.text(NOTES_BOX_X + NOTES_BOX_WIDTH / 2, start_y - 10, title, self.header_font,
+                  self.sizes["notes_title"], color="title", align="centre")
+
+        box_top = start_y - 20
+        box_height -= 20
+
+        self.elements.append(Box(NOTES_BOX_X, end_y, NOTES_BOX_WIDTH, box_height, "notes"))
+
+        inset = self.style["notes_line_inset"]
+        line_y = box_top - 15
+        while line_y > end_y + 5:
+            self.elements.append(Line(NOTES_BOX_X + inset, line_y, NOTES_BOX_X + NOTES_BOX_WIDTH - inset, line_y,
+                                      "notes", None))
+            line_y -= 15
+
+    def card(self):
+        current_y = PAGE_HEIGHT - 40
+
+        # --- 1. HEADER ---
+        header_w = RIGHT_COL_X - MARGIN_LEFT - 20
+        row_height = 24
+
+        with self.section("header"):
+            self.dotted_header_row("Wine Name:", MARGIN_LEFT, current_y, header_w, "name")
+            current_y -= row_height
+            self.dotted_header_row("Producer:", MARGIN_LEFT, current_y, header_w, "producer")
+            current_y -= row_height
+            self.dotted_header_row("Region:", MARGIN_LEFT, current_y, header_w, "region")
+            current_y -= row_height
+            self.dotted_header_row("Varietals:", MARGIN_LEFT, current_y, header_w, "varietals")
+            current_y -= row_height
+
+            date_w = header_w * 0.4
+            self.dotted_header_row("Date:", MARGIN_LEFT, current_y, date_w, "date")
+            vintage_x = MARGIN_LEFT + date_w + 20
+            vintage_w = header_w * 0.25
+            self.dotted_header_row("Vintage:", vintage_x, current_y, vintage_w, "vintage")
+
+        with self.section("aroma_box"):
+            self.aroma_box(PAGE_HEIGHT - 45)
+
+        current_y -= 30
+
+        # --- 2. THE SCHEMA'S SECTIONS (Visual, Smell, Taste, Verdict), with the notes box beside some ---
+        notes = self.schema.notes
+        for i, part in enumerate(self.schema.sections):
+            if i:
+                current_y -= SECTION_SPACING
+            if notes and part.name == notes[1]:
+                notes_start_y = current_y + 10
+
+            with self.section(part.name):
+                start_y = current_y
+                for row in part.rows:
+                    current_y, reach = self.row(row, current_y)
+                end_y = current_y + reach
+                self.vertical_header(part.title, (start_y + end_y) / 2)
+
+            if notes and part.name == notes[2]:
+                with self.section("notes_box"):
+                    self.notes_box(notes[0], notes_start_y, end_y)
+
+        return CardLayout(self.style["name"], PAGE_WIDTH, PAGE_HEIGHT, tuple(self.elements), tuple(self.fields),
+                          tuple(self.sections))
+
+
+def _check_layout(layout):
+    """Raise ValueError if two rows of the card would share a form field, or the card runs off the page."""
+    fields = {}
+    for part in layout.sections:
+        for element in layout.elements[part.start:part.end]:
+            if isinstance(element, Bubble):
+                # The bubbles of one row share a field
+                field, where = element.row, ("bubbles", element.y)
+                bottom, right = element.y, element.x + element.w
+            elif isinstance(element, Line):
+                field, where = element.name, ("line", element.x1, element.y1)
+                bottom, right = min(element.y1, element.y2), max(element.x1, element.x2)
+            elif isinstance(element, Box):
+                field, bottom, right = None, element.y, element.x + element.w
+            else:
+                field, bottom, right = None, element.y, element.x
+                width = string_width(element.text, element.font, element.size)
+                if element.angle:
+                    # Turned upright and centred on y (vertical_header)
+                    bottom -= width / 2
+                elif element.align == "centre":
+                    right += width / 2
+                else:
+                    right += width
+            if field is not None and fields.setdefault(field.casefold(), where) != where:
+                raise ValueError(f"Card schema: more than one row of the card makes the field {field!r} "
+                                 f"(in section {part.name}); give the rows different labels")
+            if bottom < MARGIN_BOTTOM:
+                raise ValueError(f"Card schema: section {part.name} runs {MARGIN_BOTTOM - bottom:.0f} pt off the "
+                                 f"bottom of the page; leave out rows (or aroma items)")
+            if right > layout.width - MARGIN_LEFT:
+                raise ValueError(f"Card schema: section {part.name} runs {right - layout.width + MARGIN_LEFT:.0f} pt "
+                                 f"off the right edge of the page; use fewer options or a smaller spacing")
+
+
+_layouts = {}
+
+
+def build_card_layout(style, schema=None):
+    """
+    Compute (or fetch the memoized) layout plan for a style description and card schema.
+
+    `style` is a plain dict from the style module: name, fonts, font sizes,
+    separator, bubble heights, sub-labels, aging scale, notes line inset and
+    aroma data. The fonts must be registered before the first call.
+    `schema` is a card schema (dict or compiled, see card_schema.py); None
+    draws the style's default card. Raises ValueError if the card does not
+    fit on the page or two of its rows would make the same form field.
+    """
+    if schema is not None:
+        schema = compile_schema(schema)
+    key = (json.dumps(style, sort_keys=True), schema and schema.digest)
+    if key not in _layouts:
+        layout = _LayoutBuilder(style, schema or compile_schema(default_schema(style))).card()
+        _check_layout(layout)
+        _layouts[key] = layout
+    return _layouts[key]
+
+
+def layout_to_dict(layout):
+    """A JSON-friendly dict of a layout: one object per element, with its type."""
+    return {
+        "style": layout.style,
+        "width": layout.width,
+        "height": layout.height,
+        "elements": [dict(type=type(element).__name__.lower(), **element._asdict()) for element in layout.elements],
+        "fields": [field._asdict() for field in layout.fields],
+        "sections": [section._asdict() for section in layout.sections],
+    }
+
+
+def layout_from_dict(data):
+    """Rebuild a CardLayout from layout_to_dict() output."""
+    elements = []
+    for element in data["elements"]:
+        element = dict(element)
+        elements.append(ELEMENT_TYPES[element.pop("type")](**element))
+    fields = tuple(Field(**field) for field in data["fields"])
+    sections = tuple(Section(**section) for section in data["sections"])
+    return CardLayout(data["style"], data["width"], data["height"], tuple(elements), fields, sections)
+
+
+def export_layout(layout, path):
+    """Write a layout plan as JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(layout_to_dict(layout), f, ensure_ascii=False, indent=1)
@@ -0,0 +1,123 @@
+"""
+Bubble manifest: where the answers are on a rendered card, for machine reading.
+
+The bubble rectangles depend on the string widths of the option labels, so
+a scanning or grading tool cannot know them without the layout. The
+manifest keeps just what such a tool needs: page and card size, style and
+seed, how cards sit on the sheet (N-up), and the (row, option, x, y, w, h)
+of every bubble and writing line, in card coordinates (points, origin at
+the bottom left).
+
+    manifest = build_manifest(layout, seed="2026", n_up=4, sheet="A3")
+    write_manifest(manifest, "cards.manifest.json")  # + cards.manifest.bin
+
+Next to the JSON, the same boxes are written as a little-endian float32
+array of BINARY_COLUMNS, one record per box, which loads in one call:
+
+    numpy.fromfile("cards.manifest.bin", "<f4").reshape(-1, 7)
+
+`kind` is 0 for a bubble and 1 for a line, `row` indexes manifest["rows"]
+and `option` that row's options (-1 for lines).
+
+A manifest only depends on the layout and the sheet, so it is built once
+per layout and reused for every page and every later call.
+"""
+import json
+import sys
+from array import array
+from pathlib import Path
+
+from card_layout import Bubble, Line
+from imposition import default_sheet, plan_grid, slot_transform
+
+BUBBLE, LINE = 0, 1
+BINARY_COLUMNS = ("kind", "row", "option", "x", "y", "w", "h")
+BOX_COLUMNS = ("row", "option", "x", "y", "w", "h")
+PRECISION = 3  # decimals of a point kept in the JSON
+
+_manifests = {}
+
+
+def _round(*values):
+    return [round(value, PRECISION) for value in values]
+
+
+def _boxes(layout):
+    """The rows (label and options) and the bubble and line boxes of a layout."""
+    rows = {}
+    bubbles = []
+    lines = []
+    for element in layout.elements:
+        if isinstance(element, Bubble):
+            rows.setdefault(element.row, []).append(element.option)
+            bubbles.append([element.row, element.option, *_round(element.x, element.y, element.w, element.h)])
+        elif isinstance(element, Line) and element.name:
+            lines.append([element.name, None, *_round(element.x1, element.y1, element.x2 - element.x1, 0)])
+    for line in lines:
+        rows.setdefault(line[0], [])
+    return [{"label": label, "options": options} for label, options in rows.items()], bubbles, lines
+
+
+def build_manifest(layout, seed=None, n_up=1, sheet=None):
+    """The manifest of cards drawn from `layout`, `n_up` per sheet (see imposition.py)."""
+    key = (layout, None if seed is None else str(seed), n_up, sheet)
+    if key in _manifests:
+        return _manifests[key]
+
+    if n_up > 1:
+        grid = plan_grid(n_up, (layout.width, layout.height), sheet or default_sheet(n_up))
+        page = _round(grid.sheet_width, grid.sheet_height)
+        slots = [_round(*slot_transform(grid, slot)) for slot in range(n_up)]
+    else:
+        page = _round(layout.width, layout.height)
+        slots = [[0, 0, 1]]
+    rows, bubbles, lines = _boxes(layout)
+    manifest = {
+        "style": layout.style,
+        # The hand-drawn jitter of a skeleton comes from the seed; the boxes do not
+        "seed": None if seed is None else str(seed),
+        "page": {"width": page[0], "height": page[1]},
+        "card": dict(zip(("width", "height"), _round(layout.width, layout.height))),
+        "n_up": n_up,
+        # Card i of a batch is in slot i % n_up of its sheet, where its point (x, y) lies at
+        # (slot x + x * scale, slot y + y * scale)
+        "slots": {"columns": ["x", "y", "scale"], "values": slots},
+        "rows": rows,
+        "columns": list(BOX_COLUMNS),
+        "bubbles": bubbles,
+        "lines": lines,
+    }
+    _manifests[key] = manifest
+    return manifest
+
+
+def binary_records(manifest):
+    """The boxes of a manifest as an array('f') of BINARY_COLUMNS records."""
+    index = {row["label"]: (number, row["options"]) for number, row in enumerate(manifest["rows"])}
+    records = array("f")
+    for kind, boxes in ((BUBBLE, manifest["bubbles"]), (LINE, manifest["lines"])):
+        for label, option, x, y, w, h in boxes:
+            number, options = index[label]
+            records.extend((kind, number, options.index(option) if option is not None else -1, x, y, w, h))
+    return records
+
+
+def write_manifest(manifest, path):
+    """Write the manifest as JSON to `path` and its boxes in binary next to it (same name, .bin)."""
+    path = Path(path)
+    binary_path = path.with_suffix(".bin")
+    records = binary_records(manifest)
+    data = dict(manifest, binary={
+        "file": binary_path.name,
+        "format": "<f4",
+        "columns": list(BINARY_COLUMNS),
+        "count": len(records) // len(BINARY_COLUMNS),
+    })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    if sys.byteorder != "little":
+        records.byteswap()
+    with open(binary_path, "wb") as f:
+        records.tofile(f)
+    return binary_path
+
@@ -0,0 +1,70 @@
+"""
+Quality levels: how much of the decorative detail the card styles draw.
+
+The hand-drawn effects have a fixed cost per skeleton or page: every pencil
+line and bubble is stroked twice with different jitter, the vintage boxes
+get a swirly outer frame with diamonds and every vintage page a paper
+texture of 60 Bezier blobs, 3 rings and 40 ink dots. For a preview on
+screen or a draft run most of that is invisible, so a level scales it down:
+
+  level    texture   double strokes   curves per blob   ornaments
+  draft    1/4       no               2                 none
+  screen   1/2       no               3                 outer frame
+  print    all       yes              5                 outer frame, diamonds
+
+`print` is the default and draws the cards exactly as before. `texture` is
+the share of the vector paper's stains, rings and dots that is drawn (the
+raster paper, see paper_raster.py, is drawn in full at every level).
+
+choose_level() picks the highest level that renders a card within a time
+budget, by timing a few sample cards per level on this machine:
+
+    level = choose_level(lambda level, count: render(count, quality=level), budget=0.05)
+"""
+import time
+from collections import namedtuple
+
+# ornaments: 0 = plain vintage boxes, 1 = with the swirly outer frame, 2 = also with the diamonds
+Quality = namedtuple("Quality", "name texture double_strokes blob_curves ornaments")
+
+# From the least to the most detail
+LEVELS = {
+    "draft": Quality("draft", 0.25, False, 2, 0),
+    "screen": Quality("screen", 0.5, False, 3, 1),
+    "print": Quality("print", 1.0, True, 5, 2),
+}
+DEFAULT = "print"
+
+# Cards rendered per level when timing it; the skeleton is drawn once among them, as in a batch
+SAMPLE_CARDS = 4
+
+
+def get_quality(name):
+    """The Quality of a level name."""
+    if name not in LEVELS:
+        raise ValueError(f"Unknown quality '{name}', choose from: {', '.join(LEVELS)}")
+    return LEVELS[name]
+
+
+def scaled(count, quality):
+    """`count` decorative items at `quality`, at least one of any there are."""
+    return max(1, round(count * quality.texture)) if count else 0
+
+
+def choose_level(render, budget, sample=SAMPLE_CARDS):
+    """
+    The name of the highest level at which cards take at most `budget`
+    seconds each, or the lowest level if none does.
+
+    render(level, count) draws `count` cards at `level`; its first call is a
+    warm-up (fonts, layout) and is not timed. Levels are tried from the top,
+    so a generous budget costs only one timed sample.
+    """
+    levels = list(reversed(LEVELS))
+    render(levels[-1], 1)
+    for name in levels:
+        start = time.perf_counter()
+        render(name, sample)
+        if (time.perf_counter() - start) / sample <= budget:
+            return name
+    return levels[-1]
@@ -0,0 +1,22 @@
+"""
+Seeded random streams for the hand-drawn effects (pencil jitter, paper texture).
+
+Every card of a batch gets its own random.Random derived from the batch seed
+and the card's position in the batch, so a card looks the same whether it is
+rendered alone, in a serial batch, in a parallel shard or in a resumed run.
+"""
+import hashlib
+import random
+
+
+def card_random(seed, key):
+    """
+    Return an independent random.Random for `key` (a card index, or a name
+    such as "skeleton") within a batch seeded with `seed`.
+
+    With seed=None the stream is seeded from the OS, i.e. not reproducible.
+    """
+    if seed is None:
+        return random.Random()
+    digest = hashlib.sha256(f"{seed}:{key}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
@@ -0,0 +1,306 @@
+"""
+The render pipeline all card styles share, with the styles as pluggable backends.
+
+A style is a StyleBackend: the fonts and wording of its card (card_style(),
+from which card_layout builds the layout plan), its ink colours and the
+primitives that draw the elements of the plan (text, writing lines,
+bubbles, boxes), plus optionally a background per page (the vintage
+paper). Everything else is done here, once for every style: the canvas,
+the skeleton drawn as a shared form, the header values, N-up imposition,
+form fields and the page loop.
+
+The primitives draw into display lists (see display_list.py), not onto
+the canvas: the skeleton and the backgrounds are recorded once and then
+replayed into the PDF, or by render_svg() into one SVG file per card.
+Seeded display lists are kept for the rest of the process, so the same
+cards in another format only cost the replay.
+
+    render_cards("cards.pdf", [{"name": "Barolo"}, {"name": "Sancerre", "style": "vintage"}],
+                 style="handwritten", seed="2026")
+
+Every card is drawn in the style named by its "style" entry, or `style`.
+One PDF can therefore mix styles: each style used gets its own skeleton
+form (and paper textures), and they all share the caches of the process,
+i.e. the layouts, font metrics, form recordings and raster textures.
+
+The create_*_card functions of the generator scripts are render_cards()
+with their own style; a batch of one style draws exactly what they drew.
+"""
+import importlib
+import json
+import os
+from collections import namedtuple
+
+from reportlab.lib.pagesizes import A4
+
+from card_fields import CardFields
+from card_layout import Box, Bubble, Line, Text, build_card_layout
+from card_quality import get_quality
+from card_schema import compile_schema
+from display_list import Recorder, cached, replay, to_svg
+from font_metrics import string_width
+from form_cache import draw_form
+from imposition import Imposition
+from render_trace import section, traced, watch
+from state_canvas import StateCanvas
+
+# Style name -> (module, backend class). Modules are imported when a card of the style is drawn
+BACKENDS = {
+    "vintage": ("generate_wine_tasting_sheet_vintage", "VintageBackend"),
+    "handwritten": ("generate_wine_tasting_sheet_handwritten", "HandwrittenBackend"),
+    "sketchy": ("generate_wine_tasting_sheet_sketchy", "SketchyBackend"),
+}
+
+
+def get_backend(name):
+    """The StyleBackend class of a style name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown style '{name}', choose from: {', '.join(BACKENDS)}")
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+# What StyleBackend.background() returns: cards with the same `name` share one form of the display list,
+# recorded by form_cache under `key` (None: not kept); name None draws the list on the card itself
+Background = namedtuple("Background", "name key display_list")
+
+
+class StyleBackend:
+    """
+    How a style draws: subclasses set `name`, `ink` (header values) and
+    `palette` (text colours by Text.color), and implement card_style(),
+    draw_line(), draw_bubble() and draw_box().
+
+    A backend is made per PDF (or set of SVG files); `seed` and `quality`
+    are those of the batch. The primitives draw on `self.c`, the Recorder
+    of the display list being recorded (see record()). OPTIONS names the
+    keyword arguments of render_cards() the backend takes on top (e.g. the
+    vintage paper textures).
+    """
+    name = None
+    OPTIONS = ()
+    # Timed as sections while a trace runs (see render_trace.py)
+    TRACED = ("draw_text", "draw_line", "draw_bubble", "draw_box")
+
+    def __init__(self, seed=None, quality="print"):
+        self.c = None
+        self.seed = seed
+        self.quality = quality
+        self.level = get_quality(quality)
+        for name in self.TRACED:
+            setattr(self, name, traced(getattr(self, name)))
+
+    def card_style(self):
+        """Fonts, sizes and wording of the card, as used by card_layout."""
+        raise NotImplementedError
+
+    def end_form(self, c):
+        """Finish a form drawn with this style (the skeleton, textures)."""
+        c.endForm()
+
+    def record(self, draw, *args):
+        """Call draw(*args) with the primitives drawing into a new display list, and return the list."""
+        c, self.c = self.c, Recorder()
+        try:
+            draw(*args)
+            return self.c.finish()
+        finally:
+            self.c = c
+
+    def background(self, index):
+        """The Background drawn under the skeleton of card `index`, or None."""
+        return None
+
+    def draw_text(self, t):
+        c = self.c
+        c.setFillColor(self.palette[t.color])
+        c.setFont(t.font, t.size)
+        if t.angle:
+            c.saveState()
+            c.translate(t.x, t.y)
+            c.rotate(t.angle)
+            c.drawCentredString(0, 0, t.text)
+            c.restoreState()
+        elif t.align == "centre":
+            c.drawCentredString(t.x, t.y, t.text)
+        else:
+            c.drawString(t.x, t.y, t.text)
+
+    def draw_line(self, line):
+        raise NotImplementedError
+
+    def draw_bubble(self, x, y, w, h):
+        raise NotImplementedError
+
+    def draw_box(self, x, y, w, h):
+        raise NotImplementedError
+
+
+def _check_options(options):
+    """Raise TypeError for options no style backend takes."""
+    known = set()
+    for name in BACKENDS:
+        known.update(get_backend(name).OPTIONS)
+    unknown = sorted(set(options) - known)
+    if unknown:
+        raise TypeError(f"render_cards() got unexpected keyword argument(s): {', '.join(unknown)}")
+
+
+def _setup_style(name, seed, quality, schema, options):
+    """A backend for the style `name`, its layout, and the cache key and display list of its skeleton."""
+    backend_class = get_backend(name)
+    backend = backend_class(seed, quality, **{key: value for key, value in options.items()
+                                              if key in backend_class.OPTIONS})
+    with section("layout"):
+        card_style = backend.card_style()
+        layout = build_card_layout(card_style, schema)
+    key = None if seed is None else (name, str(seed), quality, json.dumps(card_style, sort_keys=True),
+                                     schema and schema.digest)
+    with section("skeleton"):
+        skeleton = cached(key, lambda: backend.record(draw_layout, backend, layout))
+    return backend, layout, key, skeleton
+
+
+def draw_layout(backend, layout):
+    """Draws everything that is the same on every card."""
+    for part in layout.sections:
+        with section(part.name):
+            for element in layout.elements[part.start:part.end]:
+                if isinstance(element, Text):
+                    backend.draw_text(element)
+                elif isinstance(element, Line):
+                    backend.draw_line(element)
+                elif isinstance(element, Bubble):
+                    backend.draw_bubble(element.x, element.y, element.w, element.h)
+                elif isinstance(element, Box):
+                    backend.draw_box(element.x, element.y, element.w, element.h)
+
+
+def draw_header_values(c, backend, layout, card):
+    """Writes the per-card values onto the header lines of the skeleton (`c`: a canvas or Recorder)."""
+    c.setFillColor(backend.ink)
+    for field in layout.fields:
+        value = card.get(field.name)
+        if not value:
+            continue
+        # Shrink long values so they stay on the line
+        value_size = field.size
+        value_w = string_width(value, field.font, value_size)
+        if value_w > field.x2 - field.x1 - 4:
+            value_size *= (field.x2 - field.x1 - 4) / value_w
+        c.setFont(field.font, value_size)
+        c.drawString(field.x1 + 2, field.y + 2, value)
+
+
+def render_cards(filename, cards=None, style="handwritten", seed=None, first_index=0, n_up=1, sheet=None,
+                 fillable=False, quality="print", schema=None, **options):
+    """
+    Draw `cards` (dicts of header values, one page or slot each; None for a
+    single blank card) into the PDF `filename`, each in the style of its
+    "style" entry or else `style`.
+
+    With a seed the output is reproducible: each card's randomness comes from
+    the seed and its index in the batch (first_index for resumed/sharded runs).
+    n_up > 1 prints that many scaled cards per `sheet` (see imposition.py).
+    fillable adds form fields for filling the cards in on screen (see card_fields.py).
+    quality is the level of decorative detail (see card_quality.py).
+    schema is the card schema every style draws (see card_schema.py), None
+    for the styles' own cards. Other options go to the backends that take
+    them (StyleBackend.OPTIONS).
+    """
+    if options:
+        _check_options(options)
+    if schema is not None:
+        schema = compile_schema(schema)
+    c = StateCanvas(filename, pagesize=A4, invariant=1 if seed is not None else None)
+    watch(c)  # counts operators and state changes while a trace runs
+
+    # Per style: its backend, layout, skeleton form and form fields, set up on first use
+    styles = {}
+
+    def replay_onto_canvas(display_list):
+        with section("replay"):
+            replay(display_list, c)
+
+    def setup(name):
+        backend, layout, skeleton_key, skeleton_list = _setup_style(name, seed, quality, schema, options)
+        # Everything except the header values is identical on every page, so the
+        # skeleton is drawn once as a Form XObject and stamped onto each card.
+        # With a seed the skeleton only depends on the style, quality and schema, so a recording of it
+        # is reused by later PDFs of this process (parallel shards, render server).
+        skeleton = "card_skeleton" if name == style else f"card_skeleton_{name}"
+        with section("skeleton"):
+            draw_form(c, skeleton, skeleton_key, lambda: replay_onto_canvas(skeleton_list), backend.end_form,
+                      bbox=(0, 0, layout.width, layout.height))
+        styles[name] = (backend, layout, skeleton, None)
+        return styles[name]
+
+    header_values = traced(draw_header_values)
+
+    def fields_of(name):
+        """The form fields of a style's cards, made on first use."""
+        backend, layout, skeleton, fields = styles[name]
+        if fields is None:
+            fields = CardFields(c, layout, ink=backend.ink)
+            styles[name] = (backend, layout, skeleton, fields)
+        return fields
+
+    layout = setup(style)[1]
+    imposition = Imposition(c, n_up, sheet, card_size=(layout.width, layout.height))
+    if fillable:
+        fields_of(style)
+    with section("pages"):
+        for index, card in enumerate(cards if cards is not None else [{}], start=first_index):
+            name = card.get("style") or style
+            if name not in styles:
+                setup(name)
+            backend, layout, skeleton, _ = styles[name]
+            fields = fields_of(name) if fillable else None
+            background = backend.background(index)
+            if background and background.name and not c.hasForm(background.name):
+                # Forms are defined outside the card's slot on the sheet
+                draw_form(c, background.name, background.key, lambda: replay_onto_canvas(background.display_list),
+                          backend.end_form, bbox=(0, 0, layout.width, layout.height))
+            with imposition.card():
+                if background and background.name:
+                    c.doForm(background.name)
+                elif background:
+                    replay_onto_canvas(background.display_list)
+                c.doForm(skeleton)
+                header_values(c, backend, layout, card)
+                if fields:
+                    fields.add(f"card{index}", card)
+        imposition.close()
+
+    with section("save"):
+        c.save()
+
+
+def render_svg(directory, cards=None, style="handwritten", seed=None, first_index=0, quality="print", schema=None,
+               **options):
+    """
+    Draw `cards` like render_cards(), but each into its own SVG file
+    card{index}.svg in `directory`, from the same display lists: with a seed,
+    cards already drawn into a PDF by this process are only replayed.
+    N-up sheets and form fields are PDF only. Returns the number of cards written.
+    """
+    if options:
+        _check_options(options)
+    if schema is not None:
+        schema = compile_schema(schema)
+    os.makedirs(directory, exist_ok=True)
+    styles = {}
+    count = 0
+    for index, card in enumerate(cards if cards is not None else [{}], start=first_index):
+        name = card.get("style") or style
+        if name not in styles:
+            styles[name] = _setup_style(name, seed, quality, schema, options)
+        backend, layout, _, skeleton = styles[name]
+        background = backend.background(index)
+        header = Recorder()
+        draw_header_values(header, backend, layout, card)
+        lists = ([background.display_list] if background else []) + [skeleton, header.finish()]
+        with open(os.path.join(directory, f"card{index}.svg"), "w", encoding="utf-8") as f:
+            f.write(to_svg(lists, layout.width, layout.height))
+        count += 1
+    return count
@@ -0,0 +1,285 @@
+"""
+Card schemas: what a tasting card asks, as data instead of code.
+
+A schema lists the sections of the card (Visual, Smell, ...) with their rows,
+the aroma groups and where the notes box goes. It is a plain dict, usually
+loaded from a JSON or TOML file:
+
+    {
+      "sections": [
+        {"name": "visual", "title": "Visual", "rows": [
+          {"type": "criteria", "label": "Clarity", "options": ["Clear", "Hazy"]},
+          {"type": "text", "label": "Hue", "lines": ["White: Straw – Gold", "Red: Ruby – Garnet"]}
+        ]},
+        {"name": "verdict", "title": "Verdict", "rows": [
+          {"type": "scale", "label": "Rating", "options": ["Flawed", "Average", "Good", "Exceptional"]}
+        ]}
+      ],
+      "aroma": {"title": "AROMAS & FLAVORS", "groups": [{"name": "Fruit", "items": ["Citrus: lemon, lime"]}]},
+      "notes": {"title": "NOTES", "from": "visual", "to": "visual"}
+    }
+
+Row types:
+
+  criteria  label and a scale of options with a bubble under each ("bubbles":
+            false for plain text; "spacing" moves the options, default 80)
+  scale     label and a wider spaced row of bubbles (the Rating/Status rows)
+  inputs    label and one writing line per sub-label ("sub_labels", default
+            the style's, e.g. Grapes/Winemaking/Maturation)
+  input     label and one writing line
+  text      label and lines of plain text (the Hue row)
+
+Without "aroma" the card gets the aroma box of its style; without "notes" it
+has no notes box. The notes box stands to the right of the sections from
+"from" to "to". The header (wine name, producer, ...) is not part of the
+schema: it holds the values a batch fills in.
+
+compile_schema() validates a schema and turns it into an immutable
+CardSchema. Compiled schemas are kept by the hash of their contents, and
+card_layout memoizes the layout plan of every (style, schema) pair, so a
+batch, or a render server running several card variants, compiles and lays
+out each variant once. default_schema() is the card the styles draw without
+a schema; `--export-schema` writes it out as a starting point.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from pathlib import Path
+
+# --- Compiled schema ---
+Criteria = namedtuple("Criteria", "label options spacing bubbles")
+Scale = namedtuple("Scale", "label options")
+# sub_labels None: the style's
+Inputs = namedtuple("Inputs", "label sub_labels")
+Input = namedtuple("Input", "label")
+TextRow = namedtuple("TextRow", "label lines")
+
+SchemaSection = namedtuple("SchemaSection", "name title rows")
+# aroma_groups None: the style's; notes None: no notes box, else (title, from section, to section)
+CardSchema = namedtuple("CardSchema", "digest sections aroma_title aroma_groups notes")
+
+ROW_TYPES = {"criteria": Criteria, "scale": Scale, "inputs": Inputs, "input": Input, "text": TextRow}
+
+# Layout sections of every card; schema sections may not take these names
+RESERVED_SECTIONS = {"header", "aroma_box", "notes_box"}
+
+# Form fields of the card header; rows become fields named after their labels, so they may not take these
+HEADER_FIELDS = ("name", "producer", "region", "varietals", "vintage", "date")
+
+DEFAULT_AROMA_TITLE = "AROMAS & FLAVORS"
+DEFAULT_NOTES_TITLE = "NOTES"
+
+_schemas = {}
+
+
+def default_schema(style):
+    """The schema of the card the styles have always drawn, with the wording of `style` (a card_style() dict)."""
+    def criteria(label, options, **extra):
+        return dict(type="criteria", label=label, options=[option.strip() for option in options.split("–")], **extra)
+
+    return {
+        "sections": [
+            {"name": "visual", "title": "Visual", "rows": [
+                criteria("Clarity", "Clear – Hazy"),
+                criteria("Depth", "Pale – Medium – Dark"),
+                {"type": "text", "label": "Hue", "lines": ["White: Straw – Yellow – Gold – Amber",
+                                                           "Rosé: Pink – Salmon – Copper",
+                                                           "Red: Purple – Ruby – Garnet – Brick"]},
+            ]},
+            {"name": "smell", "title": "Smell", "rows": [
+                criteria("Condition", "Clean – Faulty?"),
+                criteria("Strength", "Light – Moderate – Powerful"),
+                {"type": "inputs", "label": "Aromas", "sub_labels": list(style["sub_labels"])},
+                criteria("Aging", style["aging_scale"]),
+            ]},
+            {"name": "taste", "title": "Taste", "rows": [
+                # Generic sweetness scale
+                criteria("Sweetness", "Bone Dry – Dry – Semi-Dry – Semi-Sweet – Sweet", spacing=60),
+                criteria("Tartness", "Low – Moderate – Crisp – High"),
+                criteria("Tannins", "Low – Moderate – Chewy – High"),
+                criteria("Alcohol", "Low – Moderate – High"),
+                criteria("Body", "Light – Medium – Full"),
+                criteria("Bubbles", "Still – Gentle – Aggressive"),
+                criteria("Intensity", "Subtle – Moderate – Intense"),
+                {"type": "inputs", "label": "Flavors", "sub_labels": list(style["sub_labels"])},
+                criteria("Finish", "Short – Moderate – Long – Persistent"),
+            ]},
+            {"name": "verdict", "title": "Verdict", "rows": [
+                # Generic quality and readiness scales
+                {"type": "scale", "label": "Rating",
+                 "options": ["Flawed", "Below Avg", "Average", "Good", "Excellent", "Exceptional"]},
+                {"type": "scale", "label": "Status",
+                 "options": ["Needs Time", "Ready to Drink", "At Peak", "Declining"]},
+            ]},
+        ],
+        "aroma": {"title": DEFAULT_AROMA_TITLE,
+                  "groups": [{"name": name, "items": list(items)} for name, items in style["aroma_data"]]},
+        "notes": {"title": DEFAULT_NOTES_TITLE, "from": "smell", "to": "taste"},
+    }
+
+
+def schema_digest(data):
+    """Hash of a schema's contents; equal schemas have equal digests however they were written."""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def load_schema(path):
+    """Read a schema from a .json or .toml file (TOML needs Python 3.11, or the tomli package)."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("TOML schemas need Python 3.11 or later, or the tomli package; "
+                                 "use a JSON schema instead") from None
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    raise ValueError(f"Unsupported schema format: {path.name} (use .json or .toml)")
+
+
+def _fail(where, message):
+    raise ValueError(f"Card schema: {where}: {message}")
+
+
+def _text(value, where):
+    if not isinstance(value, str) or not value.strip():
+        _fail(where, "expected a non-empty string")
+    return value
+
+
+def _texts(value, where):
+    if not isinstance(value, list) or not value:
+        _fail(where, "expected a non-empty list of strings")
+    return tuple(_text(item, f"{where}[{i}]") for i, item in enumerate(value))
+
+
+def _keys(entry, allowed, where):
+    if not isinstance(entry, dict):
+        _fail(where, "expected an object")
+    unknown = sorted(set(entry) - set(allowed))
+    if unknown:
+        _fail(where, f"unknown key(s) {', '.join(unknown)}")
+
+
+def _row(entry, where):
+    _keys(entry, ("type", "label", "options", "spacing", "bubbles", "sub_labels", "lines"), where)
+    kind = entry.get("type")
+    if kind not in ROW_TYPES:
+        _fail(where, f"unknown row type {kind!r}, choose from: {', '.join(ROW_TYPES)}")
+    allowed = {"type", "label"} | {"criteria": {"options", "spacing", "bubbles"}, "scale": {"options"},
+                                   "inputs": {"sub_labels"}, "input": set(), "text": {"lines"}}[kind]
+    _keys(entry, allowed, f"{where} ({kind})")
+    label = _text(entry.get("label"), f"{where}.label")
+    if kind == "criteria":
+        spacing = entry.get("spacing", 80)
+        if not isinstance(spacing, (int, float)) or isinstance(spacing, bool) or spacing < 0:
+            _fail(f"{where}.spacing", "expected a number of points")
+        bubbles = entry.get("bubbles", True)
+        if not isinstance(bubbles, bool):
+            _fail(f"{where}.bubbles", "expected true or false")
+        return Criteria(label, _texts(entry.get("options"), f"{where}.options"), spacing, bubbles)
+    if kind == "scale":
+        return Scale(label, _texts(entry.get("options"), f"{where}.options"))
+    if kind == "inputs":
+        sub_labels = entry.get("sub_labels")
+        return Inputs(label, None if sub_labels is None else _texts(sub_labels, f"{where}.sub_labels"))
+    if kind == "input":
+        return Input(label)
+    return TextRow(label, _texts(entry.get("lines"), f"{where}.lines"))
+
+
+def _field_names(row):
+    """The names of the form fields (and manifest rows) a row makes: its label, for inputs also one per line."""
+    if isinstance(row, (Scale, Input)) or (isinstance(row, Criteria) and row.bubbles):
+        return (row.label,)
+    if isinstance(row, Inputs):
+        return (row.label,) + tuple(f"{row.label} {sub}" for sub in row.sub_labels or ())
+    return ()
+
+
+def _compile(data, digest):
+    _keys(data, ("sections", "aroma", "notes"), "schema")
+    sections = data.get("sections")
+    if not isinstance(sections, list) or not sections:
+        _fail("sections", "expected a non-empty list of sections")
+    compiled = []
+    names = set()
+    for i, section in enumerate(sections):
+        where = f"sections[{i}]"
+        _keys(section, ("name", "title", "rows"), where)
+        name = _text(section.get("name"), f"{where}.name")
+        if name in names or name in RESERVED_SECTIONS:
+            _fail(f"{where}.name", f"{name!r} is taken")
+        names.add(name)
+        title = _text(section.get("title", name), f"{where}.title")
+        rows = section.get("rows")
+        if not isinstance(rows, list) or not rows:
+            _fail(f"{where}.rows", "expected a non-empty list of rows")
+        compiled.append(SchemaSection(name, title, tuple(_row(row, f"{where}.rows[{j}]")
+                                                         for j, row in enumerate(rows))))
+
+    # Two rows with one label would become one form field and one manifest row, e.g. a radio group
+    # with the bubbles of both; compared without case, as a scan or a spreadsheet would mix them up too
+    owners = {field: "the card header" for field in HEADER_FIELDS}
+    for i, part in enumerate(compiled):
+        for j, row in enumerate(part.rows):
+            for field in _field_names(row):
+                owner = owners.setdefault(field.casefold(), f"sections[{i}].rows[{j}]")
+                if owner == "the card header":
+                    _fail(f"sections[{i}].rows[{j}].label", f"{field!r} is a field of the card header")
+                if owner != f"sections[{i}].rows[{j}]":
+                    _fail(f"sections[{i}].rows[{j}].label",
+                          f"{field!r} is already a field of {owner}; row labels must be unique across the card "
+                          f"(e.g. \"Nose {row.label}\" and \"Palate {row.label}\")")
+
+    aroma_title, aroma_groups = DEFAULT_AROMA_TITLE, None
+    if "aroma" in data:
+        aroma = data["aroma"]
+        _keys(aroma, ("title", "groups"), "aroma")
+        aroma_title = _text(aroma.get("title", DEFAULT_AROMA_TITLE), "aroma.title")
+        groups = aroma.get("groups")
+        if not isinstance(groups, list) or not groups:
+            _fail("aroma.groups", "expected a non-empty list of groups")
+        aroma_groups = []
+        for i, group in enumerate(groups):
+            _keys(group, ("name", "items"), f"aroma.groups[{i}]")
+            aroma_groups.append((_text(group.get("name"), f"aroma.groups[{i}].name"),
+                                 _texts(group.get("items"), f"aroma.groups[{i}].items")))
+        aroma_groups = tuple(aroma_groups)
+
+    notes = None
+    if data.get("notes") is not None:
+        _keys(data["notes"], ("title", "from", "to"), "notes")
+        order = [section.name for section in compiled]
+        ends = []
+        for end in ("from", "to"):
+            name = data["notes"].get(end)
+            if name not in order:
+                _fail(f"notes.{end}", f"expected one of the section names {', '.join(order)}")
+            ends.append(name)
+        if order.index(ends[0]) > order.index(ends[1]):
+            _fail("notes", "the 'from' section comes after the 'to' section")
+        notes = (_text(data["notes"].get("title", DEFAULT_NOTES_TITLE), "notes.title"), ends[0], ends[1])
+
+    return CardSchema(digest, tuple(compiled), aroma_title, aroma_groups, notes)
+
+
+def compile_schema(data):
+    """
+    Validate a schema dict and return it as a CardSchema, compiled once per
+    distinct contents. Raises ValueError naming the offending entry.
+    """
+    if isinstance(data, CardSchema):
+        return data
+    digest = schema_digest(data)
+    if digest not in _schemas:
+        _schemas[digest] = _compile(data, digest)
+    return _schemas[digest]
@@ -0,0 +1,504 @@
+"""
+Display lists: what the style backends draw, recorded as data and replayed into a PDF or an SVG.
+
+The drawing helpers do not draw on the reportlab canvas itself. They draw on
+a Recorder, which has the canvas methods they use and appends each call as
+an op to a DisplayList:
+
+    recorder = Recorder()
+    recorder.setStrokeColor(grey); recorder.line(10, 10, 200, 10)
+    display_list = recorder.finish()
+    replay(display_list, c)                                 # onto a reportlab canvas
+    svg = to_svg([display_list], width, height)             # or into an SVG document
+    data = display_list.dumps(); DisplayList.loads(data)    # or stored away
+
+A display list is three flat arrays, not one object per op: the opcodes
+(one byte each), all of their numbers in one array of doubles, and a table
+of the strings (texts, font names) and JPEG images the ops refer to by
+index. A card skeleton of about 1,000 ops takes under 30 KB and is replayed
+without running any of the drawing code again, so the random jitter and
+stains stay exactly as they were recorded.
+
+Ops and their numbers:
+
+  fill, stroke        colour r, g, b, alpha
+  width               line width
+  dash                phase, count, then count dash lengths
+  font                font name (string), size, leading (NaN: reportlab's default)
+  save, restore       graphics state
+  translate, rotate   dx, dy / degrees
+  text, centred_text  x, y, text (string)
+  line                x1, y1, x2, y2
+  rect                x, y, width, height, stroke, fill
+  round_rect          x, y, width, height, radius, stroke, fill
+  circle              x, y, radius, stroke, fill
+  move_to, line_to    x, y (path construction, drawn by draw_path)
+  curve_to            x1, y1, x2, y2, x3, y3
+  close
+  draw_path           stroke, fill
+  image               JPEG (image), width, height; drawn over (0, 0, width, height)
+
+Replaying onto a StateCanvas makes the same calls the drawing code made, so
+the PDF is byte-for-byte the one drawing directly would have produced.
+cached() keeps seeded display lists for the rest of the process, so drawing
+a card again, in the same or another format, only costs the replay.
+"""
+import base64
+import json
+import math
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from reportlab.lib.colors import Color, toColor
+from reportlab.pdfbase import pdfmetrics
+
+import render_trace
+
+(FILL, STROKE, WIDTH, DASH, FONT, SAVE, RESTORE, TRANSLATE, ROTATE, TEXT, CENTRED_TEXT, LINE, RECT, ROUND_RECT,
+ CIRCLE, MOVE_TO, LINE_TO, CURVE_TO, CLOSE, DRAW_PATH, IMAGE) = range(21)
+
+OP_NAMES = ("fill", "stroke", "width", "dash", "font", "save", "restore", "translate", "rotate", "text",
+            "centred_text", "line", "rect", "round_rect", "circle", "move_to", "line_to", "curve_to", "close",
+            "draw_path", "image")
+
+# Numbers per op; None for dash, whose second number is the count of the ones after it
+ARGUMENTS = (4, 4, 1, None, 3, 0, 0, 2, 1, 3, 3, 4, 6, 7, 5, 2, 2, 6, 0, 2, 3)
+
+MAGIC = b"WTDL1\n"
+
+# Display lists kept in memory by cached(); a skeleton is roughly 30 KB, a raster texture 100-300 KB
+MAX_LISTS = 32
+
+_lists = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+class DisplayList:
+    """Recorded drawing ops: opcodes, their numbers and the strings and images they refer to."""
+
+    def __init__(self, ops=None, args=None, strings=(), images=()):
+        self.ops = ops if ops is not None else array("B")
+        self.args = args if args is not None else array("d")
+        self.strings = list(strings)
+        self.images = list(images)
+        # Which trace sections drew which ops, if recorded while a trace ran (see render_trace.regroup)
+        self.sections = ()
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        """(opcode, numbers) of every op in order."""
+        args = self.args
+        i = 0
+        for op in self.ops:
+            n = ARGUMENTS[op]
+            if n is None:
+                n = 2 + int(args[i + 1])
+            yield op, args[i:i + n]
+            i += n
+
+    @property
+    def nbytes(self):
+        """Size of the list in memory, roughly."""
+        return (len(self.ops) + self.args.itemsize * len(self.args) + sum(len(s) for s in self.strings)
+                + sum(len(image) for image in self.images))
+
+    def dumps(self):
+        """The list as bytes, for DisplayList.loads()."""
+        args = self.args
+        if sys.byteorder != "little":
+            args = array("d", args)
+            args.byteswap()
+        header = json.dumps({"ops": len(self.ops), "args": len(args), "strings": self.strings,
+                             "images": [len(image) for image in self.images]}, ensure_ascii=False).encode("utf-8")
+        return b"".join([MAGIC, struct.pack("<I", len(header)), header, self.ops.tobytes(), args.tobytes()]
+                        + self.images)
+
+    @classmethod
+    def loads(cls, data):
+        """Read a list written by dumps(); raises ValueError for anything else."""
+        data = memoryview(data)
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a display list")
+        start = len(MAGIC) + 4
+        (header_size,) = struct.unpack("<I", data[len(MAGIC):start])
+        header = json.loads(bytes(data[start:start + header_size]))
+        start += header_size
+        ops = array("B")
+        ops.frombytes(data[start:start + header["ops"]])
+        start += header["ops"]
+        args = array("d")
+        args.frombytes(data[start:start + 8 * header["args"]])
+        start += 8 * header["args"]
+        if sys.byteorder != "little":
+            args.byteswap()
+        images = []
+        for size in header["images"]:
+            images.append(bytes(data[start:start + size]))
+            start += size
+        return cls(ops, args, header["strings"], images)
+
+
+class _Path:
+    """What Recorder.beginPath() returns: collects path ops until the path is drawn."""
+
+    def __init__(self):
+        self.ops = []
+
+    def moveTo(self, x, y):
+        self.ops.append((MOVE_TO, (x, y)))
+
+    def lineTo(self, x, y):
+        self.ops.append((LINE_TO, (x, y)))
+
+    def curveTo(self, x1, y1, x2, y2, x3, y3):
+        self.ops.append((CURVE_TO, (x1, y1, x2, y2, x3, y3)))
+
+    def close(self):
+        self.ops.append((CLOSE, ()))
+
+
+class Recorder:
+    """
+    Takes the place of the canvas for the drawing helpers: the canvas methods
+    they use, appending ops to a display list. finish() returns the list.
+    """
+
+    def __init__(self):
+        self._ops = array("B")
+        self._args = array("d")
+        self._strings = []
+        self._string_index = {}
+        self._images = []
+        # While a trace runs: (first op, sections open below the recorder's own) wherever those change
+        self._sections = [] if render_trace.active() else None
+        self._depth = len(render_trace.frames())
+
+    def _op(self, op, *args):
+        if self._sections is not None:
+            frames = render_trace.frames()[self._depth:]
+            if not self._sections or self._sections[-1][1] != frames:
+                self._sections.append((len(self._ops), frames))
+        self._ops.append(op)
+        self._args.extend(args)
+
+    def _string(self, text):
+        index = self._string_index.get(text)
+        if index is None:
+            index = self._string_index[text] = len(self._strings)
+            self._strings.append(text)
+        return index
+
+    def finish(self):
+        """The display list of everything drawn so far."""
+        display_list = DisplayList(self._ops, self._args, self._strings, self._images)
+        display_list.sections = tuple(self._sections or ())
+        return display_list
+
+    # --- state ---
+
+    def _color(self, op, color, alpha):
+        if not isinstance(color, Color):
+            color = toColor(color)
+        if alpha is None:
+            alpha = color.alpha
+        self._op(op, color.red, color.green, color.blue, alpha)
+
+    def setFillColor(self, aColor, alpha=None):
+        self._color(FILL, aColor, alpha)
+
+    def setStrokeColor(self, aColor, alpha=None):
+        self._color(STROKE, aColor, alpha)
+
+    def setLineWidth(self, width):
+        self._op(WIDTH, width)
+
+    def setDash(self, array=[], phase=0):
+        self._op(DASH, phase, len(array), *array)
+
+    def setFont(self, psfontname, size, leading=None):
+        self._op(FONT, self._string(psfontname), size, math.nan if leading is None else leading)
+
+    def saveState(self):
+        self._op(SAVE)
+
+    def restoreState(self):
+        self._op(RESTORE)
+
+    def translate(self, dx, dy):
+        self._op(TRANSLATE, dx, dy)
+
+    def rotate(self, theta):
+        self._op(ROTATE, theta)
+
+    # --- drawing ---
+
+    def drawString(self, x, y, text):
+        self._op(TEXT, x, y, self._string(text))
+
+    def drawCentredString(self, x, y, text):
+        self._op(CENTRED_TEXT, x, y, self._string(text))
+
+    def line(self, x1, y1, x2, y2):
+        self._op(LINE, x1, y1, x2, y2)
+
+    def rect(self, x, y, width, height, stroke=1, fill=0):
+        self._op(RECT, x, y, width, height, stroke, fill)
+
+    def roundRect(self, x, y, width, height, radius, stroke=1, fill=0):
+        self._op(ROUND_RECT, x, y, width, height, radius, stroke, fill)
+
+    def circle(self, x_cen, y_cen, r, stroke=1, fill=0):
+        self._op(CIRCLE, x_cen, y_cen, r, stroke, fill)
+
+    def beginPath(self):
+        return _Path()
+
+    def drawPath(self, aPath, stroke=1, fill=0):
+        for op, args in aPath.ops:
+            self._op(op, *args)
+        self._op(DRAW_PATH, stroke, fill)
+
+    def drawJpeg(self, data, width, height):
+        """Draw the JPEG `data` over (0, 0, width, height)."""
+        self._images.append(data)
+        self._op(IMAGE, len(self._images) - 1, width, height)
+
+
+def _exact(value):
+    """Whole numbers as ints again, for the few operands reportlab writes with str() rather than fp_str()."""
+    return int(value) if value.is_integer() else value
+
+
+def replay(display_list, c):
+    """Draw a display list onto the reportlab canvas `c`, with the calls it was recorded from."""
+    strings = display_list.strings
+    path = None
+    ops = render_trace.regroup(display_list, display_list.sections) if display_list.sections else display_list
+    for op, a in ops:
+        if op == FILL:
+            c.setFillColor(Color(a[0], a[1], a[2], alpha=_exact(a[3])))
+        elif op == STROKE:
+            c.setStrokeColor(Color(a[0], a[1], a[2], alpha=_exact(a[3])))
+        elif op == WIDTH:
+            c.setLineWidth(a[0])
+        elif op == DASH:
+            c.setDash(list(a[2:]), _exact(a[0]))
+        elif op == FONT:
+            c.setFont(strings[int(a[0])], a[1], None if math.isnan(a[2]) else a[2])
+        elif op == SAVE:
+            c.saveState()
+        elif op == RESTORE:
+            c.restoreState()
+        elif op == TRANSLATE:
+            c.translate(a[0], a[1])
+        elif op == ROTATE:
+            c.rotate(a[0])
+        elif op == TEXT:
+            c.drawString(a[0], a[1], strings[int(a[2])])
+        elif op == CENTRED_TEXT:
+            c.drawCentredString(a[0], a[1], strings[int(a[2])])
+        elif op == LINE:
+            c.line(*a)
+        elif op == RECT:
+            c.rect(a[0], a[1], a[2], a[3], stroke=int(a[4]), fill=int(a[5]))
+        elif op == ROUND_RECT:
+            c.roundRect(a[0], a[1], a[2], a[3], a[4], stroke=int(a[5]), fill=int(a[6]))
+        elif op == CIRCLE:
+            c.circle(a[0], a[1], a[2], stroke=int(a[3]), fill=int(a[4]))
+        elif op == DRAW_PATH:
+            c.drawPath(path, stroke=int(a[0]), fill=int(a[1]))
+            path = None
+        elif op == IMAGE:
+            from paper_raster import draw_jpeg
+
+            draw_jpeg(c, display_list.images[int(a[0])], a[1], a[2])
+        else:
+            if path is None:
+                path = c.beginPath()
+            if op == MOVE_TO:
+                path.moveTo(a[0], a[1])
+            elif op == LINE_TO:
+                path.lineTo(a[0], a[1])
+            elif op == CURVE_TO:
+                path.curveTo(*a)
+            else:
+                path.close()
+
+
+# --- SVG ---
+
+# Families of the standard PDF fonts, with CSS fallbacks
+_SVG_FAMILIES = {
+    "Helvetica": "Helvetica, Arial, sans-serif",
+    "Times": "'Times New Roman', Times, serif",
+    "Courier": "'Courier New', Courier, monospace",
+}
+
+
+def _svg_number(value):
+    return f"{value:.3f}".rstrip("0").rstrip(".") or "0"
+
+
+def _svg_color(r, g, b):
+    return "#%02x%02x%02x" % tuple(max(0, min(255, round(v * 255))) for v in (r, g, b))
+
+
+def _svg_font(name):
+    """font-family, font-weight and font-style attributes for a reportlab font name."""
+    family, _, variant = name.partition("-")
+    if family in _SVG_FAMILIES:
+        attributes = f'font-family="{_SVG_FAMILIES[family]}"'
+        if "Bold" in variant:
+            attributes += ' font-weight="bold"'
+        if "Italic" in variant or "Oblique" in variant:
+            attributes += ' font-style="italic"'
+        return attributes
+    try:
+        # A TrueType font: the family it names itself, for viewers that have it installed
+        family = pdfmetrics.getFont(name).face.familyName
+        if isinstance(family, bytes):
+            family = family.decode("latin-1")
+    except (KeyError, AttributeError):
+        family = name
+    family = escape(family, {'"': "&quot;"})
+    return f'font-family="{family}, cursive"'
+
+
+def to_svg(display_lists, width, height):
+    """
+    An SVG document of `width` x `height` points with the display lists
+    drawn over each other, the first one at the bottom.
+
+    Text is set in the fonts the cards name, which the viewer needs to have
+    installed; it falls back to a similar generic family otherwise.
+    """
+    n = _svg_number
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{n(width)}pt" height="{n(height)}pt" '
+           f'viewBox="0 0 {n(width)} {n(height)}">',
+           # PDF coordinates: origin at the bottom left, y up
+           f'<g transform="matrix(1 0 0 -1 0 {n(height)})">']
+    state = {"fill": (0, 0, 0, 1), "stroke": (0, 0, 0, 1), "width": 1, "dash": (), "font": ("Helvetica", 12)}
+    stack = []
+    groups = 0  # <g> opened by translate/rotate since the last saveState
+
+    def paint(stroke, fill):
+        r, g, b, alpha = state["fill"]
+        attributes = f' fill="{_svg_color(r, g, b)}"' if fill else ' fill="none"'
+        if fill and alpha < 1:
+            attributes += f' fill-opacity="{n(alpha)}"'
+        if stroke:
+            r, g, b, alpha = state["stroke"]
+            attributes += f' stroke="{_svg_color(r, g, b)}" stroke-width="{n(state["width"])}"'
+            if alpha < 1:
+                attributes += f' stroke-opacity="{n(alpha)}"'
+            if state["dash"]:
+                attributes += f' stroke-dasharray="{" ".join(n(d) for d in state["dash"])}"'
+        return attributes
+
+    def text(a, anchor):
+        font, size = state["font"]
+        r, g, b, alpha = state["fill"]
+        opacity = f' fill-opacity="{n(alpha)}"' if alpha < 1 else ""
+        out.append(f'<text transform="translate({n(a[0])} {n(a[1])}) scale(1 -1)" {_svg_font(font)} '
+                   f'font-size="{n(size)}" fill="{_svg_color(r, g, b)}"{opacity}{anchor}>'
+                   f'{escape(strings[int(a[2])])}</text>')
+
+    path = []
+    for display_list in display_lists:
+        strings = display_list.strings
+        for op, a in display_list:
+            if op == FILL:
+                state["fill"] = tuple(a)
+            elif op == STROKE:
+                state["stroke"] = tuple(a)
+            elif op == WIDTH:
+                state["width"] = a[0]
+            elif op == DASH:
+                state["dash"] = tuple(a[2:])
+            elif op == FONT:
+                state["font"] = (strings[int(a[0])], a[1])
+            elif op == SAVE:
+                stack.append((dict(state), groups))
+                groups = 0
+            elif op == RESTORE:
+                out.append("</g>" * groups)
+                state, groups = stack.pop()
+            elif op == TRANSLATE:
+                out.append(f'<g transform="translate({n(a[0])} {n(a[1])})">')
+                groups += 1
+            elif op == ROTATE:
+                out.append(f'<g transform="rotate({n(a[0])})">')
+                groups += 1
+            elif op == TEXT:
+                text(a, "")
+            elif op == CENTRED_TEXT:
+                text(a, ' text-anchor="middle"')
+            elif op == LINE:
+                out.append(f'<line x1="{n(a[0])}" y1="{n(a[1])}" x2="{n(a[2])}" y2="{n(a[3])}"{paint(1, 0)}/>')
+            elif op == RECT or op == ROUND_RECT:
+                x, y, w, h = a[0], a[1], a[2], a[3]
+                radius = f' rx="{n(a[4])}"' if op == ROUND_RECT else ""
+                out.append(f'<rect x="{n(min(x, x + w))}" y="{n(min(y, y + h))}" width="{n(abs(w))}" '
+                           f'height="{n(abs(h))}"{radius}{paint(a[-2], a[-1])}/>')
+            elif op == CIRCLE:
+                out.append(f'<circle cx="{n(a[0])}" cy="{n(a[1])}" r="{n(a[2])}"{paint(a[3], a[4])}/>')
+            elif op == MOVE_TO:
+                path.append(f"M{n(a[0])} {n(a[1])}")
+            elif op == LINE_TO:
+                path.append(f"L{n(a[0])} {n(a[1])}")
+            elif op == CURVE_TO:
+                path.append("C" + " ".join(n(v) for v in a))
+            elif op == CLOSE:
+                path.append("Z")
+            elif op == DRAW_PATH:
+                # reportlab fills paths with the even-odd rule
+                out.append(f'<path d="{" ".join(path)}" fill-rule="evenodd"{paint(a[0], a[1])}/>')
+                path = []
+            elif op == IMAGE:
+                data = base64.b64encode(display_list.images[int(a[0])]).decode("ascii")
+                out.append(f'<image width="{n(a[1])}" height="{n(a[2])}" preserveAspectRatio="none" '
+                           f'transform="matrix(1 0 0 -1 0 {n(a[2])})" href="data:image/jpeg;base64,{data}"/>')
+    while stack:
+        out.append("</g>" * groups)
+        groups = stack.pop()[1]
+    out.append("</g>" * groups)
+    out.append("</g>\n</svg>\n")
+    return "\n".join(out)
+
+
+# --- cache ---
+
+def cached(key, record):
+    """
+    The display list recorded under `key`, calling record() for it the first
+    time. `key` must identify everything the list depends on (style, seed,
+    quality, ...); key=None records every time.
+    """
+    if key is None:
+        return record()
+    display_list = _lists.get(key)
+    if display_list is not None:
+        _lists.move_to_end(key)
+        _stats["hits"] += 1
+        return display_list
+    _stats["misses"] += 1
+    display_list = _lists[key] = record()
+    while len(_lists) > MAX_LISTS:
+        _lists.popitem(last=False)
+    return display_list
+
+
+def clear():
+    """Forget all cached display lists."""
+    _lists.clear()
+
+
+def stats():
+    """Cache counters of this process and the number and size of the lists kept."""
+    return dict(_stats, entries=len(_lists), max_entries=MAX_LISTS,
+                kilobytes=round(sum(display_list.nbytes for display_list in _lists.values()) / 1024))
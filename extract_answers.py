@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Pull the answers out of filled-in fillable cards (see card_fields.py) into a
+columnar table.
+
+Every returned PDF is scanned for its form field dictionaries only: object
+bodies are found with a regular expression, those that are no form field are
+skipped without being parsed, and page content, fonts and images are never
+decoded. Later copies of an object win, so PDFs saved by a viewer with
+incremental updates read right, and compressed object streams (which some
+viewers write) are unpacked. Fields are named card{index}.{row} by the
+generator, so each card becomes one table row.
+
+The table is a directory with one little-endian binary file per column and a
+table.json describing them:
+
+    category    the bubble rows (Clarity, ..., Rating, Status): int8 codes
+                into the row's options, as listed on the cards, -1 if blank
+    dictionary  the header values (name, producer, ...): int32 codes into the
+                values met so far, stored in table.json, -1 if blank
+    text        the written fields (Aromas Grapes, notes, ...): UTF-8 bytes
+                with an int64 offsets file, row i is data[offsets[i]:offsets[i + 1]]
+    int         file (line number in files.txt) and card (its index in the batch)
+
+Rows are written out every CHUNK_ROWS cards, so memory stays bounded by the
+largest input file and the distinct header values, whatever the number of
+files. The codes load in one call each:
+
+    columns, schema = load_table("answers")
+    columns["Sweetness"]  # int8 array, 0 = Bone Dry ... 4 = Sweet, -1 = blank
+
+Usage:
+    python extract_answers.py returned/*.pdf -o answers --jobs 8
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CHUNK_ROWS = 4096  # cards buffered before the column files are appended to
+BLANK = -1
+
+# The array typecode and stored dtype of each column kind
+COLUMN_TYPES = {"category": ("b", "<i1"), "dictionary": ("i", "<i4"), "int": ("i", "<i4"), "text": ("B", "|u1")}
+
+_OBJECT = re.compile(rb"(\d+)\s+\d+\s+obj\b")
+_STRING = rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>"
+_T = re.compile(rb"/T\s*(" + _STRING + rb")", re.S)
+_V = re.compile(rb"/V\s*(/[^\s/<>\[\]()]*|" + _STRING + rb")", re.S)
+_AS = re.compile(rb"/AS\s*/([^\s/<>\[\]()]*)")
+_PARENT = re.compile(rb"/Parent\s+(\d+)\s+\d+\s+R")
+_FIRST = re.compile(rb"/First\s+(\d+)")
+_FIELD = re.compile(rb"/T\s*[(<]|/AS\s*/")
+_CARD = re.compile(r"card(\d+)$")
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"\n": b"", b"\r": b""}
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|.)", re.S)
+
+
+# --- Reading the fields of a PDF ---
+
+def _unescape(match):
+    code = match.group(1)
+    if code[:1].isdigit():
+        return bytes([int(code, 8) & 0xFF])
+    return _ESCAPES.get(code, code)
+
+
+def _text(raw):
+    """Decode a PDF string or name token: (literal), <hex> or /Name."""
+    if raw.startswith(b"/"):
+        data = re.sub(rb"#([0-9A-Fa-f]{2})", lambda match: bytes([int(match.group(1), 16)]), raw[1:])
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return data.decode("latin-1")
+    if raw.startswith(b"<"):
+        digits = re.sub(rb"\s", b"", raw[1:-1])
+        data = bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii"))  # a missing last digit is 0
+    else:
+        data = _ESCAPE.sub(_unescape, raw[1:-1])
+    if data.startswith(b"\xfe\xff"):
+        return data[2:].decode("utf-16-be")
+    return data.decode("latin-1")
+
+
+def _unpack_stream(body):
+    """The objects packed in an object stream body (FlateDecode only): yields (number, body)."""
+    head, _, rest = body.partition(b"stream")
+    data = rest.lstrip(b"\r\n")
+    data = data[:data.rfind(b"endstream")]
+    if b"/FlateDecode" in head:
+        data = zlib.decompressobj().decompress(data)
+    first = int(_FIRST.search(head).group(1))
+    numbers = data[:first].split()
+    offsets = [int(offset) for offset in numbers[1::2]] + [len(data) - first]
+    for number, start, end in zip(numbers[::2], offsets, offsets[1:]):
+        yield int(number), data[first + start:first + end]
+
+
+def _field_objects(data):
+    """
+    The form field and widget objects of a PDF, number -> body. Objects are
+    taken in file order, so the last revision of each one is kept.
+    """
+    objects = {}
+    # Splitting at every endobj is much faster than looking for the headers with a regular expression
+    for piece in data.split(b"endobj"):
+        header = _OBJECT.search(piece)
+        if not header:
+            continue
+        body = piece[header.end():]
+        head = body.split(b"stream", 1)[0]
+        if b"/ObjStm" in head:
+            packed = _unpack_stream(body)
+        else:
+            packed = ((int(header.group(1)), head),)
+        for number, body in packed:
+            if _FIELD.search(body):
+                objects[number] = body
+            else:
+                objects.pop(number, None)  # replaced by something that is no field
+    return objects
+
+
+def read_fields(data):
+    """The filled-in values of the cards of a fillable PDF: [(card index, {field: value})], in card order."""
+    objects = _field_objects(data)
+    names, parents, values = {}, {}, {}
+    checked = {}  # radio group -> the option its selected widget shows
+    for number, body in objects.items():
+        parent = _PARENT.search(body)
+        if parent:
+            parents[number] = int(parent.group(1))
+        name = _T.search(body)
+        if name:
+            names[number] = _text(name.group(1))
+            value = _V.search(body)
+            if value:
+                values[number] = _text(value.group(1))
+        else:
+            state = _AS.search(body)
+            if parent and state and state.group(1) != b"Off":
+                checked[int(parent.group(1))] = _text(b"/" + state.group(1))
+
+    cards = {}
+    for number, name in names.items():
+        card = parents.get(number)
+        match = _CARD.match(names.get(card, ""))
+        if not match or card in parents:
+            continue
+        # Viewers set the value of a radio group; some only switch its widgets
+        value = values.get(number, checked.get(number))
+        fields = cards.setdefault(int(match.group(1)), {})
+        if value and value != "Off":
+            fields[name] = value
+    return sorted(cards.items())
+
+
+def read_file(path):
+    """Worker: the filled-in cards of one PDF."""
+    with open(path, "rb") as f:
+        return read_fields(f.read())
+
+
+# --- The table ---
+
+def table_schema(layouts):
+    """
+    The columns of the answer table for cards drawn from `layouts`: the
+    bubble rows with their options (in card order), the header fields and
+    the written fields.
+
+    The codes of a bubble row are its position on the printed scale, so a
+    row has to have the same options in every layout. Raises ValueError for
+    layouts that disagree (e.g. the sketchy style's Aging row).
+    """
+    from card_layout import Bubble, Line
+
+    rows, styles, header, written = {}, {}, [], []
+    for layout in layouts:
+        header_fields = [field.name for field in layout.fields]
+        options = {}
+        for element in layout.elements:
+            if isinstance(element, Bubble):
+                options.setdefault(element.row, []).append(element.option)
+            elif isinstance(element, Line) and element.name:
+                names = header if element.name in header_fields else written
+                if element.name not in names:
+                    names.append(element.name)
+        for row, row_options in options.items():
+            if rows.setdefault(row, row_options) != row_options:
+                raise ValueError(f"the {styles[row]} and {layout.style} cards have different options for {row} "
+                                 f"({', '.join(rows[row])} / {', '.join(row_options)}); read them separately")
+            styles.setdefault(row, layout.style)
+    columns = [{"name": "file", "kind": "int"}, {"name": "card", "kind": "int"}]
+    columns += [{"name": name, "kind": "dictionary", "categories": []} for name in header]
+    columns += [{"name": row, "kind": "category", "categories": options} for row, options in rows.items()]
+    columns += [{"name": name, "kind": "text"} for name in written + ["notes"]]
+    for number, column in enumerate(columns):
+        column["file"] = f"{number:02d}.bin"
+        column["dtype"] = COLUMN_TYPES[column["kind"]][1]
+        if column["kind"] == "text":
+            column["offsets"] = f"{number:02d}.offsets"
+    return {"rows": 0, "files": "files.txt", "columns": columns}
+
+
+class TableWriter:
+    """Appends cards to the column files of a table directory, CHUNK_ROWS at a time."""
+
+    def __init__(self, path, schema):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.columns = schema["columns"]
+        self.unknown = 0  # answers that are not among their row's options
+        self._codes = [{value: code for code, value in enumerate(column.get("categories", ()))}
+                       for column in self.columns]
+        self._buffers = [array(COLUMN_TYPES[column["kind"]][0]) for column in self.columns]
+        self._offsets = {number: array("q", [0]) for number, column in enumerate(self.columns)
+                         if column["kind"] == "text"}
+        self._text_size = dict.fromkeys(self._offsets, 0)
+        for column in self.columns:
+            open(self.path / column["file"], "wb").close()
+            if column["kind"] == "text":
+                with open(self.path / column["offsets"], "wb") as f:
+                    self._write(f, array("q", [0]))
+        self._files = open(self.path / schema["files"], "w", encoding="utf-8")
+        self._file_count = 0
+        self._pending = 0
+
+    @staticmethod
+    def _write(f, values):
+        if sys.byteorder != "little":
+            values = array(values.typecode, values)
+            values.byteswap()
+        values.tofile(f)
+
+    def add_file(self, name):
+        """Start the cards of another input file; returns its number."""
+        self._files.write(name.replace("\n", " ") + "\n")
+        self._file_count += 1
+        return self._file_count - 1
+
+    def append(self, file, card, fields):
+        """Add one card: its file number, its index in the batch and its {field: value}."""
+        for number, column in enumerate(self.columns):
+            kind, name, buffer = column["kind"], column["name"], self._buffers[number]
+            if kind == "int":
+                buffer.append(file if name == "file" else card)
+            elif kind == "text":
+                data = fields.get(name, "").encode("utf-8")
+                buffer.frombytes(data)
+                self._text_size[number] += len(data)
+                self._offsets[number].append(self._text_size[number])
+            else:
+                value = fields.get(name)
+                codes = self._codes[number]
+                if value and value not in codes:
+                    if kind == "category":
+                        self.unknown += 1
+                        value = None
+                    else:
+                        codes[value] = len(codes)
+                        column["categories"].append(value)
+                buffer.append(codes[value] if value else BLANK)
+        self.schema["rows"] += 1
+        self._pending += 1
+        if self._pending >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        for number, column in enumerate(self.columns):
+            with open(self.path / column["file"], "ab") as f:
+                self._write(f, self._buffers[number])
+            del self._buffers[number][:]
+            if number in self._offsets:
+                with open(self.path / column["offsets"], "ab") as f:
+                    self._write(f, self._offsets[number][1:])
+                del self._offsets[number][1:]
+        self._pending = 0
+
+    def close(self):
+        """Write the remaining rows and table.json."""
+        self.flush()
+        self._files.close()
+        with open(self.path / "table.json", "w", encoding="utf-8") as f:
+            json.dump(self.schema, f, ensure_ascii=False, indent=1)
+
+
+def load_table(path, columns=None):
+    """
+    The columns of a table directory as NumPy arrays, memory-mapped, and its
+    schema. Text columns are only decoded (into lists of str) when asked for
+    by name in `columns`.
+    """
+    import numpy as np
+
+    path = Path(path)
+    with open(path / "table.json", encoding="utf-8") as f:
+        schema = json.load(f)
+    loaded = {}
+    for column in schema["columns"]:
+        name = column["name"]
+        wanted = name in columns if columns is not None else column["kind"] != "text"
+        if not wanted:
+            continue
+        if os.path.getsize(path / column["file"]):
+            values = np.memmap(path / column["file"], column["dtype"], "r")
+        else:
+            values = np.zeros(0, column["dtype"])  # memmap cannot map an empty file
+        if column["kind"] == "text":
+            offsets = np.fromfile(path / column["offsets"], "<i8")
+            data = bytes(values)
+            values = [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+        loaded[name] = values
+    return loaded, schema
+
+
+# --- Extraction ---
+
+def extract(paths, table, jobs=None):
+    """Read the cards of every PDF in `paths` into the TableWriter `table`, on `jobs` processes; returns the count."""
+    def add(path, filled):
+        file = table.add_file(os.path.basename(path))
+        for card, fields in filled:
+            table.append(file, card, fields)
+        return len(filled)
+
+    cards = 0
+    if not jobs:
+        for path in paths:
+            cards += add(path, read_file(path))
+        return cards
+    with ProcessPoolExecutor(jobs) as pool:
+        # At most two files per worker in flight (pool.map would submit them all and hold every
+        # result until its turn), added in submission order
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(read_file, path)))
+            if len(pending) >= 2 * jobs:
+                path, future = pending.popleft()
+                cards += add(path, future.result())
+        while pending:
+            path, future = pending.popleft()
+            cards += add(path, future.result())
+    return cards
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the answers of filled-in fillable tasting cards.")
+    parser.add_argument("pdfs", nargs="+", help="PDFs written with generate_wine_tasting_batch.py --fillable")
+    parser.add_argument("-o", "--output", default="answers", help="table directory to write (default: answers)")
+    parser.add_argument("-s", "--style", action="append",
+                        help="style(s) the cards were drawn in, for the answer options (default: handwritten)")
+    parser.add_argument("--card-schema", metavar="FILE",
+                        help="card schema the cards were drawn with (generate_wine_tasting_batch.py --schema)")
+    parser.add_argument("-j", "--jobs", type=int, help="read on N worker processes")
+    args = parser.parse_args(argv)
+
+    from generate_wine_tasting_batch import get_card_layout
+    card_schema = None
+    if args.card_schema:
+        from card_schema import load_schema
+        card_schema = load_schema(args.card_schema)
+    try:
+        schema = table_schema([get_card_layout(style, card_schema) for style in args.style or ["handwritten"]])
+    except ValueError as e:
+        parser.error(str(e))
+    table = TableWriter(args.output, schema)
+    start = time.perf_counter()
+    cards = extract(args.pdfs, table, jobs=args.jobs)
+    table.close()
+    elapsed = time.perf_counter() - start
+    print(f"Extracted {cards} cards from {len(args.pdfs)} files in {elapsed:.2f}s "
+          f"({cards / max(elapsed, 1e-9):.0f} cards/s) to {args.output}", file=sys.stderr)
+    if table.unknown:
+        print(f"{table.unknown} answers were not among their row's options and are left blank", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
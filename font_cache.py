@@ -0,0 +1,117 @@
+"""
+Lazy TrueType font registration backed by an on-disk cache of parsed fonts.
+
+reportlab parses the whole TTF file (tables, character map, glyph widths)
+every time a TTFont is created. register_ttf() does that once per font file
+and pickles the parsed face into a cache directory, so later processes only
+unpickle it. The styles call it the first time they need their font, so
+importing a style module no longer touches the font file at all and a
+missing font is reported (and a fallback used) instead of failing the import.
+
+Cache entries are keyed by CACHE_VERSION, the reportlab and Python versions
+and the font file's path, size and modification time; anything that does not
+match is simply parsed again. Font files are looked up on reportlab's
+TTFSearchPath just as without the cache. Set WINE_CARDS_FONT_CACHE to move the cache
+directory, or to an empty string to disable it.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from weakref import WeakKeyDictionary
+
+import reportlab
+from reportlab import rl_config
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTEncoding, TTFError, TTFont, TTFontFace, TTFOpenFile
+
+# Bump when the pickled layout changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = "~/.cache/wine-cards/fonts"
+
+
+def font_cache_dir():
+    """The cache directory, or None if caching is disabled."""
+    directory = os.environ.get("WINE_CARDS_FONT_CACHE", DEFAULT_CACHE_DIR)
+    return Path(directory).expanduser() if directory else None
+
+
+def resolve_font(path):
+    """
+    The absolute path of the font file `path`, looked up the way reportlab
+    does: as given, else in the directories of rl_config.TTFSearchPath.
+
+    Raises TTFError if it is in neither.
+    """
+    path, f = TTFOpenFile(path)
+    f.close()
+    return os.path.abspath(path)
+
+
+def _cache_path(directory, path):
+    stat = os.stat(path)
+    key = f"{CACHE_VERSION}:{reportlab.Version}:{sys.version_info[:2]}:{os.path.abspath(path)}:" \
+          f"{stat.st_size}:{stat.st_mtime_ns}"
+    return directory / (hashlib.sha256(key.encode()).hexdigest() + ".face")
+
+
+def _font_from_face(name, face):
+    # What TTFont.__init__ does once the face is parsed
+    font = TTFont.__new__(TTFont)
+    font.fontName = name
+    font.face = face
+    font.encoding = TTEncoding()
+    font.state = WeakKeyDictionary()
+    font._asciiReadable = rl_config.ttfAsciiReadable
+    return font
+
+
+def load_ttf(name, path):
+    """
+    Return a TTFont for the font file `path`, from the cache if possible.
+
+    Raises OSError or TTFError if the file is missing or not a TrueType font.
+    """
+    directory = font_cache_dir()
+    if directory is None:
+        return TTFont(name, path)
+
+    # Also found on the search path (e.g. /usr/share/fonts), as reportlab would without the cache
+    path = resolve_font(path)
+    cache_path = _cache_path(directory, path)
+    try:
+        with open(cache_path, "rb") as f:
+            return _font_from_face(name, pickle.load(f))
+    except Exception:
+        pass  # not cached yet, or a corrupt entry: parse the font again
+
+    face = TTFontFace(path)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(face, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)  # atomic, so a parallel reader never sees half a file
+    except OSError:
+        pass  # read-only home etc.: keep working without the cache
+    return _font_from_face(name, face)
+
+
+def register_ttf(name, path):
+    """
+    Register the TrueType font `path` under `name` unless it already is.
+
+    Returns True if the font is available, False if the file is missing or
+    cannot be parsed.
+    """
+    if name in pdfmetrics.getRegisteredFontNames():
+        return True
+    try:
+        font = load_ttf(name, path)
+    except (OSError, TTFError):
+        return False
+    pdfmetrics.registerFont(font)
+    return True
@@ -0,0 +1,98 @@
+"""
+Memoized text widths for the card fonts.
+
+reportlab measures a string by looking up every character's width in Python
+on each call. The cards measure the same few dozen labels and options over
+and over, plus one header value per field per card, so widths are served
+from two layers instead:
+
+- a glyph table per font (character -> width in 1/1000 em), filled for the
+  Latin-1 range when the font is first used and per character after that;
+- a bounded LRU cache of (text, font, size) -> width shared by every card
+  of a batch.
+
+Results are the same numbers pdfmetrics.stringWidth returns.
+"""
+from functools import lru_cache
+
+from reportlab.lib.rl_accel import unicode2T1
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# Distinct (text, font, size) widths kept; header values differ per card, so
+# the cache has to be bounded for large batches
+WIDTH_CACHE_SIZE = 4096
+
+# Characters measured up front for every font
+PRECOMPUTED_CHARS = "".join(map(chr, range(32, 256)))
+
+_glyph_tables = {}
+
+
+class GlyphTable:
+    """Widths (in 1/1000 em) of the characters of one registered font."""
+
+    def __init__(self, font_name):
+        self.font = pdfmetrics.getFont(font_name)
+        self.ttf = isinstance(self.font, TTFont)
+        self.widths = {}
+        for char in PRECOMPUTED_CHARS:
+            self.widths[char] = self._measure(char)
+
+    def _measure(self, char):
+        if self.ttf:
+            return self.font.face.charWidths.get(ord(char), self.font.face.defaultWidth)
+        fonts = [self.font] + self.font.substitutionFonts
+        return sum(sum(map(f.widths.__getitem__, t)) for f, t in unicode2T1(char, fonts))
+
+    def width(self, char):
+        try:
+            return self.widths[char]
+        except KeyError:
+            width = self.widths[char] = self._measure(char)
+            return width
+
+    def units(self, text):
+        """Width of `text` in 1/1000 em."""
+        widths = self.widths
+        try:
+            return sum([widths[char] for char in text])
+        except KeyError:
+            return sum([self.width(char) for char in text])
+
+
+def glyph_table(font_name):
+    """Return the (lazily built) GlyphTable of a registered font."""
+    table = _glyph_tables.get(font_name)
+    if table is None:
+        table = _glyph_tables[font_name] = GlyphTable(font_name)
+    return table
+
+
+@lru_cache(maxsize=WIDTH_CACHE_SIZE)
+def string_width(text, font_name, size):
+    """Drop-in for pdfmetrics.stringWidth(text, font_name, size), memoized."""
+    table = glyph_table(font_name)
+    # Same operation order as reportlab, so the floats match to the last bit
+    if table.ttf:
+        return 0.001 * size * table.units(text)
+    return table.units(text) * 0.001 * size
+
+
+def clear():
+    """Forget all tables and widths, e.g. after re-registering a font under the same name."""
+    _glyph_tables.clear()
+    string_width.cache_clear()
+
+
+def stats():
+    """Hit/miss counters of the width cache (this process only) and the glyph tables built."""
+    info = string_width.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "fonts": len(_glyph_tables),
+        "glyphs": sum(len(table.widths) for table in _glyph_tables.values()),
+    }
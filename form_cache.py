@@ -0,0 +1,143 @@
+"""
+Recorded Form XObjects that later canvases can reuse without drawing them again.
+
+The card skeleton and the vintage paper textures are drawn once per PDF as
+forms, but every new PDF (a parallel shard, a request to the render server)
+pays for drawing them again. draw_form() records the content stream of a form
+the first time it is drawn under a given key, together with the fonts it
+registered in the document, and replays the recording into later canvases:
+the resulting PDF is byte-for-byte the one drawing it would have produced.
+
+A recording that sets a font is only replayed into a document whose fonts are
+in the same state as when it was made (same internal names, same TrueType
+subset assignments), which is the case for forms drawn in the same order by
+the same code. Otherwise the form is simply drawn.
+
+Recording and replaying reads and writes reportlab internals (the canvas's
+_code, _extgstate and used colours and shadings, the document's font mapping
+and TrueType subset state), as of reportlab 4.2. If a reportlab release
+changes them, replayable() says so and every form is drawn as usual.
+"""
+from collections import OrderedDict, namedtuple
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# Forms kept in memory; a skeleton is roughly 100 KB of PDF operators
+MAX_RECORDINGS = 32
+
+Recording = namedtuple("Recording", "uses_fonts fonts_before fonts_after code extgstates colors shadings")
+
+_recordings = OrderedDict()
+# unsupported: forms drawn without recording because the reportlab internals have changed
+_stats = {"hits": 0, "misses": 0, "unsupported": 0}
+
+
+def _fonts_replayable():
+    try:
+        state = TTFont.State()
+    except Exception:
+        return False
+    return (hasattr(TTFont, "_assignState") and hasattr(TTFont, "_dynamicFont")
+            and all(hasattr(state, name) for name in ("assignments", "subsets", "nextCode", "frozen", "internalName")))
+
+
+_FONTS_REPLAYABLE = _fonts_replayable()
+
+
+def replayable(c):
+    """Whether canvas `c` has the reportlab internals that recording and replaying forms rely on."""
+    try:
+        return (_FONTS_REPLAYABLE and isinstance(c._code, list) and isinstance(c._extgstate._c, dict)
+                and isinstance(c._colorsUsed, dict) and isinstance(c._shadingUsed, dict)
+                and isinstance(c._formsinuse, list) and isinstance(c._doc.fontMapping, dict)
+                and isinstance(c._doc.delayedFonts, list))
+    except AttributeError:
+        return False
+
+
+def _font_state(c):
+    """The document's fonts in registration order, with a copy of each TrueType subset state."""
+    doc = c._doc
+    fonts = []
+    for font_name, internal_name in doc.fontMapping.items():
+        font = pdfmetrics.getFont(font_name)
+        state = font.state.get(doc) if font._dynamicFont else None
+        if state is not None:
+            state = (dict(state.assignments), [list(subset) for subset in state.subsets],
+                     state.nextCode, state.frozen)
+        fonts.append((font_name, internal_name, state))
+    return fonts
+
+
+def _restore_fonts(c, fonts):
+    """Register `fonts` (as returned by _font_state) in the canvas's document."""
+    doc = c._doc
+    for font_name, internal_name, state in fonts:
+        font = pdfmetrics.getFont(font_name)
+        if font_name not in doc.fontMapping:
+            if font._dynamicFont:
+                doc.fontMapping[font_name] = internal_name
+                doc.delayedFonts.append(font)
+            else:
+                doc.getInternalFontName(font_name)
+        if state is not None:
+            assignments, subsets, next_code, frozen = state
+            doc_state = font._assignState(doc)
+            doc_state.assignments = dict(assignments)
+            doc_state.subsets = [list(subset) for subset in subsets]
+            doc_state.nextCode = next_code
+            doc_state.frozen = frozen
+            doc_state.internalName = internal_name[1:]
+
+
+def draw_form(c, name, key, draw, end=None, bbox=None):
+    """
+    Define the form `name` on canvas `c`: c.beginForm(name), draw(), end(c).
+
+    `key` must identify everything that makes the form look the way it does
+    (style, seed, ...); with key=None the form is always drawn. `end` finishes
+    the form and defaults to c.endForm(). `bbox` (x1, y1, x2, y2) is the area
+    the form may draw in and defaults to the current page, so a form begun
+    after N-up imposition switched to the sheet size needs its own.
+    """
+    c.beginForm(name, *(bbox or ()))
+    if key is not None and not replayable(c):
+        _stats["unsupported"] += 1
+        key = None
+    recording = _recordings.get(key) if key is not None else None
+    if recording is not None and (not recording.uses_fonts or recording.fonts_before == _font_state(c)):
+        _recordings.move_to_end(key)
+        _stats["hits"] += 1
+        c._code.extend(recording.code)
+        if recording.uses_fonts:
+            _restore_fonts(c, recording.fonts_after)
+        c._extgstate._c.update(recording.extgstates)
+        c._colorsUsed.update(recording.colors)
+        c._shadingUsed.update(recording.shadings)
+    else:
+        fonts_before = _font_state(c) if key is not None else None
+        draw()
+        # Forms that use other forms would need those replayed too; just draw them
+        if key is not None and not c._formsinuse:
+            _stats["misses"] += 1
+            code = list(c._code)
+            uses_fonts = any(" Tf" in op for op in code)
+            _recordings[key] = Recording(uses_fonts, fonts_before, _font_state(c), code, dict(c._extgstate._c),
+                                         dict(c._colorsUsed), dict(c._shadingUsed))
+            while len(_recordings) > MAX_RECORDINGS:
+                _recordings.popitem(last=False)
+    if end is None:
+        c.endForm()
+    else:
+        end(c)
+
+
+def clear():
+    """Forget all recordings, e.g. after changing a font registered under the same name."""
+    _recordings.clear()
+
+
+def stats():
+    """Replay counters of this process and the number of recordings kept."""
+    return dict(_stats, entries=len(_recordings), max_entries=MAX_RECORDINGS)
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Render a whole wine list into a single multi-page PDF, one tasting card per page.
+
+Rows are streamed from a CSV, JSON or JSON Lines file. Recognised columns are
+name, producer, region, varietals, vintage and date (all optional); their
+values are pre-filled into the card header. An optional style column draws
+that row in another style than --style, so one PDF can mix styles. With
+--schema the cards ask the sections, rows and aroma groups of a JSON or TOML
+card schema instead of the standard ones (see card_schema.py).
+
+With --jobs N the list is cut into fixed-size shards that are rendered by N
+worker processes and merged, in order, into the output file. With --seed the
+hand-drawn effects are reproducible: every card gets its own random stream
+derived from the seed and its position in the list, so serial, parallel and
+resumed (--resume-from) runs draw identical pages, and --cache-dir can serve
+repeated seeded requests from disk without drawing anything. With --svg DIR
+the cards are written as one SVG file each instead of a PDF.
+
+Usage: python generate_wine_tasting_batch.py wines.csv -o cards.pdf --style vintage
+"""
+import argparse
+import csv
+import importlib
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from reportlab import rl_config
+
+import card_fields
+import card_layout
+import card_quality
+import card_random
+import card_renderer
+import card_schema
+import display_list
+import font_metrics
+import form_cache
+import imposition
+import pdf_merge
+import render_trace
+import state_canvas
+from card_cache import CardCache
+from card_layout import build_card_layout, export_layout
+from card_manifest import build_manifest, write_manifest
+from card_renderer import render_cards, render_svg
+from card_schema import compile_schema, default_schema, load_schema
+from pdf_merge import PDFMerger
+
+CARD_FIELDS = ("name", "producer", "region", "varietals", "vintage", "date")
+
+# Alternative column headers people tend to use in their wine lists
+FIELD_ALIASES = {
+    "wine": "name",
+    "wine name": "name",
+    "wine_name": "name",
+    "grapes": "varietals",
+    "varietal": "varietals",
+    "year": "vintage",
+}
+
+# Pages per shard in parallel mode. Shard boundaries do not depend on the number
+# of workers, which keeps the merged PDF identical for any --jobs value.
+SHARD_PAGES = 200
+
+# Style name -> (module, card function). Modules are imported on demand so a
+# missing font for one style does not stop the others from rendering.
+STYLES = {
+    "vintage": ("generate_wine_tasting_sheet_vintage", "create_vintage_tasting_card"),
+    "handwritten": ("generate_wine_tasting_sheet_handwritten", "create_generic_sketchy_card"),
+    "sketchy": ("generate_wine_tasting_sheet_sketchy", "create_generic_tasting_card"),
+}
+
+
+def clean_card(row):
+    """Map a raw row onto the card header fields, dropping unknown columns. Raises ValueError for a non-object."""
+    if not isinstance(row, dict):
+        raise ValueError(f"every card must be an object of columns, not {type(row).__name__} {row!r:.40}")
+    card = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        key = key.strip().lower()
+        key = FIELD_ALIASES.get(key, key)
+        if key in CARD_FIELDS:
+            card[key] = str(value).strip()
+        elif key == "style" and str(value).strip():
+            # Drawn in this style instead of the batch's (see card_renderer.py)
+            card[key] = str(value).strip().lower()
+    return card
+
+
+def read_cards(path):
+    """Yield one card dict per row of a CSV, JSON or JSON Lines wine list."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if suffix == ".csv":
+            for row in csv.DictReader(f):
+                yield clean_card(row)
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield clean_card(json.loads(line))
+        elif suffix == ".json":
+            # A plain JSON document has to be parsed in one go; use JSON Lines
+            # for lists too large to hold in memory.
+            for row in json.load(f):
+                yield clean_card(row)
+        else:
+            raise ValueError(f"Unsupported wine list format: {path.name}")
+
+
+def repeat_cards(cards, copies):
+    """Yield each card `copies` times in a row (e.g. one per guest)."""
+    for card in cards:
+        for _ in range(copies):
+            yield card
+
+
+def chunked(cards, size):
+    """Yield lists of up to `size` consecutive cards."""
+    cards = iter(cards)
+    while True:
+        chunk = list(itertools.islice(cards, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def get_card_renderer(style):
+    """Return the create_*_card function for a style name."""
+    if style not in STYLES:
+        raise ValueError(f"Unknown style '{style}', choose from: {', '.join(STYLES)}")
+    module_name, function_name = STYLES[style]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def get_card_layout(style, schema=None):
+    """Return the layout plan a style draws on every page, for a card schema or the style's own card."""
+    get_card_renderer(style)  # validates the name
+    return build_card_layout(importlib.import_module(STYLES[style][0]).card_style(), schema)
+
+
+def get_card_schema(style):
+    """Return the schema of the card a style draws without one, as a dict."""
+    get_card_renderer(style)  # validates the name
+    return default_schema(importlib.import_module(STYLES[style][0]).card_style())
+
+
+def batch_styles(style, cards):
+    """The styles a batch draws: `style` and those of the cards' style columns."""
+    styles = sorted({style}.union(card["style"] for card in cards if card.get("style")))
+    for name in styles:
+        get_card_renderer(name)  # validates the name
+    return styles
+
+
+def style_paths(path, style, styles):
+    """Where to write one file per style of a batch: `path` for `style`, the others' with the style in the name."""
+    path = Path(path)
+    return {name: path if name == style else path.with_name(f"{path.stem}.{name}{path.suffix}") for name in styles}
+
+
+def source_files(styles, sharded=False):
+    """The code files whose contents determine the bytes of a batch drawing `styles` (see batch_styles)."""
+    files = [importlib.import_module(STYLES[style][0]).__file__ for style in styles]
+    if "sketchy" in styles:
+        # Draws with the pencil of the handwritten style
+        files.append(importlib.import_module(STYLES["handwritten"][0]).__file__)
+    files += [card_renderer.__file__, card_random.__file__, card_layout.__file__, font_metrics.__file__,
+              form_cache.__file__, state_canvas.__file__, imposition.__file__, card_fields.__file__,
+              card_quality.__file__, card_schema.__file__, display_list.__file__]
+    if "vintage" in styles:
+        # Not imported here: it needs numpy, and only for --paper raster
+        files.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "paper_raster.py"))
+    if sharded:
+        files.append(pdf_merge.__file__)
+    return files
+
+
+def _init_worker():
+    # No timestamps or random document ids, so equal shards are equal bytes
+    rl_config.invariant = 1
+    # Keep font notices out of a PDF that is being streamed to stdout
+    sys.stdout = sys.stderr
+
+
+def _render_shard(style, cards, seed, first_index, options):
+    """Worker: render one shard of cards with its own canvas, return the PDF bytes."""
+    buffer = io.BytesIO()
+    render_cards(buffer, cards, style=style, seed=seed, first_index=first_index, **options)
+    return buffer.getvalue()
+
+
+def render_batch_streaming(cards, out, style="handwritten", jobs=None, seed=None, first_index=0, **options):
+    """
+    Render cards in shards of SHARD_PAGES and stream them into the binary file object `out`.
+
+    Each shard is drawn on its own canvas, in this process or, with `jobs`,
+    on that many worker processes, and merged into `out` as soon as it is
+    done. Finished pages never pile up in memory, so memory use is flat
+    however long the batch is, and `out` may be a pipe (nothing is seeked).
+    The output is identical for any number of jobs. Returns the number of
+    cards written.
+    """
+    if seed is None:
+        # One seed for the whole batch, so every shard shares the same skeleton
+        seed = random.randrange(2 ** 32)
+    merger = PDFMerger(out)
+    # Whole sheets per shard when several cards are printed per sheet
+    n_up = options.get("n_up", 1)
+    shards = chunked(cards, max(SHARD_PAGES - SHARD_PAGES % n_up, n_up))
+    start = first_index
+    if not jobs:
+        for shard in shards:
+            merger.append(_render_shard(style, shard, seed, first_index, options))
+            first_index += len(shard)
+    else:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker) as pool:
+            # At most two shards per worker in flight, merged in submission order
+            pending = deque()
+            for shard in shards:
+                pending.append(pool.submit(_render_shard, style, shard, seed, first_index, options))
+                first_index += len(shard)
+                if len(pending) >= 2 * jobs:
+                    merger.append(pending.popleft().result())
+            while pending:
+                merger.append(pending.popleft().result())
+    merger.close()
+    return first_index - start
+
+
+def write_file(filename, write):
+    """
+    Call write(f) with a binary file that becomes `filename` once write()
+    returns; if it raises, no (truncated) file is left behind. Returns
+    what write() returned.
+    """
+    tmp = f"{filename}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            result = write(f)
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return result
+
+
+def render_batch_parallel(cards, filename, style="handwritten", jobs=None, seed=None, first_index=0, **options):
+    """Render cards on `jobs` worker processes (default: one per CPU) and merge the shards into `filename`."""
+    jobs = jobs or os.cpu_count() or 1
+    return write_file(filename, lambda f: render_batch_streaming(cards, f, style=style, jobs=jobs, seed=seed,
+                                                                 first_index=first_index, **options))
+
+
+def render_batch(cards, filename, style="handwritten", jobs=None, seed=None, first_index=0, cache=None,
+                 stream=False, **options):
+    """
+    Draw every card as a page of one shared canvas and save it to `filename`.
+
+    `cards` may be any iterable of card dicts, including a generator, so rows
+    are consumed one at a time. With `jobs`, rendering is spread over that
+    many processes; with `stream`, pages are written out in shards as they
+    are drawn instead of being held until the end (see
+    render_batch_streaming), and `filename` may also be a binary file object
+    such as sys.stdout.buffer. `seed` makes the hand-drawn effects
+    reproducible; `first_index` is the position of the first card in the
+    full batch when resuming. Seeded batches are looked up in and added to
+    `cache` (a CardCache) if one is given. Cards with a "style" entry are
+    drawn in that style instead of `style`. Other keyword arguments are
+    passed on to card_renderer.render_cards(), e.g. n_up and sheet to print
+    several cards per sheet (see imposition.py) or fillable for form fields
+    (see card_fields.py). Returns the number of cards written.
+    """
+    sharded = bool(jobs or stream)
+    if cache is not None and seed is not None:
+        cards = list(cards)
+        styles = batch_styles(style, cards)
+        key = cache.key(style, cards, seed, source_files(styles, sharded=sharded), styles=styles,
+                        first_index=first_index, sharded=sharded, **options)
+        if not cache.fetch(key, filename):
+            render_batch(cards, filename, style=style, jobs=jobs, seed=seed, first_index=first_index,
+                         stream=stream, **options)
+            cache.store(key, filename)
+        return len(cards)
+
+    if sharded:
+        if hasattr(filename, "write"):
+            return render_batch_streaming(cards, filename, style=style, jobs=jobs, seed=seed,
+                                          first_index=first_index, **options)
+        return write_file(filename, lambda f: render_batch_streaming(cards, f, style=style, jobs=jobs, seed=seed,
+                                                                     first_index=first_index, **options))
+
+    get_card_renderer(style)  # validates the name
+    counter = itertools.count()
+
+    def counted(cards):
+        for card in cards:
+            next(counter)
+            yield card
+
+    render_cards(filename, counted(cards), style=style, seed=seed, first_index=first_index, **options)
+    return next(counter)
+
+
+def render_batch_svg(cards, directory, style="handwritten", seed=None, first_index=0, **options):
+    """
+    Write every card as an SVG file card{index}.svg into `directory`, see
+    card_renderer.render_svg(). With a seed, the skeletons and textures this
+    process already drew into a PDF are only replayed. Returns the number of
+    cards written.
+    """
+    get_card_renderer(style)  # validates the name
+    return render_svg(directory, cards, style=style, seed=seed, first_index=first_index, **options)
+
+
+def choose_quality(styles, budget, seed=None, **options):
+    """
+    The highest quality level at which cards of each of `styles` take at
+    most `budget` seconds (see card_quality.py): each style is timed on its
+    own, and the slowest one decides.
+    """
+    levels = list(card_quality.LEVELS)
+    chosen = []
+    for style in styles:
+        get_card_renderer(style)  # validates the name
+
+        def render(level, count, style=style):
+            render_cards(io.BytesIO(), [{}] * count, style=style, seed=seed, quality=level, **options)
+
+        chosen.append(card_quality.choose_level(render, budget))
+    return min(chosen, key=levels.index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a wine list into one multi-page tasting card PDF.")
+    parser.add_argument("wine_list", nargs="?", help="CSV, JSON or JSON Lines file (omit to print blank cards)")
+    parser.add_argument("-o", "--output", default="Tasting_Cards.pdf", help="output PDF file, or - for stdout")
+    parser.add_argument("--svg", metavar="DIR",
+                        help="write the cards as SVG files, card0.svg, card1.svg, ..., into DIR instead of a PDF")
+    parser.add_argument("-s", "--style", choices=sorted(STYLES), default="handwritten")
+    parser.add_argument("-n", "--copies", type=int, default=1, help="copies of each card, e.g. one per guest")
+    parser.add_argument("--blank", type=int, default=1, help="number of blank cards when no wine list is given")
+    parser.add_argument("-j", "--jobs", type=int, help="render in parallel on N worker processes")
+    parser.add_argument("--stream", action="store_true",
+                        help="write pages out in shards as they are drawn, keeping memory flat (implied by -o -)")
+    parser.add_argument("--seed", help="make the hand-drawn effects reproducible")
+    parser.add_argument("--resume-from", type=int, default=0, metavar="N",
+                        help="skip the first N cards, e.g. to finish an interrupted run")
+    parser.add_argument("--paper-textures", type=int, metavar="K",
+                        help="vintage style: share a pool of K paper textures between pages "
+                             "(default: a unique texture on every page)")
+    parser.add_argument("--paper", choices=["vector", "raster"],
+                        help="vintage style: draw the paper textures as vector shapes (default) or compute them as "
+                             "one image each (needs numpy)")
+    parser.add_argument("--paper-dpi", type=int, metavar="DPI",
+                        help="resolution of --paper raster textures (default: 150)")
+    parser.add_argument("--quality", choices=list(card_quality.LEVELS),
+                        help="detail of the decorative effects: fewer stains, single pencil strokes and plainer boxes "
+                             "for previews (default: print)")
+    parser.add_argument("--budget", type=float, metavar="MS",
+                        help="pick the highest --quality that draws a card within MS milliseconds on this machine")
+    parser.add_argument("--n-up", type=int, default=1, metavar="N",
+                        help="print N scaled cards per sheet, with crop marks (e.g. 2 = A5 cards on A4)")
+    parser.add_argument("--sheet", choices=list(imposition.SHEETS),
+                        help="sheet size for --n-up (default: A4 for 2-up, A3 above)")
+    parser.add_argument("--fillable", action="store_true",
+                        help="add form fields (bubble rows as radio groups, lines as text fields) to fill in on screen")
+    parser.add_argument("--schema", metavar="FILE",
+                        help="card schema (JSON or TOML) with the sections, rows and aroma groups to print, see "
+                             "card_schema.py")
+    parser.add_argument("--export-schema", metavar="FILE",
+                        help="write the schema of the --style card as JSON, to start a custom one from")
+    parser.add_argument("--export-layout", metavar="FILE",
+                        help="also write the card layout plan as JSON (for the rows' other styles to FILE with the "
+                             "style before the suffix, e.g. layout.vintage.json)")
+    parser.add_argument("--manifest", metavar="FILE",
+                        help="also write where every bubble and writing line is, for scanning (JSON, plus a .bin of "
+                             "the same name; one per style like --export-layout)")
+    parser.add_argument("--cache-dir", help="serve repeated seeded batches from this on-disk cache")
+    parser.add_argument("--cache-size", type=int, default=500, metavar="MB",
+                        help="evict least recently used cache entries above this size (default: 500)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print font metric, display list and form cache statistics (counts this process only, not "
+                             "--jobs workers)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="time every section and drawing helper, write folded stacks (for flamegraph.pl or "
+                             "speedscope) to FILE and print a summary")
+    args = parser.parse_args(argv)
+
+    if args.wine_list:
+        cards = read_cards(args.wine_list)
+    else:
+        cards = ({} for _ in range(args.blank))
+
+    cards = itertools.islice(repeat_cards(cards, args.copies), args.resume_from, None)
+    options = {}
+    styles = [args.style]
+    if args.wine_list:
+        # Every row is read once before rendering, so a missing file, a malformed row or an unknown style
+        # is reported here rather than halfway through the batch; the batch itself is streamed
+        try:
+            styles = batch_styles(args.style, read_cards(args.wine_list))
+        except (OSError, ValueError, csv.Error) as e:
+            parser.error(f"{args.wine_list}: {e}")
+    if args.paper_textures is not None:
+        if "vintage" not in styles:
+            parser.error("--paper-textures only applies to the vintage style")
+        options["paper_textures"] = args.paper_textures
+    if args.paper is not None:
+        if "vintage" not in styles:
+            parser.error("--paper only applies to the vintage style")
+        options["paper"] = args.paper
+    if args.paper_dpi is not None:
+        if args.paper != "raster":
+            parser.error("--paper-dpi only applies with --paper raster")
+        options["paper_dpi"] = args.paper_dpi
+    if args.n_up < 1:
+        parser.error("--n-up must be at least 1")
+    if args.n_up > 1:
+        options["n_up"] = args.n_up
+        if args.sheet:
+            options["sheet"] = args.sheet
+    elif args.sheet:
+        parser.error("--sheet only applies with --n-up 2 or more")
+    if args.fillable:
+        options["fillable"] = True
+    if args.budget is not None:
+        if args.quality:
+            parser.error("--budget picks the --quality itself, give one or the other")
+        if args.trace:
+            parser.error("--trace would time the --budget calibration too, give a --quality instead")
+
+    if args.svg:
+        for given, flag in ((args.jobs, "--jobs"), (args.stream, "--stream"), (args.output == "-", "-o -"),
+                            (args.n_up > 1, "--n-up"), (args.fillable, "--fillable"), (args.cache_dir, "--cache-dir")):
+            if given:
+                parser.error(f"{flag} only applies to PDF output, not --svg")
+
+    if args.trace:
+        if args.jobs:
+            parser.error("--trace only sees this process, not the --jobs workers")
+        render_trace.start()
+
+    if args.schema:
+        try:
+            options["schema"] = load_schema(args.schema)
+            for name in styles:
+                get_card_layout(name, compile_schema(options["schema"]))  # and that the card fits on the page
+        except (OSError, ValueError) as e:
+            parser.error(f"--schema {args.schema}: {e}")
+    if args.export_schema:
+        with open(args.export_schema, "w", encoding="utf-8") as f:
+            json.dump(get_card_schema(args.style), f, ensure_ascii=False, indent=1)
+    # One layout and manifest per style the batch draws; files for the rows' other styles get the style in their name
+    if args.export_layout:
+        for name, path in style_paths(args.export_layout, args.style, styles).items():
+            export_layout(get_card_layout(name, options.get("schema")), path)
+    if args.manifest:
+        for name, path in style_paths(args.manifest, args.style, styles).items():
+            write_manifest(build_manifest(get_card_layout(name, options.get("schema")), args.seed, n_up=args.n_up,
+                                          sheet=args.sheet), path)
+
+    output = args.output
+    if output == "-":
+        # The PDF goes to stdout, everything else (font notices, the summary) to stderr
+        output = sys.stdout.buffer
+        sys.stdout = sys.stderr
+        args.stream = True
+
+    if args.budget is not None:
+        args.quality = choose_quality(styles, args.budget / 1000, seed=args.seed, **options)
+        print(f"Quality: {args.quality} (within {args.budget:g} ms per card)")
+    if args.quality and args.quality != card_quality.DEFAULT:
+        options["quality"] = args.quality
+
+    cache = None
+    if args.cache_dir:
+        if output is not args.output:
+            parser.error("--cache-dir needs an output file, not stdout")
+        if args.seed is None:
+            parser.error("--cache-dir needs --seed, unseeded cards are never the same twice")
+        cache = CardCache(args.cache_dir, max_bytes=args.cache_size * 2 ** 20)
+
+    start = time.perf_counter()
+    try:
+        if args.svg:
+            pages = render_batch_svg(cards, args.svg, style=args.style, seed=args.seed, first_index=args.resume_from,
+                                     **options)
+        else:
+            pages = render_batch(cards, output, style=args.style, jobs=args.jobs, seed=args.seed,
+                                 first_index=args.resume_from, cache=cache, stream=args.stream, **options)
+    except BrokenPipeError:
+        # The reader of stdout went away (e.g. `| head`); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {pages} cards to {args.svg or args.output} in {elapsed:.2f}s ({pages / elapsed:.0f} cards/s)")
+    if cache is not None:
+        print("Cache: " + ", ".join(f"{name} {value}" for name, value in cache.stats().items()))
+    if args.stats:
+        print("Font metrics: " + ", ".join(f"{name} {value}" for name, value in font_metrics.stats().items()))
+        print("Display lists: " + ", ".join(f"{name} {value}" for name, value in display_list.stats().items()))
+        print("Forms: " + ", ".join(f"{name} {value}" for name, value in form_cache.stats().items()))
+    if args.trace:
+        trace = render_trace.stop()
+        trace.write_folded(args.trace)
+        print(trace.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+N-up imposition: several scaled-down cards per printed sheet, with crop marks.
+
+Print shops cut the cards from large sheets, so instead of one A4 page per
+card the canvas gets sheet-sized pages with the cards in a grid, each one
+scaled to fit and clipped to its trim box. Inside its slot a card is drawn
+exactly as on its own page, so the skeleton and the paper textures stay
+shared Form XObjects that are only placed, scaled, once per card.
+
+    imposition = Imposition(c, n_up=4, sheet="A3")
+    for card in cards:
+        with imposition.card():
+            ...  # draw the card in its own (A4) coordinates
+    imposition.close()
+
+With n_up=1 (the default) every card is simply a page, as without imposition.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+
+from reportlab.lib import pagesizes
+from reportlab.lib.colors import black
+from reportlab.lib.units import mm
+
+SHEETS = {
+    "A4": pagesizes.A4,
+    "A3": pagesizes.A3,
+    "A2": pagesizes.A2,
+    "SRA3": (320 * mm, 450 * mm),
+    "Letter": pagesizes.LETTER,
+    "Tabloid": pagesizes.TABLOID,
+}
+
+# Room around the grid for the crop marks
+MARGIN = 10 * mm
+MARK_OFFSET = 1 * mm  # between the trim line and its mark
+MARK_LENGTH = 6 * mm
+MARK_WIDTH = 0.25
+
+# Slots are filled left to right, top to bottom, from (x0, y0) at the bottom left
+Grid = namedtuple("Grid", "sheet_width sheet_height columns rows scale x0 y0 card_width card_height")
+
+
+def default_sheet(n_up):
+    """A4 for 2-up (A5 cards), A3 for anything more."""
+    return "A4" if n_up <= 2 else "A3"
+
+
+def plan_grid(n_up, card_size, sheet):
+    """The grid (and sheet orientation) that fits `n_up` cards of `card_size` the largest."""
+    if n_up < 1:
+        raise ValueError("n_up must be at least 1")
+    if sheet not in SHEETS:
+        raise ValueError(f"Unknown sheet '{sheet}', choose from: {', '.join(SHEETS)}")
+    card_w, card_h = card_size
+    best = None
+    for width, height in (pagesizes.portrait(SHEETS[sheet]), pagesizes.landscape(SHEETS[sheet])):
+        for columns in range(1, n_up + 1):
+            rows = -(-n_up // columns)
+            scale = min((width - 2 * MARGIN) / (columns * card_w), (height - 2 * MARGIN) / (rows * card_h))
+            if best is None or scale > best.scale:
+                x0 = (width - columns * card_w * scale) / 2
+                y0 = (height - rows * card_h * scale) / 2
+                best = Grid(width, height, columns, rows, scale, x0, y0, card_w * scale, card_h * scale)
+    return best
+
+
+def slot_transform(grid, slot):
+    """(x, y, scale): where the bottom left corner of the card in `slot` lies on the sheet, and its scale."""
+    column, row = slot % grid.columns, slot // grid.columns
+    return grid.x0 + column * grid.card_width, grid.y0 + (grid.rows - 1 - row) * grid.card_height, grid.scale
+
+
+class Imposition:
+    """Places the cards drawn on canvas `c` onto pages of `n_up` cards each."""
+
+    def __init__(self, c, n_up=1, sheet=None, card_size=pagesizes.A4):
+        self.c = c
+        self.card_size = card_size
+        self.n_up = n_up
+        self.placed = 0
+        self.grid = None
+        if n_up > 1:
+            self.grid = plan_grid(n_up, card_size, sheet or default_sheet(n_up))
+            c.setPageSize((self.grid.sheet_width, self.grid.sheet_height))
+
+    @contextmanager
+    def card(self):
+        """Draw one card inside the block, in card coordinates; starts a new sheet when this one is full."""
+        c = self.c
+        if self.grid is None:
+            yield
+            c.showPage()
+            return
+        x, y, scale = slot_transform(self.grid, self.placed % self.n_up)
+        c.saveState()
+        c.translate(x, y)
+        c.scale(scale, scale)
+        # Paper textures reach past the card edge; keep them off the neighbours
+        trim = c.beginPath()
+        trim.rect(0, 0, *self.card_size)
+        c.clipPath(trim, stroke=0, fill=0)
+        yield
+        c.restoreState()
+        self.placed += 1
+        if self.placed % self.n_up == 0:
+            self._finish_sheet()
+
+    def close(self):
+        """Finish a partly filled last sheet."""
+        if self.grid is not None and self.placed % self.n_up:
+            self._finish_sheet()
+
+    def _finish_sheet(self):
+        self.draw_crop_marks()
+        self.c.showPage()
+
+    def draw_crop_marks(self):
+        """Short lines in the margin on the extension of every cut."""
+        c, grid = self.c, self.grid
+        left, bottom = grid.x0, grid.y0
+        right = left + grid.columns * grid.card_width
+        top = bottom + grid.rows * grid.card_height
+        near, far = MARK_OFFSET, MARK_OFFSET + MARK_LENGTH
+        c.saveState()
+        c.setStrokeColor(black)
+        c.setLineWidth(MARK_WIDTH)
+        for column in range(grid.columns + 1):
+            x = left + column * grid.card_width
+            c.line(x, bottom - near, x, bottom - far)
+            c.line(x, top + near, x, top + far)
+        for row in range(grid.rows + 1):
+            y = bottom + row * grid.card_height
+            c.line(left - near, y, left - far, y)
+            c.line(right + near, y, right + far, y)
+        c.restoreState()
@@ -0,0 +1,244 @@
+"""
+Raster paper textures: the vintage parchment as one compressed image.
+
+The vector background (draw_old_paper_background in the vintage script) is
+60 Bezier blobs, 3 rings and 40 splatter dots, every one of them a few
+random.randint calls to draw and a transparent path for the viewer to fill.
+Here the same effects are computed as a NumPy array in one pass:
+
+  parchment  the base colour, mottled by a few octaves of value noise
+             (small random grids, upsampled) and a fine grain
+  stains     all 60 blobs at once, as soft-edged masks with a wobbly
+             outline in windows of shape (blobs, side, side), summed onto
+             the page with one bincount
+  rings      wine glass rings and ink splatter, the same way
+
+The stains are soft, so they are computed at STAIN_DPI and upsampled; the
+rings, dots and grain are drawn at the output resolution. The result is
+encoded once as a JPEG, which is embedded as it is (DCTDecode) and shown
+with a single image XObject:
+
+    data = paper_jpeg(rng, A4, {"base": ..., "dark": ..., ...}, dpi=150)
+    draw_jpeg(c, data, *A4)
+
+With a key the JPEG is kept for later PDFs of this process, as form_cache.py
+does for forms.
+"""
+import hashlib
+import io
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+
+DEFAULT_DPI = 150
+STAIN_DPI = 24  # resolution of the blob masks, which have soft edges anyway
+QUALITY = 85  # JPEG quality
+GRAIN = 0.02  # the fine paper grain varies the brightness by up to this much
+# Value noise: (cells along the short side of the page, amplitude) per octave
+OCTAVES = ((3, 0.025), (7, 0.015), (16, 0.01), (40, 0.006))
+
+# Same counts and sizes (points) as the vector background
+BLOBS, BLOB_SIZE = 60, (50, 200)
+RINGS, RING_RADIUS, RING_WIDTH = 3, (20, 60), 2
+DOTS, DOT_RADIUS = 40, (0.5, 2.5)
+
+# JPEGs kept in memory; one A4 texture at 150 dpi is about 300 KB
+MAX_IMAGES = 16
+
+_images = OrderedDict()
+
+
+def _rgb(color):
+    return np.array(color.rgb(), dtype=np.float32)
+
+
+def _alpha(color):
+    alpha = getattr(color, "alpha", 1)
+    return 1.0 if alpha is None else float(alpha)
+
+
+def _resize(array, shape):
+    """A float32 array (rows, columns) resized to `shape` with bicubic interpolation."""
+    return np.asarray(Image.fromarray(array, "F").resize((shape[1], shape[0]), Image.BICUBIC))
+
+
+def _mottle(rand, shape):
+    """Layered value noise around 1: random grids of OCTAVES cells, upsampled and summed."""
+    rows, columns = shape
+    noise = np.ones(shape, dtype=np.float32)
+    for cells, amplitude in OCTAVES:
+        grid = rand.standard_normal((max(2, cells * rows // min(shape)), max(2, cells * columns // min(shape))),
+                                    dtype=np.float32)
+        noise += amplitude * _resize(grid, shape)
+    return noise
+
+
+def _transmittance(shape, x, y, reach, opacity):
+    """
+    How much of the paper shows through marks centred on (x, y) (arrays,
+    in pixels): prod(1 - opacity) per pixel, shape (rows, columns).
+
+    opacity(dx, dy) gives the opacity of all marks at once, in square windows
+    of +-reach pixels around their centres (dx, dy: offsets from the centres,
+    shapes (marks, 1, side) and (marks, side, 1)). The windows are summed onto
+    the page as log(1 - opacity) with one bincount, so overlapping marks
+    composite as they do drawn one after the other.
+    """
+    rows, columns = shape
+    offsets = np.arange(-reach, reach + 1)
+    column = np.floor(x).astype(np.intp)[:, None, None] + offsets[None, None, :]
+    row = np.floor(y).astype(np.intp)[:, None, None] + offsets[None, :, None]
+    dx = (column + 0.5 - x[:, None, None]).astype(np.float32)
+    dy = (row + 0.5 - y[:, None, None]).astype(np.float32)
+    # A margin of `reach` pixels takes the parts of windows beyond the edges
+    padded_columns = columns + 2 * reach
+    index = (row + reach) * padded_columns + (column + reach)
+    log = np.bincount(index.ravel(), weights=np.log1p(-opacity(dx, dy)).ravel(),
+                      minlength=(rows + 2 * reach) * padded_columns)
+    log = log.reshape(rows + 2 * reach, padded_columns)[reach:reach + rows, reach:reach + columns]
+    return np.exp(log).astype(np.float32)
+
+
+def _to_uint8(array, scaled=False):
+    """Colours from 0..1 (or 0..255 if `scaled`) as bytes."""
+    array = array if scaled else array * 255
+    array += 0.5
+    return np.clip(array, 0, 255, out=array).astype(np.uint8)
+
+
+def _blend(paper, transmittance, color):
+    """Marks of one `color` over `paper` (3, rows, columns), given how much paper shows through them."""
+    return paper * transmittance + _rgb(color)[:, None, None] * (1 - transmittance)
+
+
+def _stains(rand, shape, scale, dark, light):
+    """
+    Transmittance of the dark and of the light blobs, each (rows, columns).
+
+    A blob is a disc whose radius wobbles with the angle (random 2nd and 3rd
+    harmonics), with an edge one pixel soft.
+    """
+    size = rand.uniform(*BLOB_SIZE, BLOBS) * scale
+    x = rand.uniform(0, shape[1], BLOBS)
+    y = rand.uniform(0, shape[0], BLOBS)
+    radius = (size * rand.uniform(0.35, 0.6, BLOBS)).astype(np.float32)[:, None, None]
+    # cos and sin amplitudes of the 2nd and 3rd harmonic, the 3rd one smaller
+    harmonics = rand.uniform(-0.3, 0.3, (4, BLOBS, 1, 1)).astype(np.float32)
+    harmonics /= np.array([2, 2, 3, 3], dtype=np.float32)[:, None, None, None]
+    is_dark = rand.random(BLOBS) > 0.5
+
+    def blobs(alpha, which):
+        def opacity(dx, dy):
+            distance = np.sqrt(dx * dx + dy * dy) + 1e-6
+            cos, sin = dx / distance, dy / distance
+            # cos(2t), sin(2t), cos(3t), sin(3t) by the angle sum formulas
+            cos2, sin2 = cos * cos - sin * sin, 2 * sin * cos
+            cos3, sin3 = cos2 * cos - sin2 * sin, sin2 * cos + cos2 * sin
+            h = harmonics[:, which]
+            outline = radius[which] * (1 + h[0] * cos2 + h[1] * sin2 + h[2] * cos3 + h[3] * sin3)
+            return alpha * np.clip(outline - distance + 0.5, 0, 1)
+
+        reach = int(np.ceil(radius[which].max(initial=0) * 1.5)) + 1
+        return _transmittance(shape, x[which], y[which], reach, opacity)
+
+    return blobs(_alpha(dark), is_dark), blobs(_alpha(light), ~is_dark)
+
+
+def _marks(rand, shape, scale, ring, splatter):
+    """Transmittance of the rings and of the splatter dots, each (rows, columns)."""
+    radius = (rand.uniform(*RING_RADIUS, RINGS) * scale).astype(np.float32)[:, None, None]
+    half_width = RING_WIDTH * scale / 2
+    rings = _transmittance(shape, rand.uniform(0, shape[1], RINGS), rand.uniform(0, shape[0], RINGS),
+                           int((RING_RADIUS[1] + RING_WIDTH) * scale) + 2,
+                           lambda dx, dy: _alpha(ring) * np.clip(
+                               half_width + 0.5 - np.abs(np.sqrt(dx * dx + dy * dy) - radius), 0, 1))
+    radius = (rand.uniform(*DOT_RADIUS, DOTS) * scale).astype(np.float32)[:, None, None]
+    dots = _transmittance(shape, rand.uniform(0, shape[1], DOTS), rand.uniform(0, shape[0], DOTS),
+                          int(DOT_RADIUS[1] * scale) + 2,
+                          lambda dx, dy: _alpha(splatter) * np.clip(radius + 0.5 - np.sqrt(dx * dx + dy * dy), 0, 1))
+    return rings, dots
+
+
+def paper_array(rng, size, palette, dpi=DEFAULT_DPI):
+    """
+    The paper texture for a page of `size` (points) at `dpi`, as a uint8 array
+    (rows, columns, 3). Its randomness comes from `rng` (a random.Random);
+    `palette` has the reportlab colours "base", "dark" and "light" (stains),
+    "ring" and "splatter", the last four with their alpha.
+    """
+    rand = np.random.default_rng(rng.getrandbits(64))
+    width, height = size
+    scale = dpi / 72
+    shape = (round(height * scale), round(width * scale))
+
+    stain_scale = min(dpi, STAIN_DPI) / 72
+    stain_shape = (round(height * stain_scale), round(width * stain_scale))
+    paper = _rgb(palette["base"])[:, None, None] * _mottle(rand, stain_shape)
+    # Dark stains first, then the light ones: those of one colour composite in any order
+    dark, light = _stains(rand, stain_shape, stain_scale, palette["dark"], palette["light"])
+    paper = _blend(_blend(paper, dark, palette["dark"]), light, palette["light"])
+    paper = _to_uint8(paper.transpose(1, 2, 0))
+    paper = np.asarray(Image.fromarray(paper).resize((shape[1], shape[0]), Image.BILINEAR), dtype=np.float32)
+
+    # Grain, rings and splatter: the paper shows through grain * rings * dots, and
+    # where there are marks (a few percent of the page) their colours are added
+    rings, dots = _marks(rand, shape, scale, palette["ring"], palette["splatter"])
+    shows = rand.random(shape, dtype=np.float32)
+    shows *= 2 * GRAIN
+    shows += 1 - GRAIN
+    shows *= rings
+    shows *= dots
+    paper *= shows[:, :, None]
+    marked = np.flatnonzero((rings < 1) | (dots < 1))
+    rings, dots = rings.ravel()[marked, None], dots.ravel()[marked, None]
+    paper.reshape(-1, 3)[marked] += (_rgb(palette["ring"]) * 255) * ((1 - rings) * dots) \
+        + (_rgb(palette["splatter"]) * 255) * (1 - dots)
+    return _to_uint8(paper, scaled=True)
+
+
+def paper_jpeg(rng, size, palette, dpi=DEFAULT_DPI, key=None):
+    """paper_array() encoded as a JPEG; with a key it is kept for later calls with the same key."""
+    if key is not None and key in _images:
+        _images.move_to_end(key)
+        return _images[key]
+    buffer = io.BytesIO()
+    Image.fromarray(paper_array(rng, size, palette, dpi)).save(buffer, "JPEG", quality=QUALITY, dpi=(dpi, dpi))
+    data = buffer.getvalue()
+    if key is not None:
+        _images[key] = data
+        while len(_images) > MAX_IMAGES:
+            _images.popitem(last=False)
+    return data
+
+
+def draw_jpeg(c, data, width, height):
+    """
+    Draw the JPEG `data` over (0, 0, width, height) of canvas `c`, embedded once per PDF.
+
+    Like c.drawImage(), but the image is named after a digest of the JPEG
+    itself and its bytes are embedded as they are: drawImage() decodes the
+    JPEG to name it, and with reportlab's default ASCII85 setting encodes
+    it again as text, which takes longer than computing the texture.
+    """
+    name = "paper_" + hashlib.md5(data).hexdigest()
+    doc = c._doc
+    xobject_name = doc.getXObjectName(name)
+    if xobject_name not in doc.idToObject:
+        image = PDFImageXObject(name)
+        with Image.open(io.BytesIO(data)) as jpeg:
+            image.width, image.height = jpeg.size
+        image.bitsPerComponent = 8
+        image.colorSpace = "DeviceRGB"
+        image.streamContent = data
+        image._filters = ("DCTDecode",)
+        image.mask = None
+        doc.Reference(image, xobject_name)
+        doc.addForm(name, image)
+    c._currentPageHasImages = 1
+    c.saveState()
+    c.scale(width, height)
+    c._code.append(f"/{xobject_name} Do")
+    c.restoreState()
+    c._formsinuse.append(name)
@@ -0,0 +1,182 @@
+"""
+Concatenate reportlab-generated PDFs into one document without re-drawing them.
+
+Each input is copied object by object: the page, content stream, font and
+form objects are renumbered and written straight to the output, and only the
+catalog, page tree, cross-reference table and, for fillable cards, the
+AcroForm field list are rebuilt. Inputs are read one
+at a time, so memory use is bounded by the largest input, not the output.
+
+This is deliberately not a general PDF parser. It relies on the simple layout
+reportlab writes (a classic xref table, direct objects, no object streams).
+"""
+import hashlib
+import re
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF\s*$")
+_XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_REF = re.compile(rb"(\d+) 0 R\b")
+# An object reference, or a literal or hex string, inside which "N 0 R" is just text (e.g. a field value)
+_REF_OR_STRING = re.compile(rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|(\d+) 0 R\b")
+_OBJ_HEADER = re.compile(rb"\d+ 0 obj\s*")
+_FIELDS = re.compile(rb"/Fields\s*\[([^\]]*)\]")
+
+
+def _ref(data, key):
+    """Return the object number of `/key N 0 R` in a dictionary, or None."""
+    match = re.search(rb"/" + key + rb"\s+(\d+) 0 R", data)
+    return int(match.group(1)) if match else None
+
+
+def read_objects(data):
+    """
+    Split a reportlab PDF into its objects.
+
+    Returns (objects, trailer) where objects maps object number -> the bytes
+    between `N 0 obj` and `endobj`, and trailer is the raw trailer dictionary.
+    """
+    match = _STARTXREF.search(data[-64:])
+    if not match:
+        raise ValueError("not a PDF produced by reportlab: missing startxref")
+    xref_at = int(match.group(1))
+    xref_end = data.index(b"trailer", xref_at)
+    trailer = data[xref_end:data.index(b"startxref", xref_end)]
+
+    offsets = {}
+    section = data[xref_at + 4:xref_end].split(b"\n")
+    number = 0
+    for line in section:
+        line = line.strip()
+        if not line:
+            continue
+        entry = _XREF_ENTRY.match(line)
+        if entry:
+            if entry.group(3) == b"n":
+                offsets[number] = int(entry.group(1))
+            number += 1
+        else:
+            # subsection header: "<first object> <count>"
+            number = int(line.split()[0])
+
+    # Objects are written back to back, so each one ends where the next begins
+    bounds = sorted(offsets.values()) + [xref_at]
+    next_offset = {start: end for start, end in zip(bounds, bounds[1:])}
+    objects = {}
+    for number, start in offsets.items():
+        body = data[start:next_offset[start]]
+        body = body[_OBJ_HEADER.match(body).end():]
+        objects[number] = body[:body.rindex(b"endobj")].rstrip()
+    return objects, trailer
+
+
+def _split_stream(body):
+    """Split an object body into its dictionary part and its stream data (if any)."""
+    at = body.find(b"\nstream")
+    if at < 0:
+        return body, b""
+    return body[:at], body[at:]
+
+
+class PDFMerger:
+    """
+    Streams the pages of several PDFs into one output file, in append order.
+
+    Usage:
+        with open("out.pdf", "wb") as f:
+            merger = PDFMerger(f)
+            merger.append(open("a.pdf", "rb").read())
+            merger.append(open("b.pdf", "rb").read())
+            merger.close()
+
+    Output bytes depend only on the inputs, so identical shards always merge
+    into an identical document.
+    """
+
+    # Fixed object numbers for the parts rebuilt at the end
+    CATALOG, PAGES, INFO = 1, 2, 3
+
+    def __init__(self, out):
+        self.out = out
+        self.position = 0
+        self.offsets = {}
+        self.kids = []
+        self.fields = []  # top-level AcroForm fields of all inputs
+        self.acroform = None  # the first input's AcroForm dictionary (fonts, default appearance)
+        self.next_number = self.INFO + 1
+        self.digest = hashlib.md5()
+        self._write(b"%PDF-1.4\n%\x93\x8c\x8b\x9e ReportLab Generated PDF document http://www.reportlab.com\n")
+
+    def _write(self, data):
+        self.out.write(data)
+        self.digest.update(data)
+        self.position += len(data)
+
+    def _write_object(self, number, body):
+        self.offsets[number] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    @property
+    def page_count(self):
+        return len(self.kids)
+
+    def append(self, data):
+        """Copy every page (and everything it uses) of the PDF bytes `data`."""
+        objects, trailer = read_objects(data)
+        catalog = _ref(trailer, b"Root")
+        page_tree = _ref(objects[catalog], b"Pages")
+        kids_array = objects[page_tree].split(b"/Kids", 1)[1].split(b"]", 1)[0]
+        kids = [int(n) for n in _REF.findall(kids_array)]
+
+        # The catalog, page tree, outlines and info dictionary are rebuilt
+        acroform = _ref(objects[catalog], b"AcroForm")
+        skip = {catalog, page_tree, acroform, _ref(trailer, b"Info"), _ref(objects[catalog], b"Outlines")}
+        copied = [number for number in sorted(objects) if number not in skip]
+        # Pages now hang off the merged page tree
+        renumber = {page_tree: self.PAGES}
+        for number in copied:
+            renumber[number] = self.next_number
+            self.next_number += 1
+
+        def fix_ref(match):
+            if match.group(1) is None:
+                return match.group(0)  # a string, copied as it is
+            return b"%d 0 R" % renumber[int(match.group(1))]
+
+        for number in copied:
+            head, stream = _split_stream(objects[number])
+            self._write_object(renumber[number], _REF_OR_STRING.sub(fix_ref, head) + stream)
+        self.kids.extend(renumber[number] for number in kids)
+
+        if acroform is not None:
+            # The fields of every input go into one AcroForm; the fonts it names come along with the first input
+            form = _REF_OR_STRING.sub(fix_ref, objects[acroform])
+            self.fields.extend(int(n) for n in _REF.findall(_FIELDS.search(form).group(1)))
+            if self.acroform is None:
+                self.acroform = form
+
+    def close(self):
+        """Write the page tree, catalog, info dictionary, xref table and trailer."""
+        kids = b" ".join(b"%d 0 R" % n for n in self.kids)
+        self._write_object(self.PAGES, b"<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>" % (len(self.kids), kids))
+        form = b""
+        if self.acroform is not None:
+            fields = b" ".join(b"%d 0 R" % n for n in self.fields)
+            form = b"/AcroForm %d 0 R " % self.next_number
+            self._write_object(self.next_number,
+                               _FIELDS.sub(lambda match: b"/Fields [ %s ]" % fields, self.acroform))
+            self.next_number += 1
+        self._write_object(self.CATALOG, b"<<\n%s/PageMode /UseNone /Pages %d 0 R /Type /Catalog\n>>"
+                           % (form, self.PAGES))
+        self._write_object(self.INFO, b"<<\n/Creator (Wine Tasting Card Generator) "
+                                      b"/Producer (ReportLab PDF Library - www.reportlab.com)\n>>")
+
+        doc_id = self.digest.hexdigest().encode()
+        xref_at = self.position
+        size = self.next_number
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for number in range(1, size):
+            lines.append(b"%010d 00000 n \n" % self.offsets[number])
+        lines.append(b"trailer\n<<\n/ID [<%s><%s>] /Info %d 0 R /Root %d 0 R /Size %d\n>>\n"
+                     % (doc_id, doc_id, self.INFO, self.CATALOG, size))
+        lines.append(b"startxref\n%d\n%%%%EOF\n" % xref_at)
+        self._write(b"".join(lines))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Thin client for the render server (render_server.py).
+
+Sends one render request over the server's Unix socket and waits for the PDF
+to be written. It only uses the standard library, so starting it costs a bare
+interpreter start instead of importing reportlab and parsing fonts. If no
+server is running the card is drawn locally, like the generator scripts do.
+
+Usage: python render_client.py -s vintage -f name="Barolo 2019" -f producer=Vietti -o card.pdf
+       python render_client.py wines.csv -s handwritten -o event.pdf
+       python render_client.py wines.csv -s vintage --svg cards/
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+from card_quality import LEVELS
+from card_schema import load_schema
+
+
+def default_socket_path():
+    """$WINE_CARDS_SOCKET, or a per-user socket in the runtime/temp directory."""
+    path = os.environ.get("WINE_CARDS_SOCKET")
+    if path:
+        return path
+    directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(directory, f"wine-cards-{os.getuid()}.sock")
+
+
+def request(message, socket_path=None):
+    """
+    Send one request dict to the server and return its response dict.
+
+    Raises OSError (e.g. FileNotFoundError, ConnectionRefusedError) if no
+    server is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or default_socket_path())
+        with sock.makefile("rwb") as stream:
+            stream.write(json.dumps(message).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("render server closed the connection")
+    return json.loads(line)
+
+
+def render(style, output, cards=None, wine_list=None, copies=1, seed=None, socket_path=None, svg=False, **options):
+    """
+    Ask the server to render cards (a list of dicts) or a wine list file into `output`,
+    or with svg=True into one SVG file per card in the directory `output`.
+
+    Returns the server's response (pages, milliseconds); raises RuntimeError
+    if the server reports an error and OSError if there is no server.
+    """
+    message = {
+        "command": "render",
+        "style": style,
+        "output": os.path.abspath(output),
+        "cards": cards,
+        "wine_list": os.path.abspath(wine_list) if wine_list else None,
+        "copies": copies,
+        "seed": seed,
+        "options": options,
+        "format": "svg" if svg else "pdf",
+    }
+    response = request(message, socket_path)
+    if not response.get("ok"):
+        raise RuntimeError(response.get("error", "render failed"))
+    return response
+
+
+def render_card(style, output, card=None, seed=None):
+    """Render one card on the server if it is running, otherwise draw it in this process."""
+    try:
+        return render(style, output, cards=[card or {}], seed=seed)
+    except OSError:
+        import generate_wine_tasting_batch
+        pages = generate_wine_tasting_batch.render_batch([card or {}], output, style=style, seed=seed)
+        return {"ok": True, "pages": pages}
+
+
+def parse_field(text):
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name.strip(), value.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render tasting cards on the running render server.")
+    parser.add_argument("wine_list", nargs="?", help="CSV, JSON or JSON Lines file (omit for a single card)")
+    parser.add_argument("-o", "--output", default="Tasting_Card.pdf", help="output PDF file")
+    parser.add_argument("--svg", metavar="DIR", help="write the cards as SVG files (one per card) into DIR instead")
+    parser.add_argument("-s", "--style", default="handwritten", help="vintage, handwritten or sketchy")
+    parser.add_argument("-f", "--field", type=parse_field, action="append", default=[], metavar="NAME=VALUE",
+                        help="header value of the single card, e.g. name=Barolo (repeatable)")
+    parser.add_argument("-n", "--copies", type=int, default=1, help="copies of each card")
+    parser.add_argument("--seed", help="make the hand-drawn effects reproducible")
+    parser.add_argument("--quality", choices=list(LEVELS),
+                        help="detail of the decorative effects, e.g. screen for a quick preview (default: print)")
+    parser.add_argument("--schema", metavar="FILE",
+                        help="card schema (JSON or TOML); the server compiles each distinct schema once")
+    parser.add_argument("--socket", help="server socket (default: $WINE_CARDS_SOCKET or a per-user path)")
+    parser.add_argument("--no-fallback", action="store_true", help="fail instead of drawing locally without a server")
+    parser.add_argument("--stats", action="store_true", help="print the server's cache statistics and exit")
+    parser.add_argument("--shutdown", action="store_true", help="stop the server and exit")
+    args = parser.parse_args(argv)
+
+    options = {"quality": args.quality} if args.quality else {}
+    if args.schema:
+        try:
+            options["schema"] = load_schema(args.schema)
+        except (OSError, ValueError) as e:
+            parser.error(f"--schema {args.schema}: {e}")
+    try:
+        if args.stats or args.shutdown:
+            print(json.dumps(request({"command": "stats" if args.stats else "shutdown"}, args.socket), indent=1))
+            return
+        cards = None if args.wine_list else [dict(args.field)]
+        response = render(args.style, args.svg or args.output, cards=cards, wine_list=args.wine_list,
+                          copies=args.copies, seed=args.seed, socket_path=args.socket, svg=bool(args.svg), **options)
+    except OSError as e:
+        if args.no_fallback or args.stats or args.shutdown:
+            sys.exit(f"No render server at {args.socket or default_socket_path()}: {e}")
+        # No server: same result, just without the warm start
+        import generate_wine_tasting_batch
+        cards = generate_wine_tasting_batch.read_cards(args.wine_list) if args.wine_list else [dict(args.field)]
+        cards = generate_wine_tasting_batch.repeat_cards(cards, args.copies)
+        render_batch = (generate_wine_tasting_batch.render_batch_svg if args.svg
+                        else generate_wine_tasting_batch.render_batch)
+        pages = render_batch(cards, args.svg or args.output, style=args.style, seed=args.seed, **options)
+        print(f"Wrote {pages} cards to {args.svg or args.output} (no render server running)")
+        return
+    except RuntimeError as e:
+        sys.exit(f"Render failed: {e}")
+    print(f"Wrote {response['pages']} cards to {args.svg or args.output} in {response['ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
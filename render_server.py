@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Long-lived render server for printing cards on demand (e.g. at the tasting bar).
+
+Starting Python, importing reportlab and loading the fonts costs far more than
+drawing a card. The server pays for that once: it registers the fonts, builds
+the layout of every style and records the card skeletons (see form_cache),
+then renders requests sent by render_client.py over a Unix domain socket, one
+at a time, straight into the requested output file.
+
+Protocol: the client sends one JSON object per line and gets one back.
+  {"command": "render", "style": "vintage", "output": "/abs/card.pdf",
+   "cards": [{"name": ...}] or null, "wine_list": "/abs/wines.csv" or null,
+   "copies": 1, "seed": "2026" or null, "options": {}, "format": "pdf" or "svg"}
+      -> {"ok": true, "pages": 1, "ms": 4.2}
+  {"command": "stats"}     -> font metric, form and display list cache counters
+  {"command": "shutdown"}  -> stops the server
+Errors come back as {"ok": false, "error": "..."}.
+
+Requests without a seed use the server's --seed, so their skeletons can be
+replayed; without either, every card gets fresh random jitter (and is drawn
+in full). With "format": "svg" the output is a directory that gets one SVG
+file per card, replayed from the same recorded display lists as the PDFs.
+
+Usage: python render_server.py [--socket PATH] [--seed 2026]
+"""
+import argparse
+import io
+import json
+import os
+import socketserver
+import time
+
+import display_list
+import font_metrics
+import form_cache
+import generate_wine_tasting_batch as batch
+from render_client import default_socket_path, request
+
+
+class RenderRequestHandler(socketserver.StreamRequestHandler):
+    """Answers every JSON line of a connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class RenderServer(socketserver.UnixStreamServer):
+    """
+    Single-threaded Unix socket server around generate_wine_tasting_batch.render_batch.
+
+    Usage:
+        server = RenderServer("/run/user/1000/wine-cards.sock", seed="2026")
+        server.warm_up()
+        server.serve_until_shutdown()
+    """
+
+    def __init__(self, socket_path, seed=None):
+        self.socket_path = socket_path
+        self.seed = seed
+        self.requests = 0
+        self.running = True
+        if os.path.exists(socket_path):
+            try:
+                request({"command": "stats"}, socket_path)
+            except OSError:
+                os.unlink(socket_path)  # left over from a server that did not shut down cleanly
+            else:
+                raise RuntimeError(f"A render server is already running on {socket_path}")
+        old_umask = os.umask(0o177)  # socket only usable by this user
+        try:
+            super().__init__(socket_path, RenderRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def warm_up(self):
+        """Load fonts and layouts and record the skeleton of every style."""
+        for style in batch.STYLES:
+            batch.get_card_layout(style)
+            if self.seed is not None:
+                # Vintage pages get a paper of their own unless a request pools them, so one card will do
+                batch.get_card_renderer(style)(io.BytesIO(), [{}], seed=self.seed)
+
+    def dispatch(self, message):
+        command = message.get("command", "render")
+        if command == "render":
+            return self.render(message)
+        if command == "stats":
+            return {"ok": True, "requests": self.requests, "font_metrics": font_metrics.stats(),
+                    "forms": form_cache.stats(), "display_lists": display_list.stats()}
+        if command == "shutdown":
+            self.running = False
+            return {"ok": True}
+        raise ValueError(f"Unknown command '{command}'")
+
+    def render(self, message):
+        output = message["output"]
+        if not os.path.isabs(output):
+            raise ValueError("output must be an absolute path")
+        if message.get("wine_list"):
+            cards = batch.read_cards(message["wine_list"])
+        else:
+            cards = (batch.clean_card(card) for card in message.get("cards") or [{}])
+        cards = batch.repeat_cards(cards, message.get("copies") or 1)
+        seed = message.get("seed")
+        if seed is None:
+            seed = self.seed
+
+        start = time.perf_counter()
+        render = batch.render_batch_svg if message.get("format") == "svg" else batch.render_batch
+        pages = render(cards, output, style=message.get("style", "handwritten"), seed=seed,
+                       **(message.get("options") or {}))
+        self.requests += 1
+        return {"ok": True, "pages": pages, "ms": (time.perf_counter() - start) * 1000}
+
+    def serve_until_shutdown(self):
+        """Handle requests until a shutdown command arrives, then remove the socket."""
+        try:
+            while self.running:
+                self.handle_request()
+        finally:
+            self.server_close()
+            os.unlink(self.socket_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep fonts and layouts warm and render cards over a Unix socket.")
+    parser.add_argument("--socket", default=default_socket_path(), help="socket path (default: %(default)s)")
+    parser.add_argument("--seed", help="seed for requests that do not bring their own")
+    args = parser.parse_args(argv)
+
+    server = RenderServer(args.socket, seed=args.seed)
+    start = time.perf_counter()
+    server.warm_up()
+    print(f"Render server ready on {args.socket} (warm-up {time.perf_counter() - start:.2f}s)")
+    try:
+        server.serve_until_shutdown()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Opt-in instrumentation of the card renderers: time, PDF operators and
+graphics state changes per section of the card and per drawing helper.
+
+    import render_trace
+    render_trace.start()
+    create_vintage_tasting_card("card.pdf", seed=1)
+    trace = render_trace.stop()
+    trace.write_folded("card.folded")   # flamegraph.pl, speedscope, inferno
+    print(trace.summary())
+
+The style modules mark their sections with `with section("skeleton"):` and
+decorate their drawing helpers with @traced. While no trace is running,
+section() hands out one shared do-nothing context manager, traced() returns
+the function unchanged and watch() leaves the canvas alone, so a normal
+render pays next to nothing and produces the same bytes.
+
+The helpers draw into display lists (see display_list.py), and only the
+replay of a list puts operators on the canvas. A list recorded during a
+trace notes which sections drew which of its ops (frames()); replaying it
+enters those sections again around their ops (regroup()), so operators,
+state changes and replay time are counted per section and helper, under
+the section that replayed the list ("pages;replay;taste;draw_bubble"). Lists
+recorded before the trace started count as "replay" alone.
+
+The folded output has one line per call stack with the time spent in that
+frame itself, in microseconds ("skeleton;taste;draw_bubble 812").
+"""
+import re
+import time
+from collections import defaultdict
+
+# Operators that change the graphics state (colour, line style, text state,
+# ExtGState, save/restore and the transformation matrix)
+STATE_OPERATORS = frozenset((
+    "q", "Q", "cm", "w", "J", "j", "M", "d", "ri", "i", "gs", "CS", "cs", "SC", "SCN", "sc", "scn",
+    "G", "g", "RG", "rg", "K", "k", "Tc", "Tw", "Tz", "TL", "Tf", "Tr", "Ts",
+))
+
+_STRING = re.compile(r"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>")
+_TOKEN = re.compile(r"/?[^\s\[\]()<>{}/%]+")
+_NUMBER = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)$")
+
+_trace = None  # the running Trace, if any
+
+
+def _operators(content):
+    content = _STRING.sub(" 0 ", content)
+    return [token for token in _TOKEN.findall(content) if not token.startswith("/") and not _NUMBER.match(token)]
+
+
+def count_operators(content):
+    """
+    Number of operators in a piece of content stream (tokens that are neither
+    operands nor names). Also counts the pages of finished PDFs for
+    benchmark.py.
+    """
+    return len(_operators(content))
+
+
+def _count(chunks):
+    for chunk in chunks:
+        operators = _operators(chunk)
+        _trace.operators += len(operators)
+        _trace.state_changes += sum(1 for operator in operators if operator in STATE_OPERATORS)
+
+
+class Trace:
+    """Timings and counters of one traced run, keyed by call stack."""
+
+    def __init__(self):
+        self.operators = 0
+        self.state_changes = 0
+        # Open frames: [path, start time, operators, state changes, the children's time, operators, state changes,
+        # and the number of the call]
+        self._stack = []
+        self.calls = 0
+        # "a;b;c" -> [calls, total s, self s, self operators, self state changes], in order of first call
+        self.frames = {}
+
+    def enter(self, name):
+        path = f"{self._stack[-1][0]};{name}" if self._stack else name
+        if path not in self.frames:
+            self.frames[path] = [0, 0.0, 0.0, 0, 0]
+        self.calls += 1
+        self._stack.append([path, time.perf_counter(), self.operators, self.state_changes, 0.0, 0, 0, self.calls])
+
+    def exit(self):
+        path, start, operators, state_changes, child_time, child_ops, child_states, _ = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        operators = self.operators - operators
+        state_changes = self.state_changes - state_changes
+        frame = self.frames[path]
+        frame[0] += 1
+        frame[1] += elapsed
+        frame[2] += elapsed - child_time
+        frame[3] += operators - child_ops
+        frame[4] += state_changes - child_states
+        if self._stack:
+            parent = self._stack[-1]
+            parent[4] += elapsed
+            parent[5] += operators
+            parent[6] += state_changes
+
+    def folded(self):
+        """Folded stacks for flamegraph.pl / speedscope: 'a;b;c <self microseconds>' per line."""
+        return "".join(f"{path} {round(frame[2] * 1e6)}\n" for path, frame in self.frames.items())
+
+    def write_folded(self, path):
+        with open(path, "w") as f:
+            f.write(self.folded())
+
+    def summary(self):
+        """A table of every section (as a call tree) and of every helper, with time and counters."""
+        lines = [f"{'section':<40}{'calls':>8}{'total ms':>11}{'self ms':>10}{'ops':>9}{'states':>9}"]
+        for path, (calls, total, own, operators, state_changes) in self.frames.items():
+            label = "  " * path.count(";") + path.rsplit(";", 1)[-1]
+            lines.append(f"{label:<40}{calls:>8}{total * 1000:>11.2f}{own * 1000:>10.2f}"
+                         f"{operators:>9}{state_changes:>9}")
+
+        # The same helper is called from many sections; add them up by name
+        by_name = defaultdict(lambda: [0, 0.0, 0, 0])
+        for path, (calls, _, own, operators, state_changes) in self.frames.items():
+            totals = by_name[path.rsplit(";", 1)[-1]]
+            totals[0] += calls
+            totals[1] += own
+            totals[2] += operators
+            totals[3] += state_changes
+        lines.append("")
+        lines.append(f"{'by name (self)':<40}{'calls':>8}{'':>11}{'self ms':>10}{'ops':>9}{'states':>9}")
+        for name, (calls, own, operators, state_changes) in sorted(by_name.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<40}{calls:>8}{'':>11}{own * 1000:>10.2f}{operators:>9}{state_changes:>9}")
+        lines.append(f"{'all':<40}{'':>8}{'':>11}{sum(t[1] for t in by_name.values()) * 1000:>10.2f}"
+                     f"{self.operators:>9}{self.state_changes:>9}")
+        return "\n".join(lines)
+
+    def open_frames(self):
+        """The open frames, outermost first, as (name, number of the call) pairs."""
+        return tuple((frame[0].rsplit(";", 1)[-1], frame[7]) for frame in self._stack)
+
+
+class _Section:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if _trace is not None:
+            _trace.enter(self.name)
+
+    def __exit__(self, *exc):
+        if _trace is not None:
+            _trace.exit()
+
+
+class _NoSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SECTION = _NoSection()
+
+
+def section(name):
+    """Context manager timing the enclosed drawing as `name` (nested in the current section)."""
+    if _trace is None:
+        return _NO_SECTION
+    return _Section(name)
+
+
+def traced(func):
+    """
+    Decorator timing every call of a drawing helper.
+
+    Decides when it is applied, so it is applied per render rather than at
+    import: a StyleBackend wraps its TRACED primitives when it is made (once
+    per PDF) and render_cards() wraps draw_header_values. Without a running
+    trace it returns `func` itself.
+    """
+    if _trace is None:
+        return func
+    name = func.__name__
+
+    def wrapper(*args, **kwargs):
+        with _Section(name):
+            return func(*args, **kwargs)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def frames():
+    """The sections open right now, outermost first, as (name, call) pairs; () while no trace is running."""
+    if _trace is None:
+        return ()
+    return _trace.open_frames()
+
+
+def regroup(items, marks):
+    """
+    Yield `items`, each inside the sections it was made in: `marks` are
+    (index of an item, frames()) pairs in order, each holding from its item
+    up to the next mark. Sections are entered and left as the frames
+    change, nested in the current one, so a mark in the same call as the
+    one before continues that call. Without a running trace the items are
+    passed through.
+    """
+    if _trace is None or not marks:
+        yield from items
+        return
+    trace = _trace
+    opened = []
+    bounds = [index for index, _ in marks[1:]] + [None]
+    items = iter(items)
+    try:
+        for (start, marked), end in zip(marks, bounds):
+            common = 0
+            while common < min(len(opened), len(marked)) and opened[common] == marked[common]:
+                common += 1
+            while len(opened) > common:
+                trace.exit()
+                opened.pop()
+            for frame in marked[common:]:
+                trace.enter(frame[0])
+                opened.append(frame)
+            if end is None:
+                yield from items
+            else:
+                for _ in range(end - start):
+                    yield next(items)
+    finally:
+        for _ in opened:
+            trace.exit()
+
+
+class _CountingCode(list):
+    """
+    A canvas's list of content stream chunks that counts the operators and
+    state changes added to it. Counting what reaches the content stream
+    leaves out the changes StateCanvas drops as redundant.
+    """
+    __slots__ = ()
+
+    def append(self, chunk):
+        if _trace is not None:
+            _count((chunk,))
+        list.append(self, chunk)
+
+    def extend(self, chunks):
+        chunks = list(chunks)
+        if _trace is not None:
+            _count(chunks)
+        list.extend(self, chunks)
+
+
+class _Watched:
+    """Mixin keeping a canvas's _code (page and form content alike) a _CountingCode."""
+
+    @property
+    def _code(self):
+        return self.__dict__["_code"]
+
+    @_code.setter
+    def _code(self, value):
+        if not isinstance(value, _CountingCode):
+            value = _CountingCode(value)
+        self.__dict__["_code"] = value
+
+
+_watched_classes = {}
+
+
+def watch(c):
+    """Count the operators and state changes of canvas `c` while a trace is running."""
+    if _trace is None or isinstance(c, _Watched):
+        return
+    cls = type(c)
+    if cls not in _watched_classes:
+        _watched_classes[cls] = type(f"Watched{cls.__name__}", (_Watched, cls), {})
+    c.__class__ = _watched_classes[cls]
+    c._code = c.__dict__["_code"]
+
+
+def start():
+    """Start a new trace; renders from now on are instrumented."""
+    global _trace
+    _trace = Trace()
+    return _trace
+
+
+def stop():
+    """Stop tracing and return the Trace."""
+    global _trace
+    trace, _trace = _trace, None
+    return trace
+
+
+def active():
+    return _trace is not None
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Read the answers off scanned, filled-in tasting cards (optical mark recognition).
+
+Each page of the scans (PNG, TIFF, multi-page TIFF, ...) is aligned to the
+bubble manifest of the cards it was printed from (see card_manifest.py), and
+every bubble's fill level is measured at once with NumPy:
+
+1. Alignment. The printed bubble outlines are the fiducials. The scan is
+   turned into a map of thin lines (see thin_lines), a coarse search over
+   shift and scale on a pooled copy of it, then a fine one at full
+   resolution, finds the transform that puts the most outline points on a
+   line. Each bubble is then looked for within a few points of that and an
+   affine transform is fitted through the bubbles that were found, so
+   small rotations and uneven printer scaling are absorbed too. Every
+   candidate shift of every outline point is one gather from the flattened
+   line map.
+2. Scoring. The mean grey level of a grid of points inside each bubble,
+   against that of the paper just below it (which keeps the vintage paper
+   texture out), for all bubbles with one gather.
+3. Answers. In every row the fullest bubble is the answer if it is marked
+   (fill >= MARKED) and the row is blank otherwise. The confidence tells how
+   clear that was: the gap to the runner-up, or how far below MARKED a blank
+   row stayed. Double marks come out with a low confidence.
+
+Usage:
+    python generate_wine_tasting_batch.py wines.csv --seed 1 --manifest cards.json -o cards.pdf
+    ... print, taste, scan ...
+    python scan_cards.py scans/*.png --manifest cards.json -o answers.csv --jobs 8
+
+Without --manifest the layout of --style is used. Scans must show the whole
+page, the right way up, at any resolution (150 dpi is plenty); sheets printed
+with --n-up are read slot by slot, leaving out the empty slots of a partly
+filled last sheet.
+
+A page takes a few tens of milliseconds, about half of it decoding the
+image, so throughput grows with --jobs and with cards per sheet.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+WORKING_DPI = 150  # scans are reduced to about this before reading
+SHIFT_RANGE = 0.04  # of the page size, how far the coarse search looks
+SCALES = np.linspace(0.96, 1.04, 9)  # print/scan scale factors tried by the coarse search
+COARSE = 6  # reduction of the line map for the coarse search
+LOCAL_RANGE = 3.0  # points a bubble is looked for around its globally aligned position
+OUTLIER = 1.5  # points of misfit after which a bubble does not count for the affine fit
+
+EDGE_SAMPLES = 8  # outline points per long edge of a bubble
+LINE_GAP = 1.5  # points beside a line that must be lighter than the line
+LINE_CONTRAST = 20  # by how many grey levels (of 255)
+FILL_SAMPLES = (10, 4)  # grid of points read inside each bubble
+INSET = 2.0  # points between a bubble's outline and the points read inside it
+BACKGROUND_GAP = 1.0  # points between a bubble and the strip of paper below it
+BACKGROUND_HEIGHT = 5.0
+INK = 0.6  # darkness of a bubble filled in with a pen; reads as fill 1.0
+MARKED = 0.3  # fill from which a bubble counts as marked
+PRINTED = 0.1  # share of its bubbles' outlines a slot shows at least if a card is printed in it
+
+POINTS_PER_INCH = 72
+
+
+def _grid_points(rects, columns, rows):
+    """A columns x rows grid of points evenly inside each of (n, 4) rects (x1, y1, x2, y2): (n, points, 2)."""
+    u, v = np.meshgrid((np.arange(columns) + 0.5) / columns, (np.arange(rows) + 0.5) / rows)
+    u, v = u.ravel()[None, :], v.ravel()[None, :]
+    x1, y1, x2, y2 = (rects[:, i:i + 1] for i in range(4))
+    return np.stack([x1 + u * (x2 - x1), y1 + v * (y2 - y1)], axis=-1)
+
+
+class CardTemplate:
+    """The bubbles of one printed page (every N-up slot), as arrays in page coordinates."""
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.page_width = manifest["page"]["width"]
+        self.page_height = manifest["page"]["height"]
+        rows = {row["label"]: number for number, row in enumerate(manifest["rows"])}
+        self.options = {row["label"]: row["options"] for row in manifest["rows"]}
+
+        boxes, slot_of, row_of, option_of = [], [], [], []
+        for slot, (x0, y0, scale) in enumerate(manifest["slots"]["values"]):
+            for label, option, x, y, w, h in manifest["bubbles"]:
+                boxes.append((x0 + x * scale, y0 + y * scale, w * scale, h * scale))
+                slot_of.append(slot)
+                row_of.append(rows[label])
+                option_of.append(self.options[label].index(option))
+        self.boxes = np.array(boxes, dtype=np.float64)  # x, y, w, h
+        self.slot = np.array(slot_of)
+        self.row = np.array(row_of)
+        self.option = np.array(option_of)
+        # One group per row of each slot; bubbles of a group are consecutive
+        group_key = self.slot * len(manifest["rows"]) + self.row
+        self.group_start = np.flatnonzero(np.r_[True, group_key[1:] != group_key[:-1]])
+
+        # Sample points, (bubbles, points, 2): on the outline, inside, and on the paper just below
+        self.outline = self._outline()
+        x, y, w, h = self.boxes.T
+        inset = np.minimum(INSET, h / 3)
+        self.inside = _grid_points(np.stack([x + inset, y + inset, x + w - inset, y + h - inset], axis=1),
+                                   *FILL_SAMPLES)
+        top = y - BACKGROUND_GAP
+        self.paper = _grid_points(np.stack([x + INSET, top - BACKGROUND_HEIGHT, x + w - INSET, top], axis=1),
+                                  FILL_SAMPLES[0], 2)
+
+    def _outline(self):
+        """Outline sample points of every bubble: (bubbles, samples, 2) in page coordinates."""
+        x, y, w, h = (self.boxes[:, i:i + 1] for i in range(4))
+        t = np.linspace(0.2, 0.8, EDGE_SAMPLES)[None, :]  # clear of the rounded ends
+        along = x + t * w
+        xs = np.hstack([along, along, x, x + w])
+        ys = np.hstack([np.broadcast_to(y, along.shape), np.broadcast_to(y + h, along.shape), y + h / 2, y + h / 2])
+        return np.stack([xs, ys], axis=-1)
+
+
+# --- Images ---
+
+def load_pages(path):
+    """Yield every page of an image file as a greyscale image."""
+    with Image.open(path) as image:
+        for frame in ImageSequence.Iterator(image):
+            yield frame.convert("L")
+
+
+def prepare(page, template):
+    """The page as a uint8 array at about WORKING_DPI, and its pixels per point."""
+    pixels_per_point = page.width / template.page_width
+    factor = max(1, int(pixels_per_point * POINTS_PER_INCH / WORKING_DPI))
+    if factor > 1:
+        page = page.reduce(factor)
+    return np.asarray(page), pixels_per_point / factor
+
+
+def sample(image, points):
+    """Image values at the nearest pixels to (..., 2) (col, row) positions, clamped to the image."""
+    cols = np.clip(np.rint(points[..., 0]).astype(np.intp), 0, image.shape[1] - 1)
+    rows = np.clip(np.rint(points[..., 1]).astype(np.intp), 0, image.shape[0] - 1)
+    return image[rows, cols]
+
+
+# --- Alignment ---
+
+def to_pixels(affine, points):
+    """Apply a 2x3 page point -> (col, row) transform to (..., 2) points."""
+    return points @ affine[:, :2].T + affine[:, 2]
+
+
+def thin_lines(gray, pixels_per_point):
+    """
+    Where the scan shows thin lines: pixels LINE_CONTRAST darker than the
+    pixels LINE_GAP points away on both sides, across or along. Light grey
+    outlines count as much as black ones, and printed text, shaded areas and
+    paper texture hardly at all.
+    """
+    gap = max(1, int(round(LINE_GAP * pixels_per_point)))
+    padded = np.pad(gray, gap, mode="edge")
+    height, width = gray.shape
+    middle = padded[gap:gap + height]
+    across = np.minimum(padded[:height, gap:gap + width], padded[2 * gap:, gap:gap + width])
+    along = np.minimum(middle[:, :width], middle[:, 2 * gap:])
+    return np.subtract(np.maximum(across, along), gray, dtype=np.int16) > LINE_CONTRAST
+
+
+def _score(lines, points, shifts):
+    """
+    The share of `points` (..., samples, 2) that lie on a line, under each of
+    (k, 2) whole-pixel shifts: (..., k). All shifts of all points are read
+    with one gather from the flattened, padded line map.
+    """
+    margin = int(np.abs(shifts).max())
+    height, width = lines.shape
+    stride = width + 2 * margin
+    padded = np.pad(lines, margin).ravel()
+    cols = np.clip(np.rint(points[..., 0]).astype(np.intp), 0, width - 1) + margin
+    rows = np.clip(np.rint(points[..., 1]).astype(np.intp), 0, height - 1) + margin
+    offsets = shifts[:, 1].astype(np.intp) * stride + shifts[:, 0].astype(np.intp)
+    on_line = padded[(rows * stride + cols)[..., None, :] + offsets[:, None]]
+    return np.count_nonzero(on_line, axis=-1) / on_line.shape[-1]
+
+
+def _scaled(affine, scale, center):
+    """`affine` followed by scaling the pixels by `scale` about `center`."""
+    scaled = affine * scale
+    scaled[:, 2] += center * (1 - scale)
+    return scaled
+
+
+def _search(lines, points, base, scales, shifts, center):
+    """The affine transform among `base` scaled by `scales` and moved by `shifts` that puts most `points` on lines."""
+    best = (-1.0, None)
+    for scale in scales:
+        affine = _scaled(base, scale, center)
+        scores = _score(lines, to_pixels(affine, points), shifts)
+        top = int(np.argmax(scores))
+        if scores[top] > best[0]:
+            affine[:, 2] += shifts[top]
+            best = (scores[top], affine)
+    return best[1]
+
+
+def _grid(radius):
+    offsets = np.arange(-radius, radius + 1)
+    return np.stack(np.meshgrid(offsets, offsets), axis=-1).reshape(-1, 2).astype(np.float64)
+
+
+def _fit(lines, affine, pixels_per_point, template, search_range):
+    """
+    Look for every bubble within `search_range` points of where `affine` puts
+    it and fit an affine through them. Also returns each bubble's misfit and
+    the share of its outline that was found on a line.
+    """
+    shifts = _grid(int(np.ceil(search_range * pixels_per_point)))
+    scores = _score(lines, to_pixels(affine, template.outline), shifts)
+    centres = template.boxes[:, :2] + template.boxes[:, 2:] / 2
+    measured = to_pixels(affine, centres) + shifts[np.argmax(scores, axis=1)]
+    design = np.hstack([centres, np.ones((len(centres), 1))])
+    use = np.ones(len(centres), dtype=bool)
+    found = scores.max(axis=1)
+    for _ in range(2):
+        solution, *_ = np.linalg.lstsq(design[use], measured[use], rcond=None)
+        misfit = np.linalg.norm(design @ solution - measured, axis=1) / pixels_per_point
+        use = misfit < OUTLIER
+        if use.sum() < 3:
+            return affine, misfit, found
+    return solution.T, misfit, found
+
+
+def align(gray, pixels_per_point, template):
+    """
+    The 2x3 affine transform from page points to pixels of this scan, how
+    well each bubble fits it (its distance from the fit, in points) and how
+    much of its outline is printed (0 .. 1).
+    """
+    height, width = gray.shape
+    # The nominal transform: the whole page fills the scan, y upwards
+    base = np.array([[pixels_per_point, 0, 0], [0, -pixels_per_point, height]], dtype=np.float64)
+    center = np.array([width / 2, height / 2])
+    lines = thin_lines(gray, pixels_per_point)
+    points = template.outline.reshape(-1, 2)
+
+    # Coarse: shift and scale, with every COARSE x COARSE block of the line map pooled so no line is lost
+    rows, cols = height // COARSE * COARSE, width // COARSE * COARSE
+    pooled = np.logical_or.reduce([lines[i:rows:COARSE, :cols] for i in range(COARSE)])
+    pooled = np.logical_or.reduce([pooled[:, i::COARSE] for i in range(COARSE)])
+    radius = int(SHIFT_RANGE * max(width, height) / COARSE)
+    affine = COARSE * _search(pooled, points[::2], base / COARSE, SCALES, _grid(radius), center / COARSE)
+
+    # Fine: around the coarse result at full resolution
+    step = (SCALES[1] - SCALES[0]) / 2
+    affine = _search(lines, points, affine, (1 - step, 1, 1 + step), _grid(COARSE), center)
+
+    # Local: every bubble on its own, then an affine fit through the ones that were found, so small
+    # rotations and uneven scaling are absorbed; a second, narrower pass starts from that fit
+    affine, misfit, found = _fit(lines, affine, pixels_per_point, template, LOCAL_RANGE)
+    return _fit(lines, affine, pixels_per_point, template, LOCAL_RANGE / 3)
+
+
+# --- Reading ---
+
+def fill_levels(gray, affine, template):
+    """How filled in every bubble is, 0 (blank) .. 1 (solid ink), all bubbles with one gather each."""
+    inside = sample(gray, to_pixels(affine, template.inside)).mean(axis=1)
+    paper = sample(gray, to_pixels(affine, template.paper)).mean(axis=1)
+    return np.clip((paper - inside) / (255 * INK), 0, 1)
+
+
+def answers(fill, template):
+    """Per bubble group: (slot, row label, answer or "", confidence)."""
+    results = []
+    bounds = np.r_[template.group_start, len(fill)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        levels = fill[start:end]
+        order = np.argsort(levels)[::-1]
+        top = levels[order[0]]
+        second = levels[order[1]] if len(order) > 1 else 0.0
+        label = template.manifest["rows"][template.row[start]]["label"]
+        if top >= MARKED:
+            answer = template.options[label][template.option[start + order[0]]]
+            confidence = min(1.0, (top - second) / MARKED)
+        else:
+            answer = ""
+            confidence = (MARKED - top) / MARKED
+        results.append((int(template.slot[start]), label, answer, round(float(confidence), 3)))
+    return results
+
+
+def read_page(page, template):
+    """Answers of every card on one scanned page: a list (one per printed slot) of {label: answer} records."""
+    gray, pixels_per_point = prepare(page, template)
+    affine, misfit, found = align(gray, pixels_per_point, template)
+    fill = fill_levels(gray, affine, template)
+    cards = [{} for _ in template.manifest["slots"]["values"]]
+    # The last sheet of a batch may be partly filled: its slots past the last card show no bubbles
+    while len(cards) > 1 and np.median(found[template.slot == len(cards) - 1]) < PRINTED:
+        cards.pop()
+    for slot, label, answer, confidence in answers(fill, template):
+        if slot >= len(cards):
+            continue
+        cards[slot][label] = answer
+        cards[slot][f"{label} confidence"] = confidence
+    for slot, card in enumerate(cards):
+        in_slot = template.slot == slot
+        card["alignment"] = round(float(np.median(misfit[in_slot])), 2)
+        card["confidence"] = min((value for key, value in card.items() if key.endswith(" confidence")), default=1.0)
+    return cards
+
+
+_template = None  # of this worker process
+
+
+def _init_worker(manifest):
+    global _template
+    _template = CardTemplate(manifest)
+
+
+def read_file(path):
+    """Worker: the card records of every page of one scan file."""
+    records = []
+    for number, page in enumerate(load_pages(path)):
+        for slot, card in enumerate(read_page(page, _template)):
+            records.append(dict(file=os.path.basename(path), page=number, slot=slot, **card))
+    return records
+
+
+def read_scans(paths, manifest, jobs=None):
+    """Yield one record per card of the scans, in file, page and slot order, reading on `jobs` processes."""
+    if not jobs:
+        _init_worker(manifest)
+        for path in paths:
+            yield from read_file(path)
+        return
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(manifest,)) as pool:
+        # At most two files per worker in flight, as in extract_answers.extract()
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(read_file, path))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_manifest(path=None, style=None):
+    """A manifest from a --manifest file, or built from the layout of a style."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    from card_manifest import build_manifest
+    from generate_wine_tasting_batch import get_card_layout
+    return build_manifest(get_card_layout(style))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read the bubbles of scanned tasting cards.")
+    parser.add_argument("scans", nargs="+", help="page scans (PNG, TIFF, multi-page TIFF, ...)")
+    parser.add_argument("-o", "--output", default="answers.csv",
+                        help="CSV or JSON Lines (.jsonl) file, or - for stdout")
+    parser.add_argument("--manifest",
+                        help="bubble manifest written with the cards (generate_wine_tasting_batch.py --manifest)")
+    parser.add_argument("-s", "--style", default="handwritten",
+                        help="card style, when there is no manifest (1-up cards only)")
+    parser.add_argument("-j", "--jobs", type=int, help="read on N worker processes")
+    parser.add_argument("--review-below", type=float, default=0.5, metavar="C",
+                        help="count cards with an answer of confidence below C as needing a look (default: 0.5)")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest, args.style)
+    labels = [row["label"] for row in manifest["rows"] if row["options"]]
+    columns = ["card", "file", "page", "slot"] + [name for label in labels for name in (label, f"{label} confidence")]
+    columns += ["confidence", "alignment"]
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    jsonl = args.output.endswith((".jsonl", ".ndjson"))
+    writer = None if jsonl else csv.DictWriter(out, columns)
+    if writer:
+        writer.writeheader()
+
+    start = time.perf_counter()
+    cards = review = 0
+    for record in read_scans(args.scans, manifest, jobs=args.jobs):
+        record["card"] = cards
+        cards += 1
+        review += record["confidence"] < args.review_below
+        if writer:
+            writer.writerow(record)
+        else:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    if out is not sys.stdout:
+        out.close()
+    elapsed = time.perf_counter() - start
+    print(f"Read {cards} cards in {elapsed:.2f}s ({cards / elapsed:.0f} cards/s), {review} to review",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
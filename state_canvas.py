@@ -0,0 +1,208 @@
+"""
+A reportlab canvas that only writes graphics state changes that change something.
+
+The drawing helpers set their full pen before every primitive (a bubble sets
+stroke colour, dash and line width; a writing line sets its dash and then
+resets it), and reportlab writes every one of those calls into the content
+stream. StateCanvas keeps them pending instead and, right before something
+is drawn, writes only the ones that differ from the state the PDF is in:
+
+    c = StateCanvas("card.pdf", pagesize=A4)
+    c.setStrokeColor(grey); c.setLineWidth(0.5); c.line(...)
+    c.setStrokeColor(grey); c.setLineWidth(0.5); c.line(...)   # no state ops
+
+Stroke-only lines, rects, round rects and paths that follow each other with
+the same (opaque) pen are joined into one path with a single stroke, so the
+notes lines of a card become one path instead of 27. Translucent strokes are
+left alone, as parts of a joined path that overlap would blend only once.
+
+The state followed is fill and stroke colour (with alpha), line width, dash
+and font. It is forgotten at page and form boundaries, where the PDF state is
+not what this canvas last wrote, and follows saveState()/restoreState(). Every
+other canvas method first writes the pending state, so it draws exactly what
+it would on a plain canvas.
+"""
+import inspect
+
+from reportlab.lib.colors import Color, toColor
+from reportlab.lib.rl_accel import fp_str
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+# Methods defined below; every other public Canvas method writes the pending state first
+_OWN_METHODS = {
+    "setFillColor", "setStrokeColor", "setFillAlpha", "setStrokeAlpha", "setLineWidth", "setDash", "setFont",
+    "saveState", "restoreState", "beginForm", "endForm", "showPage", "line", "rect", "roundRect", "drawPath",
+}
+
+
+def _color_key(color, alpha):
+    """A hashable value that is equal for colours reportlab writes the same way; its last item is the opacity."""
+    if isinstance(color, str):
+        color = toColor(color)
+    if isinstance(color, Color):
+        value = (type(color), color.__key__)
+    else:
+        value = (tuple, tuple(color))
+    opacity = alpha if alpha is not None else getattr(color, "alpha", 1)
+    return value, alpha, opacity
+
+
+class StateCanvas(canvas.Canvas):
+    """reportlab Canvas that drops redundant state changes and joins runs of identical strokes."""
+
+    def __init__(self, *args, **kwargs):
+        self._pending = {}  # state name -> (key, apply function, arguments)
+        self._written = {}  # state name -> key of what the content stream has set
+        self._written_stack = []
+        self._form_stack = []
+        self._open_stroke = None  # (last _code entry, its path segments) of the stroke that can be extended
+        super().__init__(*args, **kwargs)
+
+    # --- pending state ---
+
+    def _set(self, name, key, apply, *args):
+        self._pending[name] = (key, apply, args)
+
+    def _write_state(self):
+        """Write the pending state changes that differ from the current PDF state."""
+        pending, self._pending = self._pending, {}
+        written = self._written
+        for name, (key, apply, args) in pending.items():
+            if written.get(name) != key:
+                apply(self, *args)
+                written[name] = key
+
+    def setFillColor(self, aColor, alpha=None):
+        self._set("fill", _color_key(aColor, alpha), canvas.Canvas.setFillColor, aColor, alpha)
+
+    def setStrokeColor(self, aColor, alpha=None):
+        self._set("stroke", _color_key(aColor, alpha), canvas.Canvas.setStrokeColor, aColor, alpha)
+
+    def setFillAlpha(self, a):
+        self._write_state()
+        super().setFillAlpha(a)
+        self._written.pop("fill", None)  # the colour's alpha no longer tells
+
+    def setStrokeAlpha(self, a):
+        self._write_state()
+        super().setStrokeAlpha(a)
+        self._written.pop("stroke", None)
+
+    def setLineWidth(self, width):
+        self._lineWidth = width
+        self._set("width", width, canvas.Canvas.setLineWidth, width)
+
+    def setDash(self, array=[], phase=0):
+        key = (tuple(array) if isinstance(array, (list, tuple)) else array, phase)
+        self._set("dash", key, canvas.Canvas.setDash, array, phase)
+
+    def setFont(self, psfontname, size, leading=None):
+        pdfmetrics.getFont(psfontname)  # unknown fonts fail here, as on a plain canvas
+        if leading is None:
+            leading = size * 1.2
+        # Text objects and string widths read these straight away
+        self._fontname = psfontname
+        self._fontsize = size
+        self._leading = leading
+        self._set("font", (psfontname, size, leading), canvas.Canvas.setFont, psfontname, size, leading)
+
+    # --- state boundaries ---
+
+    def saveState(self):
+        self._write_state()
+        super().saveState()
+        self._written_stack.append(dict(self._written))
+
+    def restoreState(self):
+        self._pending = {}
+        super().restoreState()
+        self._written = self._written_stack.pop()
+
+    def beginForm(self, name, *args, **kwargs):
+        # A form runs in the state of whatever page draws it
+        self._write_state()
+        self._form_stack.append((self._written, self._written_stack))
+        self._written, self._written_stack = {}, []
+        self._open_stroke = None
+        super().beginForm(name, *args, **kwargs)
+
+    def endForm(self, **extra_attributes):
+        self._write_state()
+        super().endForm(**extra_attributes)
+        self._written, self._written_stack = self._form_stack.pop()
+        self._open_stroke = None
+
+    def showPage(self):
+        self._write_state()
+        super().showPage()
+        self._pending = {}
+        self._written = {}
+        self._written_stack = []
+        self._open_stroke = None
+
+    # --- strokes ---
+
+    def _stroke(self, path):
+        """Stroke `path` (path construction operators), in one path with the previous stroke if possible."""
+        self._write_state()
+        code = self._code
+        opened = self._open_stroke
+        if (opened is not None and code and code[-1] is opened[0]
+                and self._written.get("stroke", (None, None, 0))[-1] == 1):
+            segments = opened[1]
+            segments.append(path)
+        else:
+            segments = [path]
+        op = "n " + " ".join(segments) + " S"
+        if len(segments) > 1:
+            code[-1] = op
+        else:
+            code.append(op)
+        self._open_stroke = (op, segments)
+
+    def line(self, x1, y1, x2, y2):
+        self._stroke("%s m %s l" % (fp_str(x1, y1), fp_str(x2, y2)))
+
+    def rect(self, x, y, width, height, stroke=1, fill=0):
+        if stroke and not fill:
+            self._stroke("%s re" % fp_str(x, y, width, height))
+        else:
+            self._write_state()
+            super().rect(x, y, width, height, stroke, fill)
+
+    def roundRect(self, x, y, width, height, radius, stroke=1, fill=0):
+        if stroke and not fill:
+            path = PDFPathObject()
+            path.roundRect(x, y, width, height, radius)
+            self._stroke(path.getCode()[2:])
+        else:
+            self._write_state()
+            super().roundRect(x, y, width, height, radius, stroke, fill)
+
+    def drawPath(self, aPath, stroke=1, fill=0, fillMode=None):
+        code = aPath.getCode()
+        if stroke and not fill and code.startswith("n "):
+            self._stroke(code[2:])
+        else:
+            self._write_state()
+            super().drawPath(aPath, stroke, fill, fillMode)
+
+
+def _writes_state_first(name):
+    method = getattr(canvas.Canvas, name)
+
+    def wrapper(self, *args, **kwargs):
+        if self._pending:
+            self._write_state()
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _name in dir(canvas.Canvas):
+    if (not _name.startswith("_") and _name not in _OWN_METHODS
+            and inspect.isfunction(inspect.getattr_static(canvas.Canvas, _name))):
+        setattr(StateCanvas, _name, _writes_state_first(_name))
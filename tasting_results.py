@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Summaries of the answers collected from tasting cards.
+
+The answers are kept as the integer codes extract_answers.py writes: one
+small array per column, one row per card. The bubble rows (Sweetness,
+Rating, ...) are criteria, coded 0, 1, ... in the order their options are
+printed (so the scales are ordinal: Bone Dry < Dry < ... < Sweet) and -1
+when left blank; the header values (wine name, producer, vintage, ...) and
+who filled the card in are keys to group by.
+
+    results = Results.concat([Results.from_table(path) for path in ("spring", "autumn")])
+    wines, counts = results.distribution("Sweetness", by="name")
+    wines, means, cards = results.mean("Rating", by=["name", "vintage"])
+
+Every aggregation is a couple of NumPy calls over whole columns: np.unique
+numbers the groups and np.bincount counts codes (or sums them) per group, so
+a summary of a million cards takes a fraction of a second.
+
+Cards carry no taster name, so the taster is the file a card came back in
+(each guest returns their own PDF); tables read from several events get an
+event column from their directory name. Their criteria must have the same
+options: a mean is only taken on one printed scale.
+
+Usage:
+    python tasting_results.py spring/ autumn/ --by name --criterion Rating
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Grouping keys, besides the header values of the cards
+EVENT, TASTER = "event", "taster"
+DENSE_KEYS = 1 << 22  # groups are found without sorting when there are at most this many possible keys
+
+
+class Results:
+    """Integer-coded answers: {column: array of codes} with the category labels of every column."""
+
+    def __init__(self, codes, categories, criteria):
+        self.codes = codes  # column -> int array, -1 = blank
+        self.categories = categories  # column -> list of labels
+        self.criteria = list(criteria)  # the columns that are answers (bubble rows), the others are keys
+
+    def __len__(self):
+        return len(next(iter(self.codes.values()))) if self.codes else 0
+
+    @property
+    def keys(self):
+        return [name for name in self.codes if name not in self.criteria]
+
+    @classmethod
+    def from_table(cls, path, event=None):
+        """The answers of a table directory written by extract_answers.py, all from one event."""
+        from extract_answers import load_table
+
+        columns, schema = load_table(path)
+        with open(os.path.join(path, schema["files"]), encoding="utf-8") as f:
+            files = f.read().splitlines()
+        rows = schema["rows"]
+        codes = {EVENT: np.zeros(rows, np.int32), TASTER: np.asarray(columns["file"], np.int32)}
+        categories = {EVENT: [event or os.path.basename(os.path.normpath(path))], TASTER: files}
+        criteria = []
+        for column in schema["columns"]:
+            if column["kind"] in ("category", "dictionary"):
+                codes[column["name"]] = columns[column["name"]]
+                categories[column["name"]] = column["categories"]
+                if column["kind"] == "category":
+                    criteria.append(column["name"])
+        return cls(codes, categories, criteria)
+
+    @classmethod
+    def concat(cls, parts):
+        """
+        One Results of several (events, batches). The labels of every key
+        column are merged and the codes of each part remapped with one lookup
+        per column. A criterion's codes are positions on its printed scale, so
+        every part has to have the same options for it; raises ValueError if
+        they differ.
+        """
+        parts = list(parts)
+        codes, categories = {}, {}
+        criteria = [name for name in parts[0].criteria if all(name in part.criteria for part in parts)]
+        names = [name for name in parts[0].codes if all(name in part.codes for part in parts)]
+        for name in criteria:
+            for part in parts[1:]:
+                if part.categories[name] != parts[0].categories[name]:
+                    raise ValueError(f"{name} has different options in different tables "
+                                     f"({', '.join(parts[0].categories[name])} / {', '.join(part.categories[name])})")
+        for name in names:
+            merged, index, remapped = [], {}, []
+            for part in parts:
+                labels = part.categories[name]
+                for label in labels:
+                    if label not in index:
+                        index[label] = len(merged)
+                        merged.append(label)
+                # lookup[code + 1] is the new code, lookup[0] keeps blanks at -1
+                lookup = np.array([-1] + [index[label] for label in labels], dtype=np.int32)
+                if name in criteria and np.array_equal(lookup[1:], np.arange(len(labels))):
+                    remapped.append(part.codes[name])
+                else:
+                    remapped.append(lookup[np.asarray(part.codes[name], dtype=np.int64) + 1])
+            dtype = np.int8 if name in criteria and len(merged) < 128 else np.int32
+            codes[name] = np.concatenate(remapped).astype(dtype, copy=False)
+            categories[name] = merged
+        return cls(codes, categories, criteria)
+
+    def save(self, path):
+        """Write the codes and labels to one .npz file."""
+        meta = json.dumps({"categories": self.categories, "criteria": self.criteria}, ensure_ascii=False)
+        np.savez_compressed(path, _meta=np.array(meta), **self.codes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["_meta"]))
+            codes = {name: data[name] for name in data.files if name != "_meta"}
+        return cls(codes, meta["categories"], meta["criteria"])
+
+    # --- Aggregation ---
+
+    def groups(self, by):
+        """
+        Number the groups of the rows by key column(s) `by` (None: one group).
+        Returns (labels, group of every row): labels is one tuple of key
+        labels per group, in sorted order of the codes.
+        """
+        if by is None:
+            return [()], np.zeros(len(self), dtype=np.intp)
+        by = [by] if isinstance(by, str) else list(by)
+        # One integer key per row; code + 1 so blanks (-1) form a group of their own
+        sizes = [len(self.categories[name]) + 1 for name in by]
+        key = np.zeros(len(self), dtype=np.int64)
+        for name, size in zip(by, sizes):
+            key = key * size + np.asarray(self.codes[name], dtype=np.int64) + 1
+        space = int(np.prod(sizes, dtype=np.float64))
+        if space <= DENSE_KEYS:
+            # Few possible keys: mark the ones present, no sorting
+            present = np.bincount(key, minlength=space).astype(bool)
+            keys = np.flatnonzero(present)
+            group = (np.cumsum(present) - 1)[key]
+        else:
+            keys, group = np.unique(key, return_inverse=True)
+        # Take the keys of the groups apart again, last column first
+        columns = []
+        for name, size in zip(reversed(by), reversed(sizes)):
+            keys, codes = np.divmod(keys, size)
+            columns.append(np.array([""] + list(self.categories[name]), dtype=object)[codes])
+        return list(zip(*reversed(columns))), group.ravel()
+
+    def distribution(self, criterion, by=None):
+        """How often each option of `criterion` was picked, per group: (labels, counts of shape (groups, options))."""
+        labels, group = self.groups(by)
+        return labels, self._counts(criterion, group, len(labels))
+
+    def mean(self, criterion, by=None):
+        """
+        The mean answer of `criterion` per group, on its printed scale from 1
+        (first option) up, and how many cards answered it: (labels, means,
+        counts). Groups where nobody answered have a mean of nan. Raises
+        ValueError if `criterion` is no criterion or its options are not one
+        scale (the same option twice, as tables that merged the scales of
+        different cards have).
+        """
+        labels, group = self.groups(by)
+        return (labels,) + self._means(criterion, group, len(labels))
+
+    def _counts(self, criterion, group, groups):
+        codes = self.codes[criterion]
+        options = len(self.categories[criterion])
+        answered = codes >= 0
+        counts = np.bincount(group[answered] * options + codes[answered], minlength=groups * options)
+        return counts.reshape(groups, options)
+
+    def _means(self, criterion, group, groups):
+        if criterion not in self.criteria:
+            raise ValueError(f"{criterion} is not a criterion, it has no scale to average")
+        options = [label.casefold() for label in self.categories[criterion]]
+        if len(set(options)) < len(options):
+            raise ValueError(f"the options of {criterion} are not one scale: {', '.join(self.categories[criterion])}")
+        codes = self.codes[criterion]
+        answered = codes >= 0
+        counts = np.bincount(group[answered], minlength=groups)
+        sums = np.bincount(group[answered], weights=codes[answered] + 1.0, minlength=groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts, counts
+
+    def summary(self, by, criterion="Rating"):
+        """One row per group: its key labels, number of cards, mean and distribution of `criterion`."""
+        by = [by] if isinstance(by, str) else list(by)
+        labels, group = self.groups(by)
+        cards = np.bincount(group, minlength=len(labels))
+        means, answered = self._means(criterion, group, len(labels))
+        counts = self._counts(criterion, group, len(labels))
+        header = by + ["cards", f"{criterion} answered", f"mean {criterion}"] + self.categories[criterion]
+        means = ["" if np.isnan(mean) else round(mean, 2) for mean in means.tolist()]
+        rows = [list(key) + [total, count, mean] + options
+                for key, total, count, mean, options in zip(labels, cards.tolist(), answered.tolist(), means,
+                                                            counts.tolist())]
+        return header, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the answers of filled-in tasting cards.")
+    parser.add_argument("tables", nargs="+",
+                        help="table directories written by extract_answers.py (one per event), or saved .npz results")
+    parser.add_argument("--by", action="append",
+                        help="key column(s) to group by: name, producer, vintage, ..., taster or event (default: name)")
+    parser.add_argument("-c", "--criterion", default="Rating", help="answer to summarize (default: Rating)")
+    parser.add_argument("-o", "--output", default="-", help="CSV file for the summary (default: stdout)")
+    parser.add_argument("--save", metavar="FILE", help="also save the combined results as .npz")
+    args = parser.parse_args(argv)
+
+    try:
+        results = Results.concat(Results.load(path) if path.endswith(".npz") else Results.from_table(path)
+                                 for path in args.tables)
+    except ValueError as e:
+        parser.error(str(e))
+    by = args.by or ["name"]
+    for name in by:
+        if name not in results.keys:
+            parser.error(f"unknown key '{name}', choose from: {', '.join(results.keys)}")
+    if args.criterion not in results.criteria:
+        parser.error(f"unknown criterion '{args.criterion}', choose from: {', '.join(results.criteria)}")
+
+    start = time.perf_counter()
+    try:
+        header, rows = results.summary(by, args.criterion)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    writer = csv.writer(out)
+    writer.writerow(header)
+    writer.writerows(rows)
+    if out is not sys.stdout:
+        out.close()
+    if args.save:
+        results.save(args.save)
+    print(f"Summarized {len(results)} cards into {len(rows)} groups in {elapsed * 1000:.0f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""The batch command (generate_wine_tasting_batch.py): bad wine lists are refused before anything is drawn."""
+import time
+
+import pytest
+
+import generate_wine_tasting_batch
+from generate_wine_tasting_batch import choose_quality, main, render_batch
+
+
+@pytest.mark.parametrize("name, content, message", [
+    ("fancy.csv", "name,style\nBarolo,\nSancerre,fancy\n", "Unknown style 'fancy'"),
+    ("rows.json", '[{"name": "Barolo"}, "Sancerre"]', "every card must be an object"),
+    ("broken.json", '[{"name": ', "Expecting value"),
+], ids=["style", "row", "json"])
+def test_bad_wine_lists_are_reported_as_usage_errors(name, content, message, tmp_path, capsys):
+    (tmp_path / name).write_text(content)
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / name), "-o", str(tmp_path / "out.pdf"), "--jobs", "1"])
+    assert message in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == [tmp_path / name]
+
+
+def test_missing_wine_list_is_a_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "missing.csv"), "-o", str(tmp_path / "out.pdf")])
+    assert "No such file" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("options", [{"jobs": 1}, {"stream": True}], ids=["jobs", "stream"])
+def test_failed_sharded_batch_leaves_no_file(options, tmp_path):
+    out = tmp_path / "cards.pdf"
+    out.write_bytes(b"previous batch")
+    with pytest.raises(ValueError):
+        render_batch([{"name": "Barolo"}, {"style": "fancy"}], str(out), seed=1, **options)
+    assert out.read_bytes() == b"previous batch"
+    assert list(tmp_path.iterdir()) == [out]
+
+
+def test_budget_is_met_by_the_slowest_style(monkeypatch):
+    # Vintage cards take 10 ms each unless drafted, handwritten ones no time
+    def render_cards(filename, cards, style, quality, **options):
+        if style == "vintage" and quality != "draft":
+            time.sleep(0.01 * len(cards))
+    monkeypatch.setattr(generate_wine_tasting_batch, "render_cards", render_cards)
+    assert choose_quality(["handwritten"], 0.005) == "print"
+    assert choose_quality(["handwritten", "vintage"], 0.005) == "draft"
@@ -0,0 +1,56 @@
+"""The on-disk cache of rendered batches (card_cache.py): hits, LRU eviction, and sharing with other processes."""
+import os
+import time
+from pathlib import Path
+
+from card_cache import STALE_TMP_SECONDS, CardCache
+
+
+def stored(cache, key, size, tmp_path):
+    source = tmp_path / f"{key}.src"
+    source.write_bytes(b"x" * size)
+    cache.store(key, source)
+
+
+def test_fetch_hits_only_stored_keys(tmp_path):
+    cache = CardCache(tmp_path / "cache")
+    key = cache.key("vintage", [{"name": "Barolo"}], seed=1)
+    assert key != cache.key("vintage", [{"name": "Barolo"}], seed=2)
+    assert not cache.fetch(key, tmp_path / "out.pdf")
+    stored(cache, key, 10, tmp_path)
+    assert cache.fetch(key, tmp_path / "out.pdf")
+    assert (tmp_path / "out.pdf").read_bytes() == b"x" * 10
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = CardCache(tmp_path / "cache", max_bytes=25)
+    stored(cache, "old", 10, tmp_path)
+    stored(cache, "used", 10, tmp_path)
+    past = time.time() - 100
+    os.utime(cache.directory / "old.pdf", (past, past))
+    os.utime(cache.directory / "used.pdf", (past + 1, past + 1))
+    assert cache.fetch("used", tmp_path / "out.pdf")  # now the most recent
+    stored(cache, "new", 10, tmp_path)
+    assert sorted(path.name for path in cache.directory.iterdir()) == ["new.pdf", "used.pdf"]
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_removed_by_another_process_are_skipped(tmp_path, monkeypatch):
+    cache = CardCache(tmp_path / "cache")
+    stored(cache, "kept", 10, tmp_path)
+    glob = Path.glob
+    monkeypatch.setattr(Path, "glob", lambda self, pattern: [*glob(self, pattern), self / "gone.pdf"])
+    cache.evict()
+    assert cache.stats()["entries"] == 1
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    cache = CardCache(tmp_path / "cache")
+    stale, fresh = cache.directory / "crashed.tmp", cache.directory / "storing.tmp"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"partial")
+    past = time.time() - STALE_TMP_SECONDS - 10
+    os.utime(stale, (past, past))
+    cache.evict()
+    assert not stale.exists() and fresh.exists()
@@ -0,0 +1,63 @@
+"""Fillable cards (card_fields.py): one field per row and line, named after the card, on top of the printed card."""
+import io
+import re
+
+from card_layout import Bubble, Line
+from generate_wine_tasting_batch import get_card_layout, render_batch
+from imposition import plan_grid, slot_transform
+from pdf_merge import read_objects
+
+_NAME = re.compile(rb"/T \((.*?)\)")
+_PARENT = re.compile(rb"/Parent (\d+) 0 R")
+_RECT = re.compile(rb"/Rect \[ ([\d. ]+) \]")
+
+
+def fields(cards, **options):
+    """{card name: {field name: field object}} and all objects of a fillable PDF of `cards`."""
+    out = io.BytesIO()
+    render_batch(cards, out, seed=1, fillable=True, **options)
+    objects, _ = read_objects(out.getvalue())
+    names = {number: _NAME.search(body).group(1).decode() for number, body in objects.items()
+             if _NAME.search(body) and b"stream" not in body}
+    by_card = {}
+    for number, name in names.items():
+        parent = _PARENT.search(objects[number])
+        if parent and int(parent.group(1)) in names:
+            by_card.setdefault(names[int(parent.group(1))], {})[name] = objects[number]
+    return by_card, objects
+
+
+def test_every_row_and_line_of_every_card_is_a_field():
+    layout = get_card_layout("handwritten")
+    rows = {element.row for element in layout.elements if isinstance(element, Bubble)}
+    lines = {element.name for element in layout.elements if isinstance(element, Line) and element.name}
+    by_card, _ = fields([{"name": "Barolo"}, {}])
+    assert sorted(by_card) == ["card0", "card1"]
+    for card in by_card.values():
+        assert set(card) == rows | lines | {"notes"}
+        assert all(b"/FT /Btn" in card[row] for row in rows)
+
+
+def test_header_values_are_read_only():
+    by_card, _ = fields([{"name": "Barolo"}, {}])
+    assert b"/Ff 1 /V (Barolo)" in by_card["card0"]["name"]
+    assert b"/Ff 1 " not in by_card["card1"]["name"] and b"/V ()" in by_card["card1"]["name"]
+
+
+def test_appearance_streams_are_shared_by_all_cards():
+    def forms(count):
+        _, objects = fields([{}] * count)
+        return sum(b"/Subtype /Form" in body for body in objects.values())
+    assert forms(1) == forms(5)
+
+
+def test_fields_follow_the_card_onto_its_slot():
+    layout = get_card_layout("handwritten")
+    x, y, scale = slot_transform(plan_grid(2, (layout.width, layout.height), "A4"), 1)
+    right, top = x + layout.width * scale, y + layout.height * scale
+    by_card, _ = fields([{}, {}], n_up=2)
+    # The text fields; the radio groups have no Rect of their own
+    rects = [map(float, rect.group(1).split()) for rect in map(_RECT.search, by_card["card1"].values()) if rect]
+    assert rects
+    for x1, y1, x2, y2 in rects:
+        assert x <= x1 < x2 <= right and y <= y1 < y2 <= top
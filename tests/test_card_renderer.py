@@ -0,0 +1,18 @@
+"""The shared render pipeline (card_renderer.py): styles mixed in one batch draw as they do alone."""
+import io
+import re
+
+from generate_wine_tasting_batch import render_batch
+
+
+def fonts(cards, style):
+    out = io.BytesIO()
+    render_batch(cards, out, style=style, seed=1)
+    return set(re.findall(rb"/BaseFont /([\w+-]+)", out.getvalue()))
+
+
+def test_sketchy_fonts_do_not_depend_on_the_styles_drawn_before():
+    # The handwritten card comes first and registers its font
+    mixed = fonts([{}, {"style": "sketchy"}], "handwritten")
+    assert fonts([{}], "sketchy") <= mixed
+    assert {b"Courier", b"Courier-Bold"} <= mixed
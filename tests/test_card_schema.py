@@ -0,0 +1,49 @@
+"""Card schemas (card_schema.py): every row makes its own form field, and the card fits on the page."""
+import copy
+import json
+
+import pytest
+
+from card_layout import layout_from_dict, layout_to_dict
+from generate_wine_tasting_batch import get_card_layout, get_card_schema
+
+
+def with_rows(section, *rows):
+    schema = copy.deepcopy(get_card_schema("vintage"))
+    schema["sections"][section]["rows"].extend(rows)
+    return schema
+
+
+def test_duplicate_row_labels_are_rejected_across_sections():
+    intensity = {"type": "criteria", "label": "Intensity", "options": ["Low", "Medium", "High"]}
+    with pytest.raises(ValueError, match=r"'Intensity' is already a field of sections\[1\]\.rows\[4\]"):
+        get_card_layout("vintage", with_rows(1, intensity))
+
+
+def test_duplicate_row_labels_are_rejected_without_case():
+    with pytest.raises(ValueError, match="'clarity' is already a field of sections\\[0\\]\\.rows\\[0\\]"):
+        get_card_layout("vintage", with_rows(0, {"type": "input", "label": "clarity"}))
+
+
+def test_header_field_names_are_rejected():
+    with pytest.raises(ValueError, match="'Producer' is a field of the card header"):
+        get_card_layout("vintage", with_rows(3, {"type": "input", "label": "Producer"}))
+
+
+def test_card_running_off_the_page_is_rejected():
+    rows = [{"type": "criteria", "label": f"Row {i}", "options": ["Low", "High"]} for i in range(20)]
+    with pytest.raises(ValueError, match="runs .* pt off the bottom of the page"):
+        get_card_layout("vintage", with_rows(2, *rows))
+
+
+def test_exported_layout_reads_back():
+    layout = get_card_layout("vintage")
+    assert layout_from_dict(json.loads(json.dumps(layout_to_dict(layout)))) == layout
+
+
+def test_text_running_off_the_page_is_rejected():
+    schema = copy.deepcopy(get_card_schema("vintage"))
+    # The last option starts on the page, but its text runs off it
+    schema["sections"][0]["rows"][0]["options"] = ["Clear", "Brilliant and perfectly clear, " * 3]
+    with pytest.raises(ValueError, match="section visual runs .* off the right edge"):
+        get_card_layout("vintage", schema)
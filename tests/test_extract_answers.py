@@ -0,0 +1,36 @@
+"""Reading filled-in fillable cards (extract_answers.py) into a table of codes."""
+import pytest
+
+from extract_answers import TableWriter, extract, load_table, table_schema
+from generate_wine_tasting_batch import get_card_layout, render_batch
+
+CARDS = [{"name": "Barolo", "producer": "Vietti"}, {"name": "Sancerre"}, {"name": "Barolo", "vintage": "2016"}]
+
+
+def test_rows_with_different_options_are_not_merged():
+    with pytest.raises(ValueError, match="different options for Aging"):
+        table_schema([get_card_layout("vintage"), get_card_layout("sketchy")])
+
+
+def test_rows_with_the_same_options_are_merged():
+    schema = table_schema([get_card_layout("vintage"), get_card_layout("handwritten")])
+    aging = next(column for column in schema["columns"] if column["name"] == "Aging")
+    assert aging["categories"] == ["Young", "Developing", "Peak", "Past Peak"]
+
+
+@pytest.mark.parametrize("jobs", [None, 2], ids=["serial", "jobs"])
+def test_header_values_round_trip(jobs, tmp_path):
+    paths = []
+    for number in range(3):
+        path = tmp_path / f"guest{number}.pdf"
+        render_batch([dict(card) for card in CARDS], str(path), seed=number, fillable=True)
+        paths.append(str(path))
+    table = TableWriter(tmp_path / "answers", table_schema([get_card_layout("handwritten")]))
+    assert extract(paths, table, jobs=jobs) == 9
+    table.close()
+
+    columns, schema = load_table(tmp_path / "answers")
+    names = next(column["categories"] for column in schema["columns"] if column["name"] == "name")
+    assert [names[code] for code in columns["name"]] == ["Barolo", "Sancerre", "Barolo"] * 3
+    assert list(columns["file"]) == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    assert list(columns["Sweetness"]) == [-1] * 9
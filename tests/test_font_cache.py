@@ -0,0 +1,25 @@
+"""Font loading (font_cache.py): fonts are found on reportlab's search path with and without the cache."""
+import hashlib
+
+import pytest
+
+from card_cache import font_digest
+from font_cache import load_ttf
+
+# Ships in reportlab's fonts directory, which is on rl_config.TTFSearchPath
+SEARCH_PATH_FONT = "Vera.ttf"
+
+
+@pytest.mark.parametrize("cache", [True, False], ids=["cached", "uncached"])
+def test_font_on_the_search_path_loads(cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("WINE_CARDS_FONT_CACHE", str(tmp_path / "fonts") if cache else "")
+    assert load_ttf("SearchPathFont", SEARCH_PATH_FONT).face.name
+    # Twice: the second time from the cache
+    assert load_ttf("SearchPathFont", SEARCH_PATH_FONT).face.name
+
+
+def test_font_on_the_search_path_is_hashed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert font_digest(SEARCH_PATH_FONT) != hashlib.sha256(b"").hexdigest()
+    assert font_digest("NoSuchFont.ttf") == hashlib.sha256(b"").hexdigest()
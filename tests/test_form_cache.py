@@ -0,0 +1,31 @@
+"""Recorded forms (form_cache.py): a replayed skeleton writes the bytes drawing it would have."""
+import io
+
+import form_cache
+from generate_wine_tasting_batch import render_batch
+
+
+def pdf(style="handwritten"):
+    out = io.BytesIO()
+    render_batch([{"name": "Barolo"}, {}], out, style=style, seed=1)
+    return out.getvalue()
+
+
+def test_replayed_form_writes_the_same_pdf():
+    form_cache.clear()
+    before = form_cache.stats()
+    drawn = pdf("vintage")
+    assert pdf("vintage") == drawn
+    after = form_cache.stats()
+    assert after["misses"] > before["misses"] and after["hits"] > before["hits"]
+
+
+def test_forms_are_drawn_when_the_reportlab_internals_change(monkeypatch):
+    form_cache.clear()
+    expected = pdf()
+    monkeypatch.setattr(form_cache, "_FONTS_REPLAYABLE", False)
+    before = form_cache.stats()
+    assert pdf() == expected
+    after = form_cache.stats()
+    assert after["unsupported"] > before["unsupported"]
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
@@ -0,0 +1,49 @@
+"""N-up imposition (imposition.py): cards are laid out in a grid that fits the sheet, one sheet per N cards."""
+import io
+import re
+
+import pytest
+from reportlab.lib import pagesizes
+
+from generate_wine_tasting_batch import render_batch
+from imposition import MARGIN, SHEETS, plan_grid, slot_transform
+
+_MEDIA_BOX = re.compile(rb"/MediaBox \[ 0 0 ([\d.]+) ([\d.]+) \]")
+
+
+def test_two_cards_go_side_by_side_on_a_landscape_sheet():
+    grid = plan_grid(2, pagesizes.A4, "A4")
+    assert (grid.columns, grid.rows) == (2, 1)
+    assert (grid.sheet_width, grid.sheet_height) == pagesizes.landscape(pagesizes.A4)
+
+
+@pytest.mark.parametrize("sheet", sorted(SHEETS))
+@pytest.mark.parametrize("n_up", range(1, 10))
+def test_grid_fits_inside_the_margins(n_up, sheet):
+    grid = plan_grid(n_up, pagesizes.A4, sheet)
+    assert grid.columns * grid.rows >= n_up
+    for slot in range(n_up):
+        x, y, scale = slot_transform(grid, slot)
+        assert x >= MARGIN - 1e-6 and x + pagesizes.A4[0] * scale <= grid.sheet_width - MARGIN + 1e-6
+        assert y >= MARGIN - 1e-6 and y + pagesizes.A4[1] * scale <= grid.sheet_height - MARGIN + 1e-6
+
+
+def test_slots_fill_left_to_right_then_top_to_bottom():
+    grid = plan_grid(4, pagesizes.A4, "A3")
+    (x0, y0, _), (x1, y1, _), (x2, y2, _) = (slot_transform(grid, slot) for slot in range(3))
+    assert x1 > x0 and y1 == y0
+    assert x2 == x0 and y2 < y0
+
+
+@pytest.mark.parametrize("n_up, sheet", [(0, "A4"), (2, "B5")])
+def test_bad_grids_are_rejected(n_up, sheet):
+    with pytest.raises(ValueError):
+        plan_grid(n_up, pagesizes.A4, sheet)
+
+
+def test_last_sheet_may_be_partly_filled():
+    out = io.BytesIO()
+    render_batch([{}] * 5, out, seed=1, n_up=4)
+    grid = plan_grid(4, pagesizes.A4, "A3")
+    sizes = [tuple(map(float, size)) for size in _MEDIA_BOX.findall(out.getvalue())]
+    assert sizes == [pytest.approx((grid.sheet_width, grid.sheet_height), abs=0.01)] * 2
@@ -0,0 +1,70 @@
+"""Merging shards (pdf_merge.py): object references are renumbered, strings are copied as they are."""
+import io
+import re
+
+import pytest
+
+import generate_wine_tasting_batch
+from generate_wine_tasting_batch import render_batch
+from pdf_merge import _REF, _ref, read_objects
+
+_LITERAL = re.compile(rb"\((?:\\.|[^\\)])*\)")
+
+# Header values that look like object references
+CARDS = [{"name": "Cuvee 9999 0 R", "producer": "Lot 7 0 R"}, {"name": "Château (1er) 5 0 R", "producer": r"a\b (x"}]
+
+
+def render(**options):
+    out = io.BytesIO()
+    assert render_batch([dict(card) for card in CARDS], out, seed=1, fillable=True, **options) == len(CARDS)
+    return out.getvalue()
+
+
+def refs(body, key):
+    """The object numbers in the array /key [ ... ] of a dictionary."""
+    return [int(number) for number in re.findall(rb"(\d+) 0 R", body.split(b"/" + key, 1)[1].split(b"]", 1)[0])]
+
+
+def page_names(data):
+    """The value of the name field on every page, in page order."""
+    objects, trailer = read_objects(data)
+    pages = objects[_ref(objects[_ref(trailer, b"Root")], b"Pages")]
+    return [re.search(rb"/V \((.*?)\)", objects[widget]).group(1)
+            for page in refs(pages, b"Kids") for widget in refs(objects[page], b"Annots")
+            if b"/T (name)" in objects[widget]]
+
+
+def field_values(data):
+    """The /V entries of every object, in object order."""
+    objects, _ = read_objects(data)
+    values = []
+    for number in sorted(objects):
+        head = objects[number].split(b"\nstream", 1)[0]
+        if b"/V (" in head:
+            values.append(head.split(b"/V ", 1)[1].rsplit(b">>", 1)[0].strip())
+    return values
+
+
+@pytest.mark.parametrize("options", [{"jobs": 1}, {"stream": True}], ids=["jobs", "stream"])
+def test_reference_lookalikes_in_field_values_survive_merging(options):
+    merged = render(**options)
+    assert field_values(merged) == field_values(render())
+    assert b"/V (Cuvee 9999 0 R)" in merged and b"/V (Lot 7 0 R)" in merged
+
+
+@pytest.mark.parametrize("options", [{"jobs": 1}, {"stream": True}], ids=["jobs", "stream"])
+def test_merged_references_point_at_objects(options):
+    objects, _ = read_objects(render(**options))
+    for number, body in objects.items():
+        head = _LITERAL.sub(b"()", body.split(b"\nstream", 1)[0])
+        for target in _REF.findall(head):
+            assert int(target) in objects, f"object {number} refers to missing object {int(target)}"
+
+
+@pytest.mark.parametrize("options", [{"jobs": 2}, {"stream": True}], ids=["jobs", "stream"])
+def test_merged_shards_keep_the_cards_in_order(options, monkeypatch):
+    monkeypatch.setattr(generate_wine_tasting_batch, "SHARD_PAGES", 3)
+    cards = [{"name": f"Wine {number}"} for number in range(8)]
+    out = io.BytesIO()
+    assert render_batch(cards, out, seed=1, fillable=True, **options) == 8
+    assert page_names(out.getvalue()) == [b"Wine %d" % number for number in range(8)]
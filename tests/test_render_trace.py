@@ -0,0 +1,24 @@
+"""Tracing (render_trace.py): the canvas work of a replayed display list counts under the sections that drew it."""
+import io
+
+import display_list
+import form_cache
+import render_trace
+from card_renderer import render_cards
+
+
+def test_replayed_operators_count_under_the_drawing_helpers():
+    # The skeleton has to be recorded and replayed while the trace runs
+    display_list.clear()
+    form_cache.clear()
+    render_trace.start()
+    try:
+        render_cards(io.BytesIO(), [{"name": "Barolo"}], style="handwritten", seed=1)
+    finally:
+        trace = render_trace.stop()
+    frames = trace.frames
+    assert frames["skeleton;replay;taste;draw_bubble"][3] > 0
+    assert frames["skeleton;replay;notes_box;draw_line"][4] > 0
+    # draw_bubble is called once per bubble when recording, and so is its replay
+    assert frames["skeleton;replay;taste;draw_bubble"][0] == frames["skeleton;taste;draw_bubble"][0]
+    assert sum(frame[3] for frame in frames.values()) == trace.operators
@@ -0,0 +1,64 @@
+"""Reading scanned cards (scan_cards.py): marked bubbles are found on slightly shifted scans of printed cards."""
+import pytest
+from PIL import Image, ImageDraw
+
+from card_manifest import build_manifest
+from generate_wine_tasting_batch import get_card_layout
+from scan_cards import CardTemplate, read_page, read_scans
+
+DPI = 150
+
+
+def scan(manifest, marks=None, slots=None, shift=(5, -4)):
+    """
+    A scan of a sheet printed from `manifest`, drawn from its bubbles and
+    `shift` pixels off: marks maps (slot, row) to the options filled in, and
+    only the cards in `slots` (all by default) are printed.
+    """
+    scale = DPI / 72
+    page = manifest["page"]
+    image = Image.new("L", (round(page["width"] * scale), round(page["height"] * scale)), 255)
+    draw = ImageDraw.Draw(image)
+    for slot, (x0, y0, card_scale) in enumerate(manifest["slots"]["values"]):
+        if slots is not None and slot not in slots:
+            continue
+        for label, option, x, y, w, h in manifest["bubbles"]:
+            left = (x0 + x * card_scale) * scale + shift[0]
+            top = (page["height"] - y0 - (y + h) * card_scale) * scale + shift[1]
+            marked = option in (marks or {}).get((slot, label), ())
+            draw.rounded_rectangle((left, top, left + w * card_scale * scale, top + h * card_scale * scale),
+                                   radius=4 * card_scale * scale, outline=60, fill=70 if marked else None)
+    return image
+
+
+@pytest.fixture(scope="module")
+def manifest():
+    return build_manifest(get_card_layout("handwritten"), 1)
+
+
+def test_marked_bubbles_are_read(manifest):
+    card, = read_page(scan(manifest, {(0, "Clarity"): ["Hazy"], (0, "Body"): ["Full"]}), CardTemplate(manifest))
+    assert (card["Clarity"], card["Body"], card["Sweetness"]) == ("Hazy", "Full", "")
+    assert card["Clarity confidence"] > 0.5 and card["Sweetness confidence"] > 0.5
+
+
+def test_double_marks_have_a_low_confidence(manifest):
+    card, = read_page(scan(manifest, {(0, "Depth"): ["Pale", "Dark"]}), CardTemplate(manifest))
+    assert card["Depth confidence"] < 0.5
+    assert card["confidence"] == card["Depth confidence"]
+
+
+def test_empty_slots_of_the_last_sheet_are_left_out():
+    manifest = build_manifest(get_card_layout("handwritten"), 1, n_up=4)
+    cards = read_page(scan(manifest, {(1, "Clarity"): ["Clear"]}, slots={0, 1}), CardTemplate(manifest))
+    assert [card["Clarity"] for card in cards] == ["", "Clear"]
+
+
+def test_workers_read_the_scans_in_order(manifest, tmp_path):
+    paths = []
+    for number, option in enumerate(["Clear", "Hazy", "Clear", "Hazy", "Hazy"]):
+        paths.append(tmp_path / f"scan{number}.png")
+        scan(manifest, {(0, "Clarity"): [option]}).save(paths[-1])
+    serial = list(read_scans(paths, manifest))
+    assert [card["Clarity"] for card in serial] == ["Clear", "Hazy", "Clear", "Hazy", "Hazy"]
+    assert list(read_scans(paths, manifest, jobs=2)) == serial
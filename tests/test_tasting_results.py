@@ -0,0 +1,38 @@
+"""Summaries of collected answers (tasting_results.py): means are only taken on one printed scale."""
+import numpy as np
+import pytest
+
+from tasting_results import Results
+
+RATING = ["Poor", "Fine", "Great"]
+
+
+def results(ratings, names, rating_options=RATING):
+    codes = {"name": np.array(names, np.int32), "Rating": np.array(ratings, np.int8)}
+    return Results(codes, {"name": ["Barolo", "Sancerre"], "Rating": list(rating_options)}, ["Rating"])
+
+
+def test_mean_per_group_on_the_printed_scale():
+    labels, means, counts = results([0, 2, 1, -1], [0, 0, 1, 1]).mean("Rating", by="name")
+    assert labels == [("Barolo",), ("Sancerre",)]
+    assert means.tolist() == [2.0, 2.0]
+    assert counts.tolist() == [2, 1]
+
+
+def test_concat_keeps_the_codes_of_one_scale():
+    combined = Results.concat([results([0, 2], [0, 1]), results([1], [1])])
+    assert combined.codes["Rating"].tolist() == [0, 2, 1]
+    assert combined.categories["Rating"] == RATING
+
+
+def test_concat_refuses_different_scales():
+    with pytest.raises(ValueError, match="Rating has different options"):
+        Results.concat([results([0], [0]), results([0], [0], ["Poor", "Good", "Fine", "Great"])])
+
+
+def test_mean_refuses_a_merged_scale_and_keys():
+    merged = results([0, 3], [0, 1], ["Young", "Past Peak", "Not for aging", "Past peak"])
+    with pytest.raises(ValueError, match="not one scale"):
+        merged.mean("Rating")
+    with pytest.raises(ValueError, match="not a criterion"):
+        merged.mean("name")